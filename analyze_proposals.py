@@ -4,20 +4,55 @@ Script pour analyser les propositions IVLP et créer un inventaire structuré
 """
 
 import os
+import re
 import json
+import time
+import hashlib
+import argparse
 from pathlib import Path
-from docx import Document
-from datetime import datetime
-import re
+from concurrent.futures import ProcessPoolExecutor
+from docx_cache import read_paragraphs, file_sha256, get_cache
+from instrumentation import get_metrics, ProgressReporter, add_arguments, instrumented
+from keyword_matcher import KeywordMatcher
+from minhash import signature
+
+# Mots-clés thématiques
+THEME_KEYWORDS = {
+    'Climate': ['climate', 'environmental', 'sustainability', 'renewable energy', 'conservation'],
+    'Security': ['security', 'terrorism', 'extremism', 'transnational crime'],
+    'Health': ['health', 'pandemic', 'medical', 'healthcare', 'fentanyl', 'opioid'],
+    'Economy': ['economic', 'entrepreneurship', 'business', 'trade', 'market'],
+    'Human Rights': ['human rights', 'civil rights', 'gender', 'violence', 'trafficking'],
+    'Education': ['education', 'university', 'youth', 'student'],
+    'Democracy': ['democracy', 'governance', 'transparency', 'accountability', 'civic'],
+    'Technology': ['technology', 'digital', 'cybersecurity', 'innovation'],
+    'Migration': ['migration', 'refugee', 'displaced'],
+    'Maritime': ['maritime', 'ocean', 'fisheries', 'blue economy'],
+    'Energy': ['energy', 'oil', 'gas', 'renewable'],
+    'Arts & Culture': ['arts', 'culture', 'heritage', 'creative']
+}
+
+# Mots-clés géographiques
+REGION_KEYWORDS = {
+    'Indo-Pacific': ['indo-pacific', 'pacific', 'quad'],
+    'Europe': ['europe', 'european', 'transatlantic', 'eurasia'],
+    'Africa': ['africa', 'african'],
+    'Americas': ['latin america', 'mexico', 'argentina', 'brazil'],
+    'Middle East': ['middle east', 'arab'],
+    'Asia': ['asia', 'asian', 'vietnam', 'china'],
+    'Central Asia': ['central asia', 'turkmenistan']
+}
+
+# Compilé une seule fois : un seul passage sur le texte pour les deux tables
+KEYWORD_MATCHER = KeywordMatcher({'themes': THEME_KEYWORDS, 'regions': REGION_KEYWORDS})
 
 def extract_text_from_docx(file_path):
     """Extrait le texte d'un fichier .docx"""
     try:
-        doc = Document(file_path)
         full_text = []
-        for para in doc.paragraphs:
-            if para.text.strip():
-                full_text.append(para.text)
+        for text in read_paragraphs(file_path):
+            if text.strip():
+                full_text.append(text)
         return '\n'.join(full_text)
     except Exception as e:
         print(f"Erreur lors de la lecture de {file_path}: {e}")
@@ -45,48 +80,15 @@ def extract_proposal_info(file_path, text):
     # Extraire les premières lignes pour le titre et la description
     lines = text.split('\n')[:20]
 
-    # Chercher des mots-clés thématiques
-    themes = []
-    keywords = {
-        'Climate': ['climate', 'environmental', 'sustainability', 'renewable energy', 'conservation'],
-        'Security': ['security', 'terrorism', 'extremism', 'transnational crime'],
-        'Health': ['health', 'pandemic', 'medical', 'healthcare', 'fentanyl', 'opioid'],
-        'Economy': ['economic', 'entrepreneurship', 'business', 'trade', 'market'],
-        'Human Rights': ['human rights', 'civil rights', 'gender', 'violence', 'trafficking'],
-        'Education': ['education', 'university', 'youth', 'student'],
-        'Democracy': ['democracy', 'governance', 'transparency', 'accountability', 'civic'],
-        'Technology': ['technology', 'digital', 'cybersecurity', 'innovation'],
-        'Migration': ['migration', 'refugee', 'displaced'],
-        'Maritime': ['maritime', 'ocean', 'fisheries', 'blue economy'],
-        'Energy': ['energy', 'oil', 'gas', 'renewable'],
-        'Arts & Culture': ['arts', 'culture', 'heritage', 'creative']
-    }
-
-    text_lower = text.lower()
-    for theme, words in keywords.items():
-        if any(word in text_lower for word in words):
-            themes.append(theme)
+    # Chercher les thèmes et régions, classés par nombre d'occurrences
+    ranked, counts = KEYWORD_MATCHER.ranked(text)
+    themes = ranked['themes']
+    regions = ranked['regions']
 
     # Chercher des dates dans le texte
     date_pattern = r'\b(20\d{2})\b'
     years_mentioned = list(set(re.findall(date_pattern, text[:1000])))
 
-    # Chercher des pays/régions
-    regions = []
-    region_keywords = {
-        'Indo-Pacific': ['indo-pacific', 'pacific', 'quad'],
-        'Europe': ['europe', 'european', 'transatlantic', 'eurasia'],
-        'Africa': ['africa', 'african'],
-        'Americas': ['latin america', 'mexico', 'argentina', 'brazil'],
-        'Middle East': ['middle east', 'arab'],
-        'Asia': ['asia', 'asian', 'vietnam', 'china'],
-        'Central Asia': ['central asia', 'turkmenistan']
-    }
-
-    for region, words in region_keywords.items():
-        if any(word in text_lower for word in words):
-            regions.append(region)
-
     return {
         'filename': filename,
         'fiscal_year': fy_year,
@@ -94,43 +96,238 @@ def extract_proposal_info(file_path, text):
         'themes': themes[:3] if themes else ['General'],
         'regions': regions if regions else ['Global'],
         'years_mentioned': sorted(years_mentioned) if years_mentioned else [],
+        'theme_scores': dict(counts['themes']),
+        'region_scores': dict(counts['regions']),
+        'body_minhash': signature(text),
         'file_path': file_path,
         'text_preview': ' '.join(lines[:3])[:300] + '...' if len(' '.join(lines[:3])) > 300 else ' '.join(lines[:3])
     }
 
-def analyze_all_proposals(base_path):
-    """Analyse toutes les propositions et crée un inventaire"""
-    proposals = []
-
-    print("Analyse des propositions en cours...")
-
+def list_proposal_files(base_path):
+    """Liste les fichiers .docx à analyser (hors fichiers de verrouillage Word)"""
+    file_paths = []
     for root, dirs, files in os.walk(base_path):
         for file in files:
             if file.endswith('.docx') and not file.startswith('~$'):
-                file_path = os.path.join(root, file)
-                print(f"Analyse: {file}")
+                file_paths.append(os.path.join(root, file))
+    return file_paths
+
+def analyze_file(file_path):
+    """Analyse un fichier
+
+    Renvoie (info, pid du worker, durée en secondes, lu depuis le cache .docx).
+    """
+    start = time.perf_counter()
+    hits = get_cache().hits
+    text = extract_text_from_docx(file_path)
+    info = extract_proposal_info(file_path, text)
+    return info, os.getpid(), time.perf_counter() - start, get_cache().hits > hits
+
+def analyze_files(file_paths, workers=None):
+    """Analyse une liste de fichiers, dans l'ordre donné
+
+    workers: nombre de processus (None = nombre de coeurs, 1 = mode séquentiel)
+    """
+    proposals = []
+    workers = workers or os.cpu_count() or 1
+
+    print(f"Analyse des propositions en cours ({len(file_paths)} fichiers, {workers} processus)...")
+
+    if workers == 1 or len(file_paths) <= 1:
+        results = (analyze_file(file_path) for file_path in file_paths)
+        executor = None
+    else:
+        # map() conserve l'ordre des fichiers : l'inventaire reste identique au mode séquentiel
+        executor = ProcessPoolExecutor(max_workers=workers)
+        chunksize = max(1, len(file_paths) // (workers * 4))
+        results = executor.map(analyze_file, file_paths, chunksize=chunksize)
+
+    # Débit par processus : pid -> [fichiers, secondes]
+    throughput = {}
+    metrics = get_metrics()
+    progress = ProgressReporter(len(file_paths), label='Analyse')
+    start = time.perf_counter()
+    try:
+        for file_path, (info, pid, elapsed, cache_hit) in zip(file_paths, results):
+            progress.update(item=file_path)
+            stats = throughput.setdefault(pid, [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed
+
+            metrics.count('docx_cache_hits' if cache_hit else 'docx_cache_misses')
+            metrics.record_file(file_path, elapsed, cache_hit=cache_hit,
+                                themes=len(info['themes']) if info else 0,
+                                regions=len(info['regions']) if info else 0)
+            if info:
+                proposals.append(info)
+                metrics.count('proposals')
+                metrics.count('themes', len(info['themes']))
+                metrics.count('regions', len(info['regions']))
+            else:
+                metrics.count('unreadable_files')
+    finally:
+        if executor:
+            executor.shutdown()
+    total_elapsed = time.perf_counter() - start
+
+    print(f"\nDébit par processus:")
+    for pid, (count, elapsed) in sorted(throughput.items()):
+        rate = count / elapsed if elapsed else 0.0
+        print(f"  PID {pid}: {count} fichiers en {elapsed:.2f}s ({rate:.1f} fichiers/s)")
+    if total_elapsed:
+        print(f"  Total: {len(file_paths)} fichiers en {total_elapsed:.2f}s "
+              f"({len(file_paths) / total_elapsed:.1f} fichiers/s)")
 
-                text = extract_text_from_docx(file_path)
-                info = extract_proposal_info(file_path, text)
+    return proposals
 
-                if info:
-                    proposals.append(info)
+def analyze_all_proposals(base_path, workers=None):
+    """Analyse toutes les propositions et crée un inventaire"""
+    return analyze_files(list_proposal_files(base_path), workers=workers)
 
+def sort_proposals(proposals):
+    """Trie l'inventaire par année fiscale et titre"""
+    proposals.sort(key=lambda x: (x['fiscal_year'] or '', x['title']))
     return proposals
 
+def build_manifest(file_paths, previous=None):
+    """Construit le manifeste {chemin: {size, mtime, hash}} des fichiers
+
+    L'empreinte d'un fichier dont la taille et la date n'ont pas changé
+    depuis le manifeste précédent est reprise sans relire le fichier.
+    """
+    previous = previous or {}
+    manifest = {}
+    for file_path in file_paths:
+        stat = os.stat(file_path)
+        known = previous.get(file_path)
+        if known and known['size'] == stat.st_size and known['mtime'] == stat.st_mtime_ns:
+            content_hash = known['hash']
+        else:
+            content_hash = file_sha256(file_path)
+        manifest[file_path] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': content_hash
+        }
+    return manifest
+
+def diff_manifest(previous, current):
+    """Compare deux manifestes et renvoie (ajoutés, modifiés, supprimés)"""
+    added = [path for path in current if path not in previous]
+    modified = [path for path in current
+                if path in previous and previous[path]['hash'] != current[path]['hash']]
+    removed = [path for path in previous if path not in current]
+    return added, modified, removed
+
+def manifest_fingerprint(manifest):
+    """Empreinte d'un manifeste (chemins et contenus), None s'il est vide
+
+    Un delta porte l'empreinte du manifeste sur lequel il a été calculé
+    ('base') et de celui qu'il produit ('target') ; les étapes suivantes ne
+    l'appliquent que si leurs sorties correspondent à 'base'.
+    """
+    if not manifest:
+        return None
+    digest = hashlib.sha256()
+    for path in sorted(manifest):
+        digest.update(f"{path}\0{manifest[path]['hash']}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+def load_json(path, default):
+    """Charge un fichier JSON, ou renvoie la valeur par défaut s'il n'existe pas"""
+    if not os.path.exists(path):
+        return default
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def analyze_incremental(base_path, inventory, manifest, workers=None):
+    """Ré-analyse uniquement les fichiers ajoutés ou modifiés depuis le manifeste
+
+    Renvoie (inventaire fusionné, nouveau manifeste, delta).
+    """
+    new_manifest = build_manifest(list_proposal_files(base_path), previous=manifest)
+    added, modified, removed = diff_manifest(manifest, new_manifest)
+
+    print(f"Mode incremental: {len(added)} ajoutes, {len(modified)} modifies, {len(removed)} supprimes")
+
+    changed = analyze_files(added + modified, workers=workers) if added or modified else []
+    changed_by_path = {p['file_path']: p for p in changed}
+
+    # Fichier modifié devenu illisible : retiré des ressources comme un fichier supprimé
+    unreadable = [path for path in modified if path not in changed_by_path]
+    drop_unreadable(new_manifest, added + modified, changed_by_path)
+
+    stale = set(modified) | set(removed)
+    merged = [p for p in inventory if p['file_path'] not in stale]
+    merged.extend(changed)
+    sort_proposals(merged)
+
+    delta = {
+        'full': False,
+        'base': manifest_fingerprint(manifest),
+        'target': manifest_fingerprint(new_manifest),
+        'added': [changed_by_path[path] for path in added if path in changed_by_path],
+        'modified': [changed_by_path[path] for path in modified if path in changed_by_path],
+        'removed': removed + unreadable
+    }
+    return merged, new_manifest, delta
+
+def drop_unreadable(manifest, file_paths, analyzed_by_path):
+    """Retire du manifeste les fichiers illisibles, pour qu'ils soient relus au prochain passage"""
+    for path in file_paths:
+        if path not in analyzed_by_path:
+            manifest.pop(path, None)
+
 def main():
-    base_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\Ressource'
+    parser = argparse.ArgumentParser(description="Analyse des propositions IVLP")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Nombre de processus (défaut: nombre de coeurs, 1 = séquentiel)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Ré-analyser uniquement les fichiers ajoutés/modifiés (via le manifeste)")
+    add_arguments(parser)
+    args = parser.parse_args()
 
-    # Analyser toutes les propositions
-    proposals = analyze_all_proposals(base_path)
+    with instrumented(args):
+        return run(args)
 
-    # Trier par année fiscale et titre
-    proposals.sort(key=lambda x: (x['fiscal_year'] or '', x['title']))
+def run(args):
+    metrics = get_metrics()
 
-    # Sauvegarder en JSON
+    base_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\Ressource'
     output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_inventory.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(proposals, f, indent=2, ensure_ascii=False)
+    manifest_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_manifest.json'
+    delta_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_delta.json'
+
+    with metrics.stage('load'):
+        inventory = load_json(output_path, None)
+        manifest = load_json(manifest_path, None)
+
+    if args.incremental and inventory is not None and manifest is not None:
+        with metrics.stage('analyze'):
+            proposals, manifest, delta = analyze_incremental(base_path, inventory, manifest, workers=args.workers)
+    else:
+        # Analyser toutes les propositions
+        with metrics.stage('list_files'):
+            file_paths = list_proposal_files(base_path)
+        with metrics.stage('analyze'):
+            proposals = sort_proposals(analyze_files(file_paths, workers=args.workers))
+        with metrics.stage('manifest'):
+            manifest = build_manifest(file_paths, previous=manifest)
+            drop_unreadable(manifest, file_paths, {p['file_path'] for p in proposals})
+        delta = {'full': True, 'target': manifest_fingerprint(manifest),
+                 'added': [], 'modified': [], 'removed': []}
+
+    # Sauvegarder en JSON
+    with metrics.stage('write'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(proposals, f, indent=2, ensure_ascii=False)
+
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+        # Le delta permet aux étapes suivantes de ne traiter que les changements
+        with open(delta_path, 'w', encoding='utf-8') as f:
+            json.dump(delta, f, indent=2, ensure_ascii=False)
 
     # Créer un résumé
     print(f"\n{'='*80}")
@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Banc d'essai du pipeline de ressources IVLP sur un corpus synthétique
+
+Génère des propositions .docx de style IVLP (nom d'organisation, ligne URL,
+description, bloc "Meeting Focus:") à l'échelle demandée, puis mesure
+chaque étape : analyze_proposals, prepare_database_resources,
+detect_duplicates, clean_and_verify et les deux extracteurs
+d'organisations. Les résultats (temps réel, temps CPU, pic mémoire Python)
+sont enregistrés en JSON et peuvent être comparés entre deux exécutions.
+
+Exemples :
+  python benchmark_pipeline.py --docs 1000
+  python benchmark_pipeline.py --docs 5000 --compare benchmark_results.json
+"""
+
+import os
+import io
+import sys
+import json
+import time
+import random
+import zipfile
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+FISCAL_YEARS = ['FY2023', 'FY 2024', 'FY2025', 'FY2026']
+
+TOPICS = [
+    'Climate Resilience', 'Renewable Energy', 'Public Health', 'Transnational Crime',
+    'Entrepreneurship and Small Business', 'Youth and Civic Engagement', 'Human Rights',
+    'Maritime Security', 'Digital Innovation', 'Refugee and Migration Issues',
+    'Arts and Culture', 'Transparency and Accountability', 'Water Conservation',
+    'Supply Chains', 'Media Literacy', 'Food Security'
+]
+AUDIENCES = ['for the Indo-Pacific', 'for European Leaders', 'in Latin America', 'for Africa',
+             'in Central Asia', 'for the Middle East', '', '']
+ORG_KINDS = ['Foundation', 'Institute', 'Center', 'Council', 'Alliance', 'Coalition', 'Partners']
+ORG_PLACES = ['San Diego', 'Border', 'Pacific', 'Southern California', 'Coastal', 'Regional']
+SENTENCE_WORDS = (
+    'the organization works with community partners on economic development education '
+    'health security climate sustainability innovation youth governance transparency '
+    'cross-border cooperation research programs policy advocacy training'
+).split()
+
+CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '</Types>'
+)
+PACKAGE_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+W_NAMESPACE = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+
+
+def docx_paragraph(text, bold=False):
+    """Paragraphe WordprocessingML"""
+    run_props = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    return f'<w:p><w:r>{run_props}<w:t xml:space="preserve">{escape(text)}</w:t></w:r></w:p>'
+
+
+def write_docx(path, paragraphs):
+    """Écrit un .docx minimal ; paragraphs = [(texte, gras)]"""
+    body = ''.join(docx_paragraph(text, bold) for text, bold in paragraphs)
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{W_NAMESPACE}"><w:body>{body}</w:body></w:document>'
+    )
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', CONTENT_TYPES)
+        archive.writestr('_rels/.rels', PACKAGE_RELS)
+        archive.writestr('word/document.xml', document)
+
+
+def sentence(rng, words=18):
+    """Phrase pseudo-aléatoire"""
+    text = ' '.join(rng.choice(SENTENCE_WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + '.'
+
+
+def synthetic_proposal(rng, orgs_per_doc):
+    """Titre et paragraphes d'une proposition synthétique"""
+    title = f"{rng.choice(TOPICS)} {rng.choice(AUDIENCES)}".strip()
+    paragraphs = [
+        ('_______________________________', False),
+        (f'Project Title/Subject:\t{title}', False),
+        ('Project Type: \t\tRegional Project', False),
+        (sentence(rng, 40), False),
+        ('Why San Diego?', True),
+        (sentence(rng, 60), False),
+    ]
+    for _ in range(orgs_per_doc):
+        name = f"{rng.choice(ORG_PLACES)} {rng.choice(TOPICS).split()[0]} {rng.choice(ORG_KINDS)}"
+        slug = name.lower().replace(' ', '')
+        paragraphs.append((name, True))
+        paragraphs.append((f"https://www.{slug}.org/", False))
+        paragraphs.append((sentence(rng, 30), False))
+        paragraphs.append((sentence(rng, 20), False))
+        paragraphs.append((f"Meeting Focus: {sentence(rng, 15)}", False))
+    return title, paragraphs
+
+
+def generate_corpus(base_path, docs, orgs_per_doc=8, seed=42):
+    """Génère un arbre Ressource/ synthétique ; renvoie la liste des fichiers"""
+    rng = random.Random(seed)
+    file_paths = []
+    for fy in FISCAL_YEARS:
+        os.makedirs(os.path.join(base_path, f"Proposals Sent {fy}"), exist_ok=True)
+
+    for idx in range(docs):
+        fy = FISCAL_YEARS[idx % len(FISCAL_YEARS)]
+        title, paragraphs = synthetic_proposal(rng, orgs_per_doc)
+        # Des copies "(1)" simulent les fichiers renvoyés plusieurs fois
+        suffix = ' (1)' if rng.random() < 0.05 else ''
+        file_path = os.path.join(base_path, f"Proposals Sent {fy}", f"{idx} - {title}{suffix}.docx")
+        write_docx(file_path, paragraphs)
+        file_paths.append(file_path)
+
+    return file_paths
+
+
+def measure(func, memory=True):
+    """Exécute func() et mesure temps réel, temps CPU et pic mémoire Python
+
+    Le pic mémoire est mesuré lors d'un second passage sous tracemalloc, qui
+    ralentit l'exécution et fausserait les temps.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        result = func()
+        wall = time.perf_counter() - wall_start
+        cpu = time.process_time() - cpu_start
+
+        peak = None
+        if memory:
+            tracemalloc.start()
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+    return result, {'wall_s': round(wall, 4), 'cpu_s': round(cpu, 4), 'peak_bytes': peak}
+
+
+def run_benchmarks(work_dir, docs, orgs_per_doc=8, workers=1, memory=True, seed=42):
+    """Génère le corpus et mesure chaque étape ; renvoie le dictionnaire de résultats"""
+    # Cache .docx isolé : la première étape mesure une lecture à froid
+    os.environ['DOCX_CACHE_DIR'] = os.path.join(work_dir, '.docx_cache')
+
+    import analyze_proposals
+    import prepare_database_resources
+    import detect_duplicates
+    import clean_and_verify
+    import extract_organizations_from_ivlp
+    import extract_orgs_improved
+    import docx_cache
+
+    base_path = os.path.join(work_dir, 'Ressource')
+    start = time.perf_counter()
+    file_paths = generate_corpus(base_path, docs, orgs_per_doc=orgs_per_doc, seed=seed)
+    generation_s = time.perf_counter() - start
+
+    stages = {}
+
+    def record(name, func, items, memory_pass=memory):
+        result, stats = measure(func, memory=memory_pass)
+        count = items(result) if callable(items) else items
+        stats['items'] = count
+        stats['items_per_s'] = round(count / stats['wall_s'], 1) if stats['wall_s'] else None
+        stages[name] = stats
+        print(f"  {name:<32} {stats['wall_s']:>9.3f}s  {count:>8} elements")
+        return result
+
+    print(f"Corpus: {docs} documents ({generation_s:.1f}s de generation)")
+
+    # Lecture à froid (cache vide) ; pas de second passage mémoire, qui serait à chaud
+    proposals = record('analyze_proposals.cold',
+                       lambda: analyze_proposals.analyze_files(file_paths, workers=workers),
+                       len, memory_pass=False)
+    proposals = record('analyze_proposals.warm',
+                       lambda: analyze_proposals.sort_proposals(
+                           analyze_proposals.analyze_files(file_paths, workers=workers)),
+                       len)
+
+    resources = record('prepare.format_for_database',
+                       lambda: prepare_database_resources.format_for_database(proposals), len)
+    summary = prepare_database_resources.create_summary(resources)
+
+    # detect_duplicates et clean_and_verify lisent database_resources.json dans le dossier courant
+    with open(os.path.join(work_dir, 'database_resources.json'), 'w', encoding='utf-8') as f:
+        json.dump({'summary': summary, 'resources': resources}, f, ensure_ascii=False)
+
+    previous_cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        # Sans mémo : chaque mesure recalcule toutes les similarités de titres
+        signatures = detect_duplicates.body_signatures(proposals)
+        record('detect_duplicates', lambda: detect_duplicates.detect_duplicates(memo_path=None, signatures=signatures),
+               len(resources))
+        record('clean_and_verify', clean_and_verify.clean_duplicates, len(resources))
+    finally:
+        os.chdir(previous_cwd)
+
+    def extract_all(extractor):
+        return [org for file_path in file_paths for org in extractor(file_path)]
+
+    record('extract_organizations_from_ivlp',
+           lambda: extract_all(extract_organizations_from_ivlp.iter_organizations_from_docx), len)
+    record('extract_orgs_improved',
+           lambda: extract_all(extract_orgs_improved.iter_organizations_improved), len)
+
+    cache = docx_cache.get_cache()
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'docs': docs,
+        'orgs_per_doc': orgs_per_doc,
+        'workers': workers,
+        'seed': seed,
+        'generation_s': round(generation_s, 3),
+        'docx_cache': {'hits': cache.hits, 'misses': cache.misses},
+        'stages': stages
+    }
+
+
+def compare_results(previous, current, tolerance=0.10, min_seconds=0.05):
+    """Compare deux résultats ; renvoie la liste des étapes en régression
+
+    Les étapes plus courtes que min_seconds sont trop bruitées pour être
+    signalées.
+    """
+    regressions = []
+    print(f"\nComparaison ({previous.get('docs')} -> {current.get('docs')} documents)")
+    for name, stats in current['stages'].items():
+        old = previous.get('stages', {}).get(name)
+        if not old or not old.get('wall_s'):
+            print(f"  {name:<32} (nouvelle etape)")
+            continue
+        ratio = stats['wall_s'] / old['wall_s']
+        flag = ''
+        if ratio > 1 + tolerance and stats['wall_s'] >= min_seconds:
+            flag = '  <-- REGRESSION'
+            regressions.append(name)
+        print(f"  {name:<32} {old['wall_s']:>9.3f}s -> {stats['wall_s']:>9.3f}s  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc d'essai du pipeline IVLP")
+    parser.add_argument('--docs', type=int, default=100, help="Nombre de documents (100 a 50000)")
+    parser.add_argument('--orgs-per-doc', type=int, default=8)
+    parser.add_argument('--workers', type=int, default=1, help="Processus pour analyze_proposals")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help="Ne pas mesurer le pic memoire")
+    parser.add_argument('--work-dir', default=None, help="Dossier de travail (temporaire par defaut)")
+    parser.add_argument('--output', default='benchmark_results.json')
+    parser.add_argument('--compare', default=None, help="Resultats precedents a comparer")
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help="Ralentissement tolere avant de signaler une regression")
+    args = parser.parse_args()
+
+    # Les modules du pipeline sont à côté de ce script
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    previous = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+
+    print("="*80)
+    print("BANC D'ESSAI DU PIPELINE")
+    print("="*80)
+
+    if args.work_dir:
+        os.makedirs(args.work_dir, exist_ok=True)
+        results = run_benchmarks(args.work_dir, args.docs, args.orgs_per_doc,
+                                 args.workers, not args.no_memory, args.seed)
+    else:
+        with tempfile.TemporaryDirectory(prefix='ivlp_bench_') as work_dir:
+            results = run_benchmarks(work_dir, args.docs, args.orgs_per_doc,
+                                     args.workers, not args.no_memory, args.seed)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nResultats: {args.output}")
+
+    if previous:
+        regressions = compare_results(previous, results, tolerance=args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} etape(s) en regression")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+"""
+Vérification asynchrone des URL des organisations extraites
+
+Équivalent Python de lib/utils/url-validator.ts, pour des milliers d'URL :
+  - requêtes concurrentes (asyncio, bibliothèque standard uniquement),
+    bornées globalement et par hôte
+  - HEAD d'abord, GET si le serveur refuse HEAD ou si la page semble vide
+  - délai maximal, nouvelles tentatives avec attente croissante
+  - connexions keep-alive réutilisées par hôte
+  - cache persistant (url_health_cache.json) : seules les URL dont le
+    résultat a dépassé la durée de validité sont revérifiées (durée
+    courte pour les échecs)
+
+Exemples :
+  python check_urls.py
+  python check_urls.py --input organizations_improved.json --ttl-hours 24 --concurrency 100
+"""
+
+import os
+import ssl
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, urljoin, quote
+
+CACHE_FILE = 'url_health_cache.json'
+REPORT_FILE = 'url_health_report.json'
+USER_AGENT = 'Mozilla/5.0 (compatible; URLValidator/1.0)'
+
+CONCURRENCY = 50        # connexions simultanées au total
+PER_HOST = 4            # connexions simultanées par hôte
+TIMEOUT = 10.0          # secondes par requête
+RETRIES = 2
+MAX_REDIRECTS = 5
+TTL_HOURS = 24 * 7
+FAILURE_TTL_HOURS = 1   # échecs (souvent temporaires) revérifiés plus tôt
+EMPTY_CONTENT_LENGTH = 100  # en dessous, le corps est lu pour vérifier qu'il n'est pas vide
+EMPTY_TEXT_LENGTH = 50
+MAX_DRAIN = 64 * 1024   # corps plus longs : connexion fermée plutôt que vidée
+
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# Statuts pour lesquels HEAD est réessayé en GET
+HEAD_FALLBACK_STATUSES = {400, 403, 405, 406, 501}
+# Statuts temporaires : nouvelle tentative
+RETRY_STATUSES = {429, 502, 503, 504}
+# Caractères laissés tels quels dans la cible de la requête (les autres sont encodés en %XX)
+TARGET_SAFE = "/%?=&:;@+,$!~*'()#"
+
+
+def clean_url(url):
+    """Retire les espaces et la ponctuation collée à l'URL dans le texte"""
+    return (url or '').strip().rstrip('.,;:)]}>"\'')
+
+
+class HttpResponse:
+    def __init__(self, status, reason, headers, body, url):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body    # Corps décodé, ou None s'il n'a pas été lu
+        self.url = url
+
+
+class _Connection:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (OSError, ssl.SSLError):
+            pass
+
+
+class UrlChecker:
+    """Vérificateur d'URL avec limites de concurrence globale et par hôte
+
+    Les connexions sont gardées ouvertes (keep-alive) et réutilisées pour
+    les requêtes suivantes vers le même hôte : au plus per_host connexions
+    actives par hôte, concurrency au total, et au plus concurrency
+    connexions inactives conservées.
+    """
+
+    def __init__(self, concurrency=CONCURRENCY, per_host=PER_HOST, timeout=TIMEOUT, retries=RETRIES):
+        self.timeout = timeout
+        self.retries = retries
+        self.per_host = per_host
+        self.max_idle = concurrency
+        self.connections = asyncio.Semaphore(concurrency)
+        self.hosts = {}
+        self.idle = OrderedDict()   # (schéma, hôte, port) -> [connexions inactives]
+        self.idle_count = 0
+        self.ssl_context = ssl.create_default_context()
+
+    def _host_limit(self, host):
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.per_host)
+        return self.hosts[host]
+
+    async def _connect(self, key):
+        scheme, host, port = key
+        secure = scheme == 'https'
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port, ssl=self.ssl_context if secure else None,
+                                    server_hostname=host if secure else None),
+            self.timeout)
+        return _Connection(reader, writer)
+
+    def _take_idle(self, key):
+        connections = self.idle.get(key)
+        while connections:
+            connection = connections.pop()
+            self.idle_count -= 1
+            if not connection.reader.at_eof():
+                return connection
+            connection.writer.close()
+        return None
+
+    async def _release(self, key, connection, reusable):
+        """Remet une connexion dans le pool, ou la ferme"""
+        if not reusable:
+            await connection.close()
+            return
+        self.idle.setdefault(key, []).append(connection)
+        self.idle.move_to_end(key)
+        self.idle_count += 1
+        # Pool plein : fermer une connexion de l'hôte utilisé le moins récemment
+        while self.idle_count > self.max_idle:
+            oldest_key, connections = next(iter(self.idle.items()))
+            oldest = connections.pop(0)
+            if not connections:
+                del self.idle[oldest_key]
+            self.idle_count -= 1
+            await oldest.close()
+
+    async def close(self):
+        """Ferme les connexions inactives"""
+        for connections in self.idle.values():
+            for connection in connections:
+                await connection.close()
+        self.idle.clear()
+        self.idle_count = 0
+
+    async def _read_body(self, reader, method, status, headers):
+        """Lit le corps de la réponse ; renvoie (corps ou None, connexion réutilisable)
+
+        Seuls les corps courts (MAX_DRAIN) sont lus : au-delà, la connexion
+        est fermée plutôt que vidée.
+        """
+        if method == 'HEAD' or 100 <= status < 200 or status in (204, 304):
+            return None, True
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            size = 0
+            while True:
+                line = await asyncio.wait_for(reader.readuntil(b'\r\n'), self.timeout)
+                length = int(line.split(b';', 1)[0].strip(), 16)
+                if length == 0:
+                    # Trailers éventuels, puis ligne vide
+                    while (await asyncio.wait_for(reader.readuntil(b'\r\n'), self.timeout)) != b'\r\n':
+                        pass
+                    return b''.join(chunks), True
+                size += length
+                if size > MAX_DRAIN:
+                    return None, False
+                chunks.append(await asyncio.wait_for(reader.readexactly(length), self.timeout))
+                await asyncio.wait_for(reader.readexactly(2), self.timeout)
+        length = headers.get('content-length', '')
+        if length.isdigit():
+            if int(length) > MAX_DRAIN:
+                return None, False
+            return await asyncio.wait_for(reader.readexactly(int(length)), self.timeout), True
+        # Corps délimité par la fermeture de la connexion
+        return None, False
+
+    async def _exchange(self, connection, method, url, parts):
+        """Envoie une requête sur une connexion ; renvoie (réponse, connexion réutilisable)"""
+        # Cible et Host en ASCII : espaces et caractères non ASCII encodés
+        path = quote(parts.path or '/', safe=TARGET_SAFE)
+        if parts.query:
+            path += '?' + quote(parts.query, safe=TARGET_SAFE)
+        host_header = parts.hostname.encode('idna').decode('ascii')
+        if ':' in host_header:
+            host_header = f"[{host_header}]"   # IPv6
+        if parts.port:
+            host_header += f":{parts.port}"
+        connection.writer.write((f"{method} {path} HTTP/1.1\r\nHost: {host_header}\r\n"
+                                 f"User-Agent: {USER_AGENT}\r\nAccept: */*\r\n\r\n").encode('latin-1'))
+        await connection.writer.drain()
+
+        head = await asyncio.wait_for(connection.reader.readuntil(b'\r\n\r\n'), self.timeout)
+        lines = head.decode('latin-1').split('\r\n')
+        status_parts = lines[0].split(' ', 2)
+        status = int(status_parts[1])
+        reason = status_parts[2] if len(status_parts) > 2 else ''
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        body, reusable = await self._read_body(connection.reader, method, status, headers)
+        if headers.get('connection', '').lower() == 'close' or status_parts[0] == 'HTTP/1.0':
+            reusable = False
+        return HttpResponse(status, reason, headers, body, url), reusable
+
+    async def _request(self, method, url):
+        """Une requête HTTP/1.1 (sans suivre les redirections)"""
+        parts = urlsplit(url)
+        secure = parts.scheme == 'https'
+        key = (parts.scheme, parts.hostname, parts.port or (443 if secure else 80))
+
+        # Limite par hôte d'abord : une tâche en attente d'un hôte saturé
+        # n'occupe pas de connexion globale
+        async with self._host_limit(parts.hostname), self.connections:
+            connection = self._take_idle(key)
+            if connection is not None:
+                try:
+                    response, reusable = await self._exchange(connection, method, url, parts)
+                except asyncio.TimeoutError:
+                    # Avant OSError (sous-classe depuis Python 3.11) : un vrai
+                    # délai dépassé n'est pas réessayé sur une nouvelle connexion
+                    await connection.close()
+                    raise
+                except (OSError, asyncio.IncompleteReadError):
+                    # Connexion inactive fermée par le serveur : nouvelle connexion
+                    await connection.close()
+                except BaseException:
+                    await connection.close()
+                    raise
+                else:
+                    await self._release(key, connection, reusable)
+                    return response
+
+            connection = await self._connect(key)
+            reusable = False
+            try:
+                response, reusable = await self._exchange(connection, method, url, parts)
+                return response
+            finally:
+                await self._release(key, connection, reusable)
+
+    async def _fetch(self, method, url):
+        """Requête en suivant les redirections, avec nouvelles tentatives"""
+        for attempt in range(self.retries + 1):
+            try:
+                current, current_method = url, method
+                for _ in range(MAX_REDIRECTS + 1):
+                    response = await self._request(current_method, current)
+                    location = response.headers.get('location')
+                    if response.status not in REDIRECT_STATUSES or not location:
+                        break
+                    current = urljoin(current, location)
+                    if response.status == 303:
+                        current_method = 'GET'
+                if response.status in RETRY_STATUSES and attempt < self.retries:
+                    await asyncio.sleep(0.5 * 2 ** attempt)
+                    continue
+                return response
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, ValueError, IndexError):
+                if attempt == self.retries:
+                    raise
+                await asyncio.sleep(0.5 * 2 ** attempt)
+
+    async def check(self, url):
+        """Vérifie une URL ; renvoie un résultat au format de url-validator.ts"""
+        result = {'url': url, 'is_valid': False, 'checked_at': time.time()}
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            result['error'] = 'Invalid URL format' if not parts.hostname else \
+                'Only HTTP and HTTPS protocols are allowed'
+            return result
+
+        try:
+            try:
+                response = await self._fetch('HEAD', url)
+            except asyncio.TimeoutError:
+                raise
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                response = None  # Certains serveurs ferment la connexion sur HEAD
+
+            needs_get = (response is None or response.status in HEAD_FALLBACK_STATUSES
+                         or (200 <= response.status < 300
+                             and response.headers.get('content-length', '').isdigit()
+                             and int(response.headers['content-length']) < EMPTY_CONTENT_LENGTH))
+            if needs_get:
+                response = await self._fetch('GET', url)
+        except asyncio.TimeoutError:
+            result['error'] = 'Request timeout'
+            return result
+        except Exception as e:
+            result['error'] = str(e) or type(e).__name__
+            return result
+
+        result['status_code'] = response.status
+        if response.url != url:
+            result['final_url'] = response.url
+
+        if not 200 <= response.status < 300:
+            result['error'] = f"HTTP {response.status}: {response.reason}"
+        elif response.body is not None and len(response.body) < EMPTY_CONTENT_LENGTH \
+                and len(response.body.decode('utf-8', 'replace').strip()) < EMPTY_TEXT_LENGTH:
+            result['is_empty'] = True
+            result['error'] = 'Page appears to be empty or has minimal content'
+        else:
+            result['is_valid'] = True
+        return result
+
+
+def load_cache(path=CACHE_FILE):
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_cache(cache, path=CACHE_FILE):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def stale_urls(urls, cache, ttl_seconds, now=None, failure_ttl_seconds=FAILURE_TTL_HOURS * 3600):
+    """URL absentes du cache ou dont le résultat a expiré
+
+    Un échec (erreur, délai dépassé, statut HTTP) expire après
+    failure_ttl_seconds : une panne passagère n'est pas gardée toute la
+    durée de validité d'un succès.
+    """
+    now = now or time.time()
+    stale = []
+    for url in urls:
+        result = cache.get(url)
+        if result is None:
+            stale.append(url)
+            continue
+        ttl = ttl_seconds if result.get('is_valid') else min(ttl_seconds, failure_ttl_seconds)
+        if now - result.get('checked_at', 0) > ttl:
+            stale.append(url)
+    return stale
+
+
+async def check_urls(urls, cache=None, ttl_seconds=TTL_HOURS * 3600, progress=None,
+                     failure_ttl_seconds=FAILURE_TTL_HOURS * 3600, **checker_options):
+    """Vérifie les URL expirées et met à jour le cache ; renvoie {url: résultat}"""
+    cache = {} if cache is None else cache
+    checker = UrlChecker(**checker_options)
+    pending = stale_urls(urls, cache, ttl_seconds, failure_ttl_seconds=failure_ttl_seconds)
+
+    try:
+        for future in asyncio.as_completed([checker.check(url) for url in pending]):
+            result = await future
+            cache[result['url']] = result
+            if progress:
+                progress.update(item=result['url'])
+    finally:
+        await checker.close()
+
+    return {url: cache[url] for url in urls}, len(pending)
+
+
+def collect_urls(path):
+    """URL distinctes des organisations (fichier canonique, .json ou .jsonl)"""
+    from extract_orgs_improved import iter_organizations
+    urls = []
+    seen = set()
+    for org in iter_organizations(path):
+        url = clean_url(org.get('url'))
+        if url and url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def main():
+    from instrumentation import ProgressReporter, get_metrics, add_arguments, instrumented
+
+    parser = argparse.ArgumentParser(description="Verification des URL des organisations")
+    parser.add_argument('--input', default=None,
+                        help="Organisations (defaut : organizations_canonical.json, sinon organizations_improved.json)")
+    parser.add_argument('--cache', default=CACHE_FILE)
+    parser.add_argument('--output', default=REPORT_FILE)
+    parser.add_argument('--ttl-hours', type=float, default=TTL_HOURS)
+    parser.add_argument('--failure-ttl-hours', type=float, default=FAILURE_TTL_HOURS,
+                        help="Duree de validite des echecs en cache")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY)
+    parser.add_argument('--per-host', type=int, default=PER_HOST)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT)
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    input_path = args.input or ('organizations_canonical.json' if os.path.exists('organizations_canonical.json')
+                                else 'organizations_improved.json')
+
+    with instrumented(args):
+        metrics = get_metrics()
+        urls = collect_urls(input_path)
+        cache = load_cache(args.cache)
+        ttl_seconds = args.ttl_hours * 3600
+        failure_ttl_seconds = args.failure_ttl_hours * 3600
+
+        print("="*80)
+        print("VERIFICATION DES URL")
+        print("="*80)
+        pending = len(stale_urls(urls, cache, ttl_seconds, failure_ttl_seconds=failure_ttl_seconds))
+        print(f"URL distinctes: {len(urls)} ({input_path})")
+        print(f"A verifier (absentes ou expirees): {pending}\n")
+
+        progress = ProgressReporter(pending, label='URL')
+        with metrics.stage('check'):
+            results, checked = asyncio.run(check_urls(
+                urls, cache=cache, ttl_seconds=ttl_seconds, progress=progress,
+                failure_ttl_seconds=failure_ttl_seconds,
+                concurrency=args.concurrency, per_host=args.per_host,
+                timeout=args.timeout, retries=args.retries))
+        save_cache(cache, args.cache)
+
+        invalid = [r for r in results.values() if not r['is_valid']]
+        metrics.count('urls', len(urls))
+        metrics.count('checked', checked)
+        metrics.count('invalid', len(invalid))
+
+        report = {
+            'total_urls': len(urls),
+            'checked': checked,
+            'from_cache': len(urls) - checked,
+            'valid': len(urls) - len(invalid),
+            'invalid': len(invalid),
+            'invalid_urls': [{'url': r['url'], 'error': r.get('error', 'Unknown error'),
+                              'status_code': r.get('status_code')} for r in invalid]
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print(f"\nVerifiees: {checked}, depuis le cache: {len(urls) - checked}")
+        print(f"Valides: {report['valid']}, invalides: {report['invalid']}")
+        print(f"Rapport: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,107 +3,177 @@
 Script pour nettoyer les doublons et créer une version finale des ressources
 """
 
+import os
 import json
+import argparse
 from datetime import datetime
 
-def clean_duplicates():
-    """Nettoie les doublons des propositions IVLP"""
+from prepare_database_resources import ResourceSummary
+from instrumentation import get_metrics, add_arguments, instrumented
+from snapshot import write_snapshot, snapshot_path
 
-    # Charger les données
-    with open('database_resources.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
-
-    resources = data['resources']
-
-    print("="*80)
-    print("NETTOYAGE DES DOUBLONS")
-    print("="*80)
-    print(f"\nTotal de propositions avant nettoyage: {len(resources)}\n")
-
-    # Stratégie de nettoyage :
-    # 1. Pour les doublons exacts, garder la version la plus récente (FY le plus élevé)
-    # 2. Pour les propositions similaires mais d'années différentes, les garder toutes
+def normalize_title(title):
+    """Normalise un titre pour le regroupement des doublons"""
+    title_norm = title.lower().strip()
+    title_norm = title_norm.replace('_', ' ')
+    title_norm = title_norm.replace('  ', ' ')
+    return title_norm
 
-    # Créer un dictionnaire par titre normalisé
+def group_by_title(resources):
+    """Regroupe les ressources par titre normalisé (ordre de première apparition)"""
     title_dict = {}
 
     for resource in resources:
-        # Normaliser le titre
-        title_norm = resource['title'].lower().strip()
-        title_norm = title_norm.replace('_', ' ')
-        title_norm = title_norm.replace('  ', ' ')
+        title_norm = normalize_title(resource['title'])
 
         if title_norm not in title_dict:
             title_dict[title_norm] = []
         title_dict[title_norm].append(resource)
 
-    # Nettoyer les doublons
+    return title_dict
+
+def select_kept(items):
+    """Choisit la ressource à conserver dans un groupe de doublons
+
+    Renvoie (ressource conservée, ressources supprimées).
+    """
+    if len(items) == 1:
+        # Pas de doublon, garder tel quel
+        return items[0], []
+
+    # Plusieurs items avec le même titre
+    print(f"Doublon detecte: {items[0]['title']}")
+    print(f"  Nombre d'instances: {len(items)}")
+
+    # Trier par année fiscale (FY2026 > FY2025 > FY2024 > FY2023)
+    # puis par priorité
+    sorted_items = sorted(items, key=lambda x: (
+        x['fiscal_year'],
+        x['priority']
+    ), reverse=True)
+
+    # Garder le plus récent
+    kept = sorted_items[0]
+    print(f"  Conserve: {kept['fiscal_year']} - {kept['id']}")
+
+    # Marquer les autres comme supprimés
+    for item in sorted_items[1:]:
+        print(f"  Supprime: {item['fiscal_year']} - {item['id']}")
+    print()
+
+    return kept, sorted_items[1:]
+
+def clean_resources(resources):
+    """Nettoie les doublons de la liste complète des ressources
+
+    Renvoie (ressources conservées, nombre supprimé, résumé).
+    """
     cleaned_resources = []
     removed_count = 0
+    summary = ResourceSummary()
+
+    for title_norm, items in group_by_title(resources).items():
+        kept, removed = select_kept(items)
+        cleaned_resources.append(kept)
+        summary.add(kept)
+        removed_count += len(removed)
+
+    return cleaned_resources, removed_count, summary
+
+def clean_delta(resources, previous_cleaned, resource_delta, summary):
+    """Nettoie uniquement les groupes de titres touchés par un delta
+
+    Les groupes non concernés sont repris tels quels de la version nettoyée
+    précédente ; l'ordre final est identique à celui d'un nettoyage complet.
+    summary (ResourceSummary de la version précédente) est mis à jour avec
+    les seules ressources retirées ou ajoutées.
+    Renvoie (ressources conservées, nombre supprimé, résumé).
+    """
+    affected = {normalize_title(title) for title in resource_delta.get('affected_titles', [])}
+    changed_ids = set(resource_delta.get('removed_ids', []))
+    changed_ids.update(r['id'] for r in resource_delta.get('upserted', []))
+
+    # Ordre de première apparition de chaque titre normalisé
+    first_seen = {}
+    for position, resource in enumerate(resources):
+        first_seen.setdefault(normalize_title(resource['title']), position)
 
-    for title_norm, items in title_dict.items():
-        if len(items) == 1:
-            # Pas de doublon, garder tel quel
-            cleaned_resources.append(items[0])
+    cleaned_resources = []
+    for r in previous_cleaned:
+        title_norm = normalize_title(r['title'])
+        if title_norm not in affected and r['id'] not in changed_ids and title_norm in first_seen:
+            cleaned_resources.append(r)
         else:
-            # Plusieurs items avec le même titre
-            print(f"Doublon detecte: {items[0]['title']}")
-            print(f"  Nombre d'instances: {len(items)}")
-
-            # Trier par année fiscale (FY2026 > FY2025 > FY2024 > FY2023)
-            # puis par priorité
-            sorted_items = sorted(items, key=lambda x: (
-                x['fiscal_year'],
-                x['priority']
-            ), reverse=True)
-
-            # Garder le plus récent
-            kept = sorted_items[0]
-            cleaned_resources.append(kept)
-            print(f"  Conserve: {kept['fiscal_year']} - {kept['id']}")
-
-            # Marquer les autres comme supprimés
-            for item in sorted_items[1:]:
-                print(f"  Supprime: {item['fiscal_year']} - {item['id']}")
-                removed_count += 1
-            print()
+            summary.remove(r)
 
-    print(f"\nTotal de propositions apres nettoyage: {len(cleaned_resources)}")
-    print(f"Propositions supprimees: {removed_count}\n")
+    affected_resources = [r for r in resources if normalize_title(r['title']) in affected]
+    for title_norm, items in group_by_title(affected_resources).items():
+        kept, removed = select_kept(items)
+        cleaned_resources.append(kept)
+        summary.add(kept)
 
-    # Recalculer les statistiques
-    summary = {
-        'total_resources': len(cleaned_resources),
-        'by_status': {},
-        'by_fiscal_year': {},
-        'by_theme': {},
-        'by_region': {},
-        'active_count': 0,
-        'archived_count': 0
-    }
+    cleaned_resources.sort(key=lambda r: first_seen[normalize_title(r['title'])])
+    return cleaned_resources, len(resources) - len(cleaned_resources), summary
 
-    for resource in cleaned_resources:
-        # Par statut
-        status = resource['status']
-        summary['by_status'][status] = summary['by_status'].get(status, 0) + 1
+def clean_duplicates(delta=False, data=None, output_path='database_resources_cleaned.json'):
+    """Nettoie les doublons des propositions IVLP
 
-        # Par année fiscale
-        fy = resource['fiscal_year']
-        summary['by_fiscal_year'][fy] = summary['by_fiscal_year'].get(fy, 0) + 1
+    delta: ne retraiter que les titres listés dans database_resources_delta.json
+    data: contenu de database_resources.json déjà chargé (sinon lu sur disque)
+    output_path: fichier de sortie (None pour ne pas l'écrire)
+    """
 
-        # Par thème
-        for theme in resource['themes']:
-            summary['by_theme'][theme] = summary['by_theme'].get(theme, 0) + 1
+    metrics = get_metrics()
 
-        # Par région
-        for region in resource['regions']:
-            summary['by_region'][region] = summary['by_region'].get(region, 0) + 1
+    # Charger les données
+    if data is None:
+        with metrics.stage('load'):
+            with open('database_resources.json', 'r', encoding='utf-8') as f:
+                data = json.load(f)
 
-        # Compteurs actif/archivé
-        if resource['is_active']:
-            summary['active_count'] += 1
+    resources = data['resources']
+
+    print("="*80)
+    print("NETTOYAGE DES DOUBLONS")
+    print("="*80)
+    print(f"\nTotal de propositions avant nettoyage: {len(resources)}\n")
+
+    # Stratégie de nettoyage :
+    # 1. Pour les doublons exacts, garder la version la plus récente (FY le plus élevé)
+    # 2. Pour les propositions similaires mais d'années différentes, les garder toutes
+
+    resource_delta = None
+    if delta and output_path and os.path.exists('database_resources_delta.json') and os.path.exists(output_path):
+        with open('database_resources_delta.json', 'r', encoding='utf-8') as f:
+            resource_delta = json.load(f)
+        if resource_delta.get('full'):
+            resource_delta = None
         else:
-            summary['archived_count'] += 1
+            with open(output_path, 'r', encoding='utf-8') as f:
+                previous = json.load(f)
+            # Le delta doit relier la version nettoyée précédente aux ressources
+            # actuelles (voir analyze_proposals.manifest_fingerprint)
+            base = previous.get('manifest_fingerprint')
+            if not base or resource_delta.get('base') != base \
+                    or resource_delta.get('target') != data.get('manifest_fingerprint'):
+                print("Delta calcule sur un autre etat des ressources : nettoyage complet\n")
+                resource_delta = None
+
+    with metrics.stage('clean'):
+        if resource_delta is not None:
+            cleaned_resources, removed_count, summary = clean_delta(
+                resources, previous['resources'], resource_delta,
+                ResourceSummary.from_dict(previous['summary'])
+            )
+        else:
+            cleaned_resources, removed_count, summary = clean_resources(resources)
+
+        summary = summary.to_dict()
+    metrics.count('cleaned_resources', len(cleaned_resources))
+    metrics.count('removed_duplicates', removed_count)
+
+    print(f"\nTotal de propositions apres nettoyage: {len(cleaned_resources)}")
+    print(f"Propositions supprimees: {removed_count}\n")
 
     # Créer la version nettoyée
     cleaned_data = {
@@ -112,13 +182,16 @@ def clean_duplicates():
         'last_updated': datetime.now().isoformat(),
         'data_source': 'C:\\Users\\yoanb\\Desktop\\MVPSandiegodiplo\\Ressource',
         'cleaned': True,
-        'removed_duplicates': removed_count
+        'removed_duplicates': removed_count,
+        'manifest_fingerprint': data.get('manifest_fingerprint')
     }
 
     # Sauvegarder
-    output_path = 'database_resources_cleaned.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(cleaned_data, f, indent=2, ensure_ascii=False)
+    if output_path:
+        with metrics.stage('write'):
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(cleaned_data, f, indent=2, ensure_ascii=False)
+            write_snapshot(snapshot_path(output_path), cleaned_resources, 'resource', summary)
 
     print("="*80)
     print("STATISTIQUES FINALES")
@@ -136,10 +209,17 @@ def clean_duplicates():
         }.get(status, status)
         print(f"  {status_label}: {count} ressources")
 
-    print(f"\nFichier nettoye sauvegarde: {output_path}")
+    if output_path:
+        print(f"\nFichier nettoye sauvegarde: {output_path}")
     print()
 
     return cleaned_data
 
 if __name__ == "__main__":
-    clean_duplicates()
+    parser = argparse.ArgumentParser(description="Nettoyage des doublons IVLP")
+    parser.add_argument('--delta', action='store_true',
+                        help="Ne retraiter que les titres de database_resources_delta.json")
+    add_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        clean_duplicates(delta=args.delta)
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Paquets de contexte par thème et par thème x région pour la génération
+de propositions
+
+Pour chaque thème (et chaque couple thème x région), les organisations les
+plus pertinentes sont classées puis limitées à MAX_ORGANIZATIONS, avec une
+description tronquée : le prompt reçoit un bloc court et prêt à l'emploi au
+lieu de parcourir organizations_improved.json.
+
+Pertinence d'une organisation pour un thème : nombre de propositions de ce
+thème où elle apparaît (données de resolve_organizations.py et de
+database_resources.json), puis année fiscale la plus récente.
+
+Les paquets sont écrits dans context_packs/ :
+  - index.json : empreinte des entrées, paramètres, clé -> hash du paquet
+  - <hash>.json : un fichier par paquet, adressé par son contenu
+Si les entrées n'ont pas changé, rien n'est reconstruit.
+
+Exemples :
+  python context_packs.py
+  python context_packs.py --show Health --region Africa
+"""
+
+import os
+import re
+import json
+import hashlib
+import argparse
+from collections import defaultdict
+
+PACKS_DIR = 'context_packs'
+RESOURCES_FILE = 'database_resources.json'
+CANONICAL_FILE = 'organizations_canonical.json'
+ORGANIZATIONS_FILE = 'organizations_improved.json'
+
+PACKS_VERSION = 1
+MAX_ORGANIZATIONS = 12
+DESCRIPTION_CHARS = 280
+FOCUS_CHARS = 160
+
+PACK_NAME = re.compile(r'^[0-9a-f]{16}\.json$')
+
+
+def trim(text, limit):
+    """Tronque un texte à la fin d'un mot"""
+    text = ' '.join((text or '').split())
+    if len(text) <= limit:
+        return text
+    cut = text[:limit].rsplit(' ', 1)[0]
+    return cut.rstrip('.,;:') + '...'
+
+
+def stable_hash(data):
+    """Empreinte stable d'une structure JSON"""
+    payload = json.dumps(data, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def input_fingerprint(paths):
+    """Empreinte du contenu des fichiers d'entrée, des paramètres et de ce module"""
+    digest = hashlib.sha256()
+    for path in list(paths) + [os.path.abspath(__file__)]:
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(block)
+    digest.update(f"{PACKS_VERSION}:{MAX_ORGANIZATIONS}:{DESCRIPTION_CHARS}:{FOCUS_CHARS}".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def load_organizations(canonical_path=CANONICAL_FILE, raw_path=ORGANIZATIONS_FILE):
+    """Organisations canoniques (resolve_organizations), sinon enregistrements bruts"""
+    if os.path.exists(canonical_path):
+        with open(canonical_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    from extract_orgs_improved import iter_organizations
+    organizations = []
+    for org in iter_organizations(raw_path):
+        organizations.append({
+            'id': org.get('url') or org.get('name'),
+            'name': org.get('name', ''),
+            'url': org.get('url', ''),
+            'description': org.get('description', ''),
+            'meeting_focus': org.get('meeting_focus', ''),
+            'appearances': [{'source_proposal': org.get('source_proposal'),
+                             'fiscal_year': org.get('fiscal_year')}]
+        })
+    return organizations
+
+
+def pack_entry(org):
+    """Forme compacte d'une organisation dans un paquet"""
+    return {
+        'name': org.get('name', ''),
+        'url': org.get('url', ''),
+        'description': trim(org.get('description'), DESCRIPTION_CHARS),
+        'meeting_focus': trim(org.get('meeting_focus'), FOCUS_CHARS)
+    }
+
+
+def build_packs(resources, organizations, max_organizations=MAX_ORGANIZATIONS):
+    """Calcule les paquets ; renvoie {clé: paquet}
+
+    Clés : 'theme:<thème>' et 'theme:<thème>|region:<région>'.
+    """
+    # Un même nom de fichier peut exister dans plusieurs années fiscales
+    by_source = {(resource.get('filename', '') + '.docx', resource.get('fiscal_year')): resource
+                 for resource in resources}
+
+    # Clé -> organisation -> [nombre de propositions, année fiscale la plus récente]
+    scores = defaultdict(dict)
+    for position, org in enumerate(organizations):
+        for appearance in org.get('appearances', []):
+            resource = by_source.get((appearance.get('source_proposal'), appearance.get('fiscal_year')))
+            if resource is None:
+                continue
+            fiscal_year = appearance.get('fiscal_year') or ''
+            keys = []
+            for theme in resource.get('themes', []):
+                keys.append(f"theme:{theme}")
+                keys.extend(f"theme:{theme}|region:{region}" for region in resource.get('regions', []))
+            for key in keys:
+                score = scores[key].setdefault(position, [0, ''])
+                score[0] += 1
+                score[1] = max(score[1], fiscal_year)
+
+    packs = {}
+    for key in sorted(scores):
+        # Tri stable : nom, puis année la plus récente, puis nombre de propositions
+        ranked = sorted(scores[key].items(), key=lambda item: organizations[item[0]].get('name', ''))
+        ranked.sort(key=lambda item: item[1][1], reverse=True)
+        ranked.sort(key=lambda item: item[1][0], reverse=True)
+        entries = [pack_entry(organizations[position]) for position, _ in ranked[:max_organizations]]
+        parts = dict(part.split(':', 1) for part in key.split('|'))
+        pack = {
+            'key': key,
+            'theme': parts['theme'],
+            'region': parts.get('region'),
+            'candidates': len(ranked),
+            'organizations': entries
+        }
+        pack['hash'] = stable_hash(pack)
+        # Estimation grossière (4 caractères par token) pour le budget du prompt
+        pack['approx_tokens'] = len(json.dumps(entries, ensure_ascii=False)) // 4
+        packs[key] = pack
+    return packs
+
+
+def write_packs(packs, fingerprint, packs_dir=PACKS_DIR):
+    """Écrit les paquets (un fichier par contenu) et l'index ; renvoie le nombre de fichiers écrits"""
+    os.makedirs(packs_dir, exist_ok=True)
+    written = 0
+    for pack in packs.values():
+        path = os.path.join(packs_dir, f"{pack['hash']}.json")
+        if not os.path.exists(path):
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(pack, f, ensure_ascii=False)
+            os.replace(path + '.tmp', path)
+            written += 1
+
+    index = {
+        'version': PACKS_VERSION,
+        'fingerprint': fingerprint,
+        'packs': {key: {'hash': pack['hash'], 'count': len(pack['organizations']),
+                        'approx_tokens': pack['approx_tokens']} for key, pack in packs.items()}
+    }
+    index_path = os.path.join(packs_dir, 'index.json')
+    with open(index_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+    os.replace(index_path + '.tmp', index_path)
+
+    # Supprimer les paquets qui ne sont plus référencés (seuls les noms de
+    # paquets sont concernés : le dossier peut contenir d'autres fichiers)
+    live = {f"{pack['hash']}.json" for pack in packs.values()}
+    for name in os.listdir(packs_dir):
+        if PACK_NAME.match(name) and name not in live:
+            os.remove(os.path.join(packs_dir, name))
+    return written
+
+
+def load_index(packs_dir=PACKS_DIR):
+    path = os.path.join(packs_dir, 'index.json')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def get_pack(theme, region=None, packs_dir=PACKS_DIR):
+    """Paquet d'un thème (et d'une région) ; sans paquet thème x région, celui du thème"""
+    index = load_index(packs_dir)
+    if index is None:
+        return None
+    keys = ([f"theme:{theme}|region:{region}"] if region else []) + [f"theme:{theme}"]
+    for key in keys:
+        entry = index['packs'].get(key)
+        if entry:
+            with open(os.path.join(packs_dir, f"{entry['hash']}.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+    return None
+
+
+def update_packs(resources_path=RESOURCES_FILE, canonical_path=CANONICAL_FILE,
+                 raw_path=ORGANIZATIONS_FILE, packs_dir=PACKS_DIR, force=False):
+    """Reconstruit les paquets si les entrées ont changé ; renvoie (reconstruit, index)"""
+    fingerprint = input_fingerprint([resources_path, canonical_path, raw_path])
+    index = load_index(packs_dir)
+    if not force and index and index.get('version') == PACKS_VERSION and index.get('fingerprint') == fingerprint:
+        return False, index
+
+    with open(resources_path, 'r', encoding='utf-8') as f:
+        resources = json.load(f)['resources']
+    packs = build_packs(resources, load_organizations(canonical_path, raw_path))
+    written = write_packs(packs, fingerprint, packs_dir)
+    print(f"{len(packs)} paquets, {written} fichiers ecrits")
+    return True, load_index(packs_dir)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paquets de contexte par theme et region")
+    parser.add_argument('--force', action='store_true', help="Reconstruire meme si rien n'a change")
+    parser.add_argument('--dir', default=PACKS_DIR)
+    parser.add_argument('--show', metavar='THEME', help="Afficher le paquet d'un theme")
+    parser.add_argument('--region', help="Avec --show : region")
+    args = parser.parse_args()
+
+    if args.show:
+        pack = get_pack(args.show, args.region, packs_dir=args.dir)
+        print(json.dumps(pack, indent=2, ensure_ascii=False) if pack else "Aucun paquet")
+        return
+
+    rebuilt, index = update_packs(packs_dir=args.dir, force=args.force)
+    print("="*80)
+    print("PAQUETS DE CONTEXTE " + ("RECONSTRUITS" if rebuilt else "A JOUR (entrees inchangees)"))
+    print("="*80)
+    packs = index['packs']
+    themes = [key for key in packs if '|' not in key]
+    print(f"Themes: {len(themes)}, themes x regions: {len(packs) - len(themes)}")
+    for key in sorted(themes):
+        print(f"  {key[6:]:<24} {packs[key]['count']:>3} organisations (~{packs[key]['approx_tokens']} tokens)")
+    print(f"\nIndex: {os.path.join(args.dir, 'index.json')}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,10 +3,21 @@
 Script pour détecter les doublons dans les propositions IVLP
 """
 
+import os
+import re
 import json
+import hashlib
+import inspect
+import argparse
 from difflib import SequenceMatcher
 from collections import defaultdict
 
+from minhash import LSHIndex, JACCARD_THRESHOLD
+from instrumentation import get_metrics, add_arguments, instrumented
+
+MEMO_FILE = 'duplicates_similarity_memo.json'
+INVENTORY_FILE = 'proposals_inventory.json'
+
 def similarity(a, b):
     """Calcule la similarité entre deux chaînes (0 à 1)"""
     return SequenceMatcher(None, a.lower(), b.lower()).ratio()
@@ -21,14 +32,224 @@ def normalize_title(title):
     normalized = normalized.strip()
     return normalized
 
-def detect_duplicates():
-    """Détecte les doublons dans les propositions"""
+def comparison_title(title):
+    """Forme du titre comparée par find_similar_pairs"""
+    return title.lower()
+
+def title_hash(text):
+    """Clé d'un titre dans le mémo de similarité"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()[:16]
+
+def trigrams(text):
+    """Ensemble des trigrammes de caractères d'une chaîne"""
+    return {text[k:k + 3] for k in range(len(text) - 2)}
+
+def compare_titles(titles, threshold=0.85, start=0):
+    """Paires de titres distincts de similarité > threshold
+
+    Seules les paires dont au moins un titre a une position >= start sont
+    évaluées (les titres précédents ont déjà été comparés entre eux, voir
+    SimilarityMemo). Au lieu de comparer toutes les paires, un index inversé
+    de trigrammes génère les candidats. Le filtrage est sans perte : deux
+    chaînes de ratio > threshold sont à distance d'insertion/suppression
+    d < (1 - threshold) * (la + lb), et partagent donc au moins
+    max(|G(a)|, |G(b)|) - 3d trigrammes distincts. Les rares paires pour
+    lesquelles cette borne est nulle (titres très courts) sont vérifiées
+    à part. Les bornes real_quick_ratio/quick_ratio précèdent le ratio exact.
+    Renvoie [(i, j, sim)] avec i < j.
+    """
+    grams = [trigrams(title) for title in titles]
+    max_gap = 1.0 - threshold
+    length_ratio = (1.0 + max_gap) / threshold  # borne sur lb / la
+
+    def min_shared(i, j):
+        total = len(titles[i]) + len(titles[j])
+        return max(len(grams[i]), len(grams[j])) - 3 * int(max_gap * total)
+
+    index = defaultdict(list)  # trigramme -> indices déjà vus
+    short_pool = []  # titres pour lesquels la borne de trigrammes peut être nulle
+    similar_pairs = []
+
+    for j, title in enumerate(titles):
+        if j >= start:
+            shared = defaultdict(int)
+            for gram in grams[j]:
+                for i in index[gram]:
+                    shared[i] += 1
+            for i in short_pool:
+                shared.setdefault(i, 0)
+
+            for i, count in shared.items():
+                la, lb = len(titles[i]), len(title)
+                # Borne sur la longueur : ratio <= 2 * min / (la + lb)
+                if 2 * min(la, lb) <= threshold * (la + lb):
+                    continue
+                if count < min_shared(i, j):
+                    continue
+
+                # Ordre canonique : ratio() dépend de l'ordre des chaînes, le
+                # résultat ne doit dépendre ni de l'ordre des ressources ni du mémo
+                matcher = SequenceMatcher(None, *sorted((titles[i], title)))
+                if matcher.real_quick_ratio() <= threshold or matcher.quick_ratio() <= threshold:
+                    continue
+                sim = matcher.ratio()
+                if sim > threshold and sim < 1.0:  # Très similaire mais pas identique
+                    similar_pairs.append((i, j, sim))
+
+        for gram in grams[j]:
+            index[gram].append(j)
+        longest_partner = len(title) * length_ratio + 1
+        if len(grams[j]) <= 3 * int(max_gap * (len(title) + longest_partner)):
+            short_pool.append(j)
+
+    return similar_pairs
+
+class SimilarityMemo:
+    """Mémo persistant des paires de titres similaires
+
+    Le fichier garde les empreintes des titres déjà comparés entre eux et
+    les paires qui dépassent le seuil (les autres paires de ces titres sont
+    sous le seuil). Une exécution ne compare que les nouveaux titres à
+    l'ensemble, en O(nouveaux x n). Le mémo est invalidé si le seuil ou le
+    code de comparaison (comparison_title, normalize_title, compare_titles)
+    change.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path, threshold):
+        self.path = path
+        self.threshold = threshold
+        self.fingerprint = self.code_fingerprint(threshold)
+        self.keys = set()
+        self.pairs = {}
+        self.reused_titles = 0
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except ValueError:
+                data = {}
+            if data.get('fingerprint') == self.fingerprint:
+                self.keys = set(data['keys'])
+                self.pairs = {(h1, h2): sim for h1, h2, sim in data['pairs']}
+
+    @classmethod
+    def code_fingerprint(cls, threshold):
+        digest = hashlib.sha256(f"{cls.VERSION}:{threshold!r}".encode('utf-8'))
+        for function in (comparison_title, normalize_title, trigrams, compare_titles):
+            digest.update(inspect.getsource(function).encode('utf-8'))
+        return digest.hexdigest()
+
+    def similar_pairs(self, titles):
+        """Paires (i, j, sim) des titres distincts donnés, en réutilisant le mémo"""
+        hashes = [title_hash(title) for title in titles]
+        known = [pos for pos, key in enumerate(hashes) if key in self.keys]
+        new = [pos for pos, key in enumerate(hashes) if key not in self.keys]
+        order = known + new
+        self.reused_titles = len(known)
+
+        pairs = [(order[i], order[j], sim)
+                 for i, j, sim in compare_titles([titles[pos] for pos in order], self.threshold, start=len(known))]
+
+        position = {hashes[pos]: pos for pos in known}
+        for (h1, h2), sim in self.pairs.items():
+            if h1 in position and h2 in position:
+                pairs.append((position[h1], position[h2], sim))
+
+        # Le mémo ne garde que les titres actuels
+        self.keys = set(hashes)
+        self.pairs = {tuple(sorted((hashes[i], hashes[j]))): sim for i, j, sim in pairs}
+        return [(min(i, j), max(i, j), sim) for i, j, sim in pairs]
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'fingerprint': self.fingerprint,
+                'keys': sorted(self.keys),
+                'pairs': [[h1, h2, sim] for (h1, h2), sim in sorted(self.pairs.items())]
+            }, f)
+        os.replace(tmp_path, self.path)
+
+def find_similar_pairs(resources, threshold=0.85, memo=None):
+    """Trouve les paires de titres de similarité > threshold (et < 1.0)
+
+    Les titres identiques ne sont comparés qu'une fois (compare_titles) ;
+    avec memo (SimilarityMemo), seuls les titres nouveaux sont comparés.
+    Renvoie [(res1, res2, sim)] dans l'ordre (i, j) des ressources.
+    """
+    positions = defaultdict(list)  # titre -> indices des ressources
+    for idx, resource in enumerate(resources):
+        positions[comparison_title(resource['title'])].append(idx)
+    titles = list(positions)
+
+    if memo is not None:
+        title_pairs = memo.similar_pairs(titles)
+    else:
+        title_pairs = compare_titles(titles, threshold)
+
+    similar_pairs = []
+    for a, b, sim in title_pairs:
+        for i in positions[titles[a]]:
+            for j in positions[titles[b]]:
+                similar_pairs.append((min(i, j), max(i, j), sim))
+
+    similar_pairs.sort(key=lambda x: (x[0], x[1]))
+    return [(resources[i], resources[j], sim) for i, j, sim in similar_pairs]
+
+def body_signatures(proposals):
+    """Signatures MinHash de l'inventaire : {file_path: signature}"""
+    return {p['file_path']: p['body_minhash'] for p in proposals if p.get('body_minhash')}
+
+def load_signatures(path=INVENTORY_FILE):
+    """Signatures MinHash lues dans proposals_inventory.json ({} s'il n'existe pas)
+
+    Les signatures restent dans l'inventaire : les ressources servies au
+    site n'en ont pas besoin.
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        return body_signatures(json.load(f))
+
+def find_body_clusters(resources, signatures, threshold=JACCARD_THRESHOLD):
+    """Groupes de propositions au contenu presque identique (MinHash/LSH)
+
+    signatures : {file_path: signature} calculées par analyze_proposals.
+    Renvoie (groupes de ressources, paires (res1, res2, jaccard estimé)).
+    """
+    index = LSHIndex(threshold=threshold)
+    for idx, resource in enumerate(resources):
+        sig = signatures.get(resource['file_path'])
+        if sig:
+            index.add(idx, sig)
+
+    clusters, pairs = index.clusters()
+    clusters = [[resources[i] for i in sorted(members)] for members in sorted(clusters, key=min)]
+    pairs = [(resources[i], resources[j], sim) for i, j, sim in sorted(pairs)]
+    return clusters, pairs
+
+def detect_duplicates(resources=None, report_path='duplicates_report.json', body_threshold=JACCARD_THRESHOLD,
+                      memo_path=MEMO_FILE, signatures=None):
+    """Détecte les doublons dans les propositions
+
+    resources: liste de ressources déjà chargée (sinon lue dans database_resources.json)
+    signatures: signatures MinHash par file_path (sinon lues dans proposals_inventory.json)
+    report_path: fichier du rapport JSON (None pour ne pas l'écrire)
+    body_threshold: similarité de Jaccard minimale entre contenus (MinHash)
+    memo_path: mémo des similarités de titres (None pour tout recalculer)
+    """
+
+    metrics = get_metrics()
 
     # Charger les données
-    with open('database_resources.json', 'r', encoding='utf-8') as f:
-        data = json.load(f)
+    if resources is None:
+        with metrics.stage('load'):
+            with open('database_resources.json', 'r', encoding='utf-8') as f:
+                data = json.load(f)
 
-    resources = data['resources']
+        resources = data['resources']
 
     print("="*80)
     print("ANALYSE DES DOUBLONS - PROPOSITIONS IVLP")
@@ -40,9 +261,10 @@ def detect_duplicates():
     print("-"*80)
 
     title_groups = defaultdict(list)
-    for resource in resources:
-        title = normalize_title(resource['title'])
-        title_groups[title].append(resource)
+    with metrics.stage('exact_titles'):
+        for resource in resources:
+            title = normalize_title(resource['title'])
+            title_groups[title].append(resource)
 
     exact_duplicates = {title: items for title, items in title_groups.items() if len(items) > 1}
 
@@ -61,19 +283,14 @@ def detect_duplicates():
     print("\n2. DETECTION DES TITRES SIMILAIRES (>85%)")
     print("-"*80)
 
-    similar_pairs = []
-    checked = set()
-
-    for i, res1 in enumerate(resources):
-        for j, res2 in enumerate(resources[i+1:], i+1):
-            pair_key = tuple(sorted([res1['id'], res2['id']]))
-            if pair_key in checked:
-                continue
-            checked.add(pair_key)
-
-            sim = similarity(res1['title'], res2['title'])
-            if sim > 0.85 and sim < 1.0:  # Très similaire mais pas identique
-                similar_pairs.append((res1, res2, sim))
+    with metrics.stage('similar_titles'):
+        memo = SimilarityMemo(memo_path, threshold=0.85) if memo_path else None
+        similar_pairs = find_similar_pairs(resources, threshold=0.85, memo=memo)
+        if memo:
+            memo.save()
+    if memo:
+        print(f"(memo: {memo.reused_titles} titres deja compares sur {len(memo.keys)} titres distincts)\n")
+        metrics.count('memo_reused_titles', memo.reused_titles)
 
     if similar_pairs:
         print(f"Trouve {len(similar_pairs)} paires de titres similaires:\n")
@@ -122,7 +339,6 @@ def detect_duplicates():
         # Nettoyer le nom de fichier (enlever les numéros de version, etc.)
         filename = resource['filename'].lower()
         # Supprimer les patterns communs comme (1), (2), _2, etc.
-        import re
         cleaned = re.sub(r'\s*\(\d+\)\s*', '', filename)
         cleaned = re.sub(r'\s+\d+\s*$', '', cleaned)
         cleaned = cleaned.strip()
@@ -141,7 +357,29 @@ def detect_duplicates():
     else:
         print("Aucun nom de fichier similaire trouve.\n")
 
-    # 5. Résumé et recommandations
+    # 5. Détecter les contenus presque identiques (MinHash/LSH)
+    print(f"\n5. CONTENUS PRESQUE IDENTIQUES (Jaccard >= {body_threshold:.0%})")
+    print("-"*80)
+
+    with metrics.stage('similar_bodies'):
+        if signatures is None:
+            signatures = load_signatures()
+        body_clusters, body_pairs = find_body_clusters(resources, signatures, threshold=body_threshold)
+    missing_signatures = len([r for r in resources if r['file_path'] not in signatures])
+    if missing_signatures:
+        print(f"({missing_signatures} propositions sans signature MinHash, relancer analyze_proposals.py)\n")
+
+    if body_clusters:
+        print(f"Trouve {len(body_clusters)} groupes de contenus presque identiques:\n")
+        for items in body_clusters[:10]:
+            print(f"  Nombre de propositions: {len(items)}")
+            for item in items:
+                print(f"    - {item['id']} ({item['fiscal_year']}) - {item['title'][:60]}")
+            print()
+    else:
+        print("Aucun contenu presque identique trouve.\n")
+
+    # 6. Résumé et recommandations
     print("\n" + "="*80)
     print("RESUME DE L'ANALYSE")
     print("="*80)
@@ -150,11 +388,13 @@ def detect_duplicates():
     total_similar = len(similar_pairs)
     total_multi_year = len(multi_year_topics)
     total_filename_dup = len(duplicate_filenames)
+    total_body = len(body_clusters)
 
     print(f"\nDoublons exacts (titres identiques)     : {total_duplicates} groupes")
     print(f"Titres tres similaires (>85%)           : {total_similar} paires")
     print(f"Sujets couverts sur plusieurs annees    : {total_multi_year} sujets")
     print(f"Noms de fichiers similaires             : {total_filename_dup} groupes")
+    print(f"Contenus presque identiques             : {total_body} groupes")
 
     print("\n" + "="*80)
     print("RECOMMANDATIONS")
@@ -176,6 +416,10 @@ def detect_duplicates():
         print(f"\n⚠️  INFO: {total_filename_dup} groupes de fichiers avec noms similaires")
         print("   → Peut indiquer des versions ou des copies")
 
+    if total_body > 0:
+        print(f"\n⚠️  INFO: {total_body} groupes de propositions au contenu presque identique")
+        print("   → Verifier les propositions renvoyees sous un nouveau titre")
+
     # Créer un rapport JSON
     report = {
         'total_resources': len(resources),
@@ -183,6 +427,8 @@ def detect_duplicates():
         'similar_titles': len(similar_pairs),
         'multi_year_topics': len(multi_year_topics),
         'duplicate_filenames': len(duplicate_filenames),
+        'similar_bodies': len(body_clusters),
+        'body_jaccard_threshold': body_threshold,
         'exact_duplicate_groups': {
             title: [{'id': item['id'], 'fiscal_year': item['fiscal_year'],
                     'filename': item['filename']} for item in items]
@@ -195,14 +441,41 @@ def detect_duplicates():
                 'item2': {'id': res2['id'], 'title': res2['title'], 'fiscal_year': res2['fiscal_year']}
             }
             for res1, res2, sim in similar_pairs
+        ],
+        'similar_body_groups': [
+            [{'id': item['id'], 'title': item['title'], 'fiscal_year': item['fiscal_year'],
+              'filename': item['filename']} for item in items]
+            for items in body_clusters
+        ],
+        'similar_body_pairs': [
+            {
+                'jaccard': sim,
+                'item1': {'id': res1['id'], 'title': res1['title'], 'fiscal_year': res1['fiscal_year']},
+                'item2': {'id': res2['id'], 'title': res2['title'], 'fiscal_year': res2['fiscal_year']}
+            }
+            for res1, res2, sim in body_pairs
         ]
     }
 
-    with open('duplicates_report.json', 'w', encoding='utf-8') as f:
-        json.dump(report, f, indent=2, ensure_ascii=False)
+    metrics.count('exact_duplicate_groups', len(exact_duplicates))
+    metrics.count('similar_title_pairs', len(similar_pairs))
+    metrics.count('similar_body_groups', len(body_clusters))
+
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+
+        print(f"\n📊 Rapport detaille sauvegarde dans: {report_path}")
+        print()
 
-    print(f"\n📊 Rapport detaille sauvegarde dans: duplicates_report.json")
-    print()
+    return report
 
 if __name__ == "__main__":
-    detect_duplicates()
+    parser = argparse.ArgumentParser(description="Detection des doublons IVLP")
+    parser.add_argument('--body-threshold', type=float, default=JACCARD_THRESHOLD,
+                        help=f"Similarite de Jaccard minimale entre contenus (defaut : {JACCARD_THRESHOLD})")
+    parser.add_argument('--no-memo', action='store_true', help="Recalculer toutes les similarites de titres")
+    add_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        detect_duplicates(body_threshold=args.body_threshold, memo_path=None if args.no_memo else MEMO_FILE)
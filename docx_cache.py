@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Cache disque des paragraphes extraits des fichiers .docx
+
+Le contenu est adressé par empreinte SHA-256 du fichier : une même
+proposition n'est lue qu'une seule fois (voir docx_reader), quel que soit
+le script qui la lit (analyze_proposals, extract_organizations_from_ivlp,
+extract_orgs_improved). Une pré-vérification taille/mtime évite de
+recalculer l'empreinte des fichiers inchangés.
+
+Chaque entrée contient les événements de paragraphes (texte et style, voir
+docx_reader.paragraph_event) ; read_paragraphs() n'en renvoie que le texte.
+"""
+
+import os
+import json
+import hashlib
+
+from docx_reader import read_paragraph_events as parse_paragraph_events
+
+# Version 2 : paragraphes des cellules de tableaux inclus (docx_reader)
+# Version 3 : événements (gras, titre, hyperliens) au lieu du texte seul
+# Version 4 : lecture de secours python-docx alignée sur la lecture directe
+CACHE_VERSION = 4
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.docx_cache')
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # 64 Mo
+# L'éviction descend sous cette fraction de max_bytes : le dossier n'est
+# pas reparcouru à chaque nouvelle entrée une fois le budget atteint
+EVICT_TARGET = 0.9
+
+
+def file_sha256(file_path):
+    """Calcule l'empreinte SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _write_json_atomic(path, data):
+    """Écrit un JSON via un fichier temporaire (sûr entre processus)"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class DocxCache:
+    """Cache des flux de paragraphes, avec éviction LRU bornée en taille
+
+    Chaque entrée est un fichier <sha256>.json ; la date de modification du
+    fichier sert d'horodatage LRU (mise à jour à chaque lecture). Les
+    pré-vérifications taille/mtime sont stockées par chemin dans paths/.
+
+    La taille totale est tenue à jour à chaque écriture ; le dossier n'est
+    parcouru qu'au premier dépassement du budget puis à chaque éviction.
+    Les écritures des autres processus ne sont vues qu'à ce moment-là :
+    le budget peut être dépassé temporairement quand plusieurs processus
+    partagent le cache.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, parser=None):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.parser = parser or parse_paragraph_events
+        self.hits = 0
+        self.misses = 0
+        self.total_bytes = None  # Inconnue tant que le dossier n'a pas été parcouru
+        os.makedirs(os.path.join(cache_dir, 'paths'), exist_ok=True)
+
+    def _entry_path(self, content_hash):
+        return os.path.join(self.cache_dir, f"{content_hash}.json")
+
+    def _stat_path(self, file_path):
+        key = hashlib.sha1(os.path.abspath(file_path).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, 'paths', f"{key}.json")
+
+    def content_hash(self, file_path):
+        """Renvoie l'empreinte du fichier, sans relire le contenu s'il n'a pas changé"""
+        stat = os.stat(file_path)
+        stat_path = self._stat_path(file_path)
+        try:
+            with open(stat_path, 'r', encoding='utf-8') as f:
+                known = json.load(f)
+            if known['size'] == stat.st_size and known['mtime'] == stat.st_mtime_ns:
+                return known['hash']
+        except (OSError, ValueError, KeyError):
+            pass
+
+        content_hash = file_sha256(file_path)
+        _write_json_atomic(stat_path, {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': content_hash
+        })
+        return content_hash
+
+    def paragraphs(self, file_path):
+        """Renvoie la liste des textes de paragraphes d'un fichier .docx"""
+        return [event['text'] for event in self.events(file_path)]
+
+    def events(self, file_path):
+        """Renvoie la liste des événements de paragraphes d'un fichier .docx"""
+        content_hash = self.content_hash(file_path)
+        entry_path = self._entry_path(content_hash)
+
+        try:
+            with open(entry_path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            if entry.get('version') == CACHE_VERSION:
+                self.hits += 1
+                os.utime(entry_path)  # Rafraîchir la position LRU
+                return entry['events']
+        except (OSError, ValueError):
+            pass
+
+        self.misses += 1
+        events = self.parser(file_path)
+        self.put(entry_path, {'version': CACHE_VERSION, 'events': events})
+        return events
+
+    def put(self, entry_path, entry):
+        """Écrit une entrée et n'évince que si le budget est dépassé"""
+        try:
+            previous_size = os.path.getsize(entry_path)  # Entrée d'une ancienne version
+        except OSError:
+            previous_size = 0
+        _write_json_atomic(entry_path, entry)
+        if self.total_bytes is None:
+            self.evict()
+            return
+        self.total_bytes += os.path.getsize(entry_path) - previous_size
+        if self.total_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà de max_bytes
+
+        Une fois le budget dépassé, l'éviction descend à EVICT_TARGET * max_bytes.
+        Les pré-vérifications de paths/ qui désignent une entrée supprimée
+        sont supprimées avec elle.
+        """
+        entries = []
+        total = 0
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith('.json'):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        entries.sort()
+        evicted = set()
+        target = self.max_bytes * EVICT_TARGET if total > self.max_bytes else self.max_bytes
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted.add(os.path.basename(path)[:-len('.json')])
+        self.total_bytes = total
+        if evicted:
+            self.prune_paths(evicted)
+        return len(evicted)
+
+    def prune_paths(self, evicted):
+        """Supprime les pré-vérifications de paths/ pointant vers des entrées évincées"""
+        removed = 0
+        for entry in os.scandir(os.path.join(self.cache_dir, 'paths')):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                with open(entry.path, 'r', encoding='utf-8') as f:
+                    stale = json.load(f).get('hash') in evicted
+            except (OSError, ValueError, AttributeError):
+                stale = True  # Illisible : recalculée à la prochaine lecture
+            if stale:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except OSError:
+                    pass
+        return removed
+
+
+_default_cache = None
+
+
+def get_cache():
+    """Renvoie le cache partagé du processus courant"""
+    global _default_cache
+    if _default_cache is None:
+        _default_cache = DocxCache(
+            cache_dir=os.environ.get('DOCX_CACHE_DIR', DEFAULT_CACHE_DIR),
+            max_bytes=int(os.environ.get('DOCX_CACHE_MAX_BYTES', DEFAULT_MAX_BYTES))
+        )
+    return _default_cache
+
+
+def read_paragraphs(file_path):
+    """Renvoie les textes de paragraphes d'un .docx en passant par le cache partagé"""
+    return get_cache().paragraphs(file_path)
+
+
+def read_paragraph_events(file_path):
+    """Renvoie les événements de paragraphes d'un .docx en passant par le cache partagé"""
+    return get_cache().events(file_path)
@@ -0,0 +1,407 @@
+#!/usr/bin/env python3
+"""
+Lecteur .docx léger : parcourt directement word/document.xml
+
+Les extracteurs n'ont besoin que du texte des paragraphes. Plutôt que de
+construire tout le modèle objet de python-docx, ce module lit le XML en
+flux (iterparse) et produit les paragraphes un par un, y compris ceux des
+cellules de tableaux que Document().paragraphs ignore. Le texte d'un
+paragraphe suit les mêmes règles que python-docx (runs et hyperliens,
+tabulations, sauts de ligne). Les fichiers inhabituels sont relus avec
+python-docx.
+
+iter_paragraph_events() produit en plus le style de chaque paragraphe
+(gras, niveau de titre, cibles des hyperliens), pour les règles
+d'extraction qui s'appuient sur la mise en forme (voir org_rules).
+
+lxml (déjà requis par python-docx) est utilisé s'il est installé ; sinon
+le module xml.etree de la bibliothèque standard prend le relais. Il n'est
+importé qu'à la première lecture.
+"""
+
+import zipfile
+import xml.etree.ElementTree as ET
+
+_lxml_etree = None
+_lxml_checked = False
+
+
+def get_lxml():
+    """Renvoie lxml.etree s'il est disponible (import paresseux), sinon None"""
+    global _lxml_etree, _lxml_checked
+    if not _lxml_checked:
+        _lxml_checked = True
+        try:
+            from lxml import etree
+            _lxml_etree = etree
+        except ImportError:
+            _lxml_etree = None
+    return _lxml_etree
+
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+R_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+BODY = W_NS + 'body'
+PARAGRAPH = W_NS + 'p'
+RUN = W_NS + 'r'
+HYPERLINK = W_NS + 'hyperlink'
+TABLE_CELL = W_NS + 'tc'
+BREAK_TYPE = W_NS + 'type'
+
+# Mise en forme
+VAL = W_NS + 'val'
+PARAGRAPH_PROPERTIES = W_NS + 'pPr'
+RUN_PROPERTIES = W_NS + 'rPr'
+PARAGRAPH_STYLE = W_NS + 'pStyle'
+RUN_STYLE = W_NS + 'rStyle'
+BOLD = W_NS + 'b'
+OUTLINE_LEVEL = W_NS + 'outlineLvl'
+STYLE = W_NS + 'style'
+STYLE_ID = W_NS + 'styleId'
+STYLE_NAME = W_NS + 'name'
+BASED_ON = W_NS + 'basedOn'
+HYPERLINK_TYPE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink'
+# Niveau de plan 9 = texte normal
+BODY_TEXT_LEVEL = 9
+
+# Équivalents texte des éléments d'un run (mêmes règles que python-docx)
+RUN_TEXT = {
+    W_NS + 't': None,
+    W_NS + 'tab': '\t',
+    W_NS + 'ptab': '\t',
+    W_NS + 'cr': '\n',
+    W_NS + 'noBreakHyphen': '-',
+}
+RUN_BREAK = W_NS + 'br'
+
+
+class UnsupportedDocx(Exception):
+    """Le fichier ne peut pas être lu directement (format inattendu)"""
+
+
+def run_text(run):
+    """Texte d'un élément w:r"""
+    parts = []
+    for child in run:
+        if child.tag in RUN_TEXT:
+            value = RUN_TEXT[child.tag]
+            parts.append(child.text or '' if value is None else value)
+        elif child.tag == RUN_BREAK:
+            if child.get(BREAK_TYPE, 'textWrapping') == 'textWrapping':
+                parts.append('\n')
+    return ''.join(parts)
+
+
+def paragraph_text(paragraph):
+    """Texte d'un élément w:p (runs directs et runs des hyperliens)"""
+    parts = []
+    for child in paragraph:
+        if child.tag == RUN:
+            parts.append(run_text(child))
+        elif child.tag == HYPERLINK:
+            parts.extend(run_text(run) for run in child if run.tag == RUN)
+    return ''.join(parts)
+
+
+def _on(element):
+    """Valeur d'une propriété booléenne (w:b, ...) : absente de w:val = vraie"""
+    return element.get(VAL, 'true') not in ('0', 'false', 'off')
+
+
+def _outline_heading(element):
+    """Niveau de titre d'un w:outlineLvl (None pour le texte normal ou une valeur invalide)"""
+    try:
+        level = int(element.get(VAL, BODY_TEXT_LEVEL))
+    except ValueError:
+        return None
+    return level + 1 if 0 <= level < BODY_TEXT_LEVEL else None
+
+
+def _name_heading(name):
+    """Niveau de titre d'un nom de style « heading N », sinon None"""
+    name = (name or '').lower()
+    if not name.startswith('heading '):
+        return None
+    try:
+        return int(name[8:])
+    except ValueError:
+        return None
+
+
+def read_styles(archive):
+    """Styles du document : id -> {'bold': bool|None, 'heading': int|None}
+
+    Les valeurs héritées (basedOn) sont résolues. Titre : niveau de plan
+    du style, ou nom « heading N ».
+    """
+    try:
+        root = ET.fromstring(archive.read('word/styles.xml'))
+    except (KeyError, ET.ParseError):
+        return {}
+    return parse_styles(root)
+
+
+def parse_styles(root):
+    """Styles d'un élément w:styles (voir read_styles)"""
+    raw = {}
+    for style in root.iter(STYLE):
+        style_id = style.get(STYLE_ID)
+        if not style_id:
+            continue
+        bold = heading = None
+        based_on = style.find(BASED_ON)
+        name = style.find(STYLE_NAME)
+        heading = _name_heading(name.get(VAL) if name is not None else None)
+        properties = style.find(RUN_PROPERTIES)
+        if properties is not None and properties.find(BOLD) is not None:
+            bold = _on(properties.find(BOLD))
+        properties = style.find(PARAGRAPH_PROPERTIES)
+        if properties is not None and properties.find(OUTLINE_LEVEL) is not None:
+            heading = _outline_heading(properties.find(OUTLINE_LEVEL)) or heading
+        raw[style_id] = (bold, heading, based_on.get(VAL) if based_on is not None else None)
+
+    styles = {}
+
+    def resolve(style_id, depth=0):
+        if style_id in styles:
+            return styles[style_id]
+        bold, heading, parent = raw.get(style_id, (None, None, None))
+        if parent in raw and depth < 20:
+            inherited = resolve(parent, depth + 1)
+            bold = inherited['bold'] if bold is None else bold
+            heading = inherited['heading'] if heading is None else heading
+        styles[style_id] = {'bold': bold, 'heading': heading}
+        return styles[style_id]
+
+    for style_id in raw:
+        resolve(style_id)
+    return styles
+
+
+def read_hyperlinks(archive):
+    """Cibles des hyperliens externes : r:id -> URL"""
+    try:
+        root = ET.fromstring(archive.read('word/_rels/document.xml.rels'))
+    except (KeyError, ET.ParseError):
+        return {}
+    return {rel.get('Id'): rel.get('Target') for rel in root.iter(REL_NS + 'Relationship')
+            if rel.get('Type') == HYPERLINK_TYPE}
+
+
+def paragraph_event(paragraph, styles=None, hyperlinks=None):
+    """Texte et style d'un élément w:p
+
+    Renvoie {'text': ...} complété seulement si nécessaire par 'bold' (tous
+    les runs non vides en gras), 'heading' (niveau de titre) et 'links'
+    (cibles des hyperliens, dans l'ordre).
+    """
+    styles = styles or {}
+    hyperlinks = hyperlinks or {}
+
+    paragraph_bold = heading = None
+    properties = paragraph.find(PARAGRAPH_PROPERTIES)
+    if properties is not None:
+        style = properties.find(PARAGRAPH_STYLE)
+        if style is not None:
+            style = styles.get(style.get(VAL), {})
+            paragraph_bold, heading = style.get('bold'), style.get('heading')
+        level = properties.find(OUTLINE_LEVEL)
+        if level is not None:
+            heading = _outline_heading(level) or heading
+
+    parts = []
+    links = []
+    bold_runs = plain_runs = 0
+
+    def add_run(run):
+        nonlocal bold_runs, plain_runs
+        text = run_text(run)
+        parts.append(text)
+        if not text.strip():
+            return
+        bold = None
+        run_properties = run.find(RUN_PROPERTIES)
+        if run_properties is not None:
+            if run_properties.find(BOLD) is not None:
+                bold = _on(run_properties.find(BOLD))
+            elif run_properties.find(RUN_STYLE) is not None:
+                bold = styles.get(run_properties.find(RUN_STYLE).get(VAL), {}).get('bold')
+        if bold is None:
+            bold = paragraph_bold
+        if bold:
+            bold_runs += 1
+        else:
+            plain_runs += 1
+
+    for child in paragraph:
+        if child.tag == RUN:
+            add_run(child)
+        elif child.tag == HYPERLINK:
+            target = hyperlinks.get(child.get(R_NS + 'id'))
+            if target and target not in links:
+                links.append(target)
+            for run in child:
+                if run.tag == RUN:
+                    add_run(run)
+
+    event = {'text': ''.join(parts)}
+    if bold_runs and not plain_runs:
+        event['bold'] = True
+    if heading is not None:
+        event['heading'] = heading
+    if links:
+        event['links'] = links
+    return event
+
+
+def _iter_lxml(lxml_etree, stream, include_tables):
+    """Parcours avec lxml : seuls les éléments w:p sont remontés"""
+    found_body = False
+    try:
+        for event, elem in lxml_etree.iterparse(stream, events=('end',), tag=PARAGRAPH):
+            parent = elem.getparent()
+            if parent.tag == BODY:
+                found_body = True
+                yield elem
+                # Libérer le paragraphe et les blocs de premier niveau précédents
+                elem.clear()
+                while elem.getprevious() is not None:
+                    del parent[0]
+            elif parent.tag == TABLE_CELL:
+                if include_tables:
+                    yield elem
+                elem.clear()
+    except lxml_etree.XMLSyntaxError as e:
+        raise UnsupportedDocx(str(e))
+
+    if not found_body:
+        raise UnsupportedDocx("corps du document introuvable")
+
+
+def _iter_stdlib(stream, include_tables):
+    """Parcours avec xml.etree (suivi de la pile des balises ouvertes)"""
+    stack = []
+    body = None
+    try:
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                stack.append(elem.tag)
+                if elem.tag == BODY:
+                    body = elem
+                continue
+
+            stack.pop()
+            parent = stack[-1] if stack else None
+
+            if elem.tag == PARAGRAPH and body is not None:
+                if parent == BODY or (include_tables and parent == TABLE_CELL):
+                    yield elem
+                if parent == TABLE_CELL:
+                    elem.clear()
+
+            # Libérer les blocs de premier niveau déjà traités
+            if parent == BODY:
+                body.clear()
+    except ET.ParseError as e:
+        raise UnsupportedDocx(str(e))
+
+    if body is None:
+        raise UnsupportedDocx("corps du document introuvable")
+
+
+def _open_archive(file_path):
+    try:
+        return zipfile.ZipFile(file_path)
+    except (zipfile.BadZipFile, OSError) as e:
+        raise UnsupportedDocx(str(e))
+
+
+def _iter_archive_elements(archive, include_tables):
+    try:
+        stream = archive.open('word/document.xml')
+    except KeyError:
+        raise UnsupportedDocx("word/document.xml introuvable")
+
+    with stream:
+        lxml_etree = get_lxml()
+        if lxml_etree is not None:
+            yield from _iter_lxml(lxml_etree, stream, include_tables)
+        else:
+            yield from _iter_stdlib(stream, include_tables)
+
+
+def iter_paragraph_elements(file_path, include_tables=True):
+    """Produit les éléments w:p du corps du document, dans l'ordre
+
+    include_tables: inclure aussi les paragraphes des cellules de tableaux.
+    Les éléments sont libérés après usage : ne pas les conserver.
+    """
+    with _open_archive(file_path) as archive:
+        yield from _iter_archive_elements(archive, include_tables)
+
+
+def iter_paragraph_events(file_path, include_tables=True):
+    """Produit le texte et le style de chaque paragraphe (voir paragraph_event)"""
+    with _open_archive(file_path) as archive:
+        try:
+            styles = read_styles(archive)
+            hyperlinks = read_hyperlinks(archive)
+        except (zipfile.BadZipFile, OSError) as e:
+            raise UnsupportedDocx(str(e))
+        for paragraph in _iter_archive_elements(archive, include_tables):
+            yield paragraph_event(paragraph, styles, hyperlinks)
+
+
+def iter_paragraphs(file_path, include_tables=True):
+    """Produit le texte de chaque paragraphe du document"""
+    for paragraph in iter_paragraph_elements(file_path, include_tables=include_tables):
+        yield paragraph_text(paragraph)
+
+
+def _python_docx_elements(doc, include_tables=True):
+    """Éléments w:p retenus par la lecture directe, dans un document python-docx
+
+    Mêmes éléments et même ordre que iter_paragraph_elements : paragraphes
+    du corps et, si include_tables, ceux des cellules de tableaux.
+    """
+    parents = (BODY, TABLE_CELL) if include_tables else (BODY,)
+    return [element for element in doc.element.body.iter(PARAGRAPH)
+            if element.getparent().tag in parents]
+
+
+def read_paragraphs_python_docx(file_path, include_tables=True):
+    """Lecture de secours avec python-docx (import paresseux)
+
+    python-docx ne sert qu'à ouvrir le paquet : le texte suit les mêmes
+    règles que la lecture directe.
+    """
+    from docx import Document
+    doc = Document(file_path)
+    return [paragraph_text(element) for element in _python_docx_elements(doc, include_tables)]
+
+
+def read_paragraphs(file_path, include_tables=True):
+    """Renvoie la liste des textes de paragraphes, avec repli sur python-docx"""
+    try:
+        return list(iter_paragraphs(file_path, include_tables=include_tables))
+    except UnsupportedDocx:
+        return read_paragraphs_python_docx(file_path, include_tables=include_tables)
+
+
+def read_paragraph_events_python_docx(file_path, include_tables=True):
+    """Lecture de secours des événements avec python-docx (import paresseux)"""
+    from docx import Document
+    doc = Document(file_path)
+    styles = parse_styles(doc.styles.element)
+    hyperlinks = {rel_id: rel.target_ref for rel_id, rel in doc.part.rels.items()
+                  if rel.reltype == HYPERLINK_TYPE}
+    return [paragraph_event(element, styles, hyperlinks)
+            for element in _python_docx_elements(doc, include_tables)]
+
+
+def read_paragraph_events(file_path, include_tables=True):
+    """Renvoie la liste des événements de paragraphes, avec repli sur python-docx"""
+    try:
+        return list(iter_paragraph_events(file_path, include_tables=include_tables))
+    except UnsupportedDocx:
+        return read_paragraph_events_python_docx(file_path, include_tables=include_tables)
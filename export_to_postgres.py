@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+Export et chargement en masse de la table public.resources (supabase-schema.sql)
+
+Les propositions (database_resources.json) et les organisations canoniques
+(organizations_canonical.json, voir resolve_organizations.py) sont converties
+en lignes au format texte de COPY, avec les mêmes correspondances que
+import_ivlp_proposals.ts. Les lignes sont soit écrites dans un fichier
+(utilisable avec \\copy dans psql), soit chargées par lots via COPY FROM STDIN,
+une transaction par lot, sur une connexion issue d'un pool.
+
+Les lignes importées portent import_source = 'ivlp' : --truncate ne supprime
+que celles-ci (dans sa propre transaction), jamais les ressources créées
+dans l'application. Si un lot échoue, les lots précédents restent chargés :
+relancer avec --truncate pour repartir d'un import complet.
+
+Exemples :
+  python export_to_postgres.py export --output resources.copy
+  python export_to_postgres.py load --dsn postgresql://postgres@localhost/postgres --truncate
+
+Le chargement nécessite psycopg (et, si disponible, psycopg_pool).
+"""
+
+import os
+import json
+import argparse
+import contextlib
+from datetime import datetime
+
+RESOURCES_FILE = 'database_resources.json'
+ORGANIZATIONS_FILE = 'organizations_canonical.json'
+TABLE = 'public.resources'
+RESOURCE_COLUMNS = (
+    'category', 'name', 'description', 'url', 'meeting_focus',
+    'price', 'accessibility', 'is_active', 'created_by', 'import_source'
+)
+IMPORT_SOURCE = 'ivlp'
+COPY_SQL = f"COPY {TABLE} ({', '.join(RESOURCE_COLUMNS)}) FROM STDIN"
+BATCH_SIZE = 5000
+
+# Échappements du format texte de COPY
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _array_element(value):
+    """Élément d'un littéral de tableau Postgres ({"a","b"})"""
+    if value is None:
+        return 'NULL'
+    text = str(value).replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{text}"'
+
+
+def copy_value(value):
+    """Convertit une valeur Python en champ COPY (texte)
+
+    None -> \\N, booléens -> t/f, listes -> tableau Postgres,
+    dictionnaires -> JSON ; le résultat est échappé pour COPY.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (list, tuple)):
+        value = '{' + ','.join(_array_element(v) for v in value) + '}'
+    elif isinstance(value, dict):
+        value = json.dumps(value, ensure_ascii=False)
+    return str(value).translate(COPY_ESCAPES)
+
+
+def copy_line(values):
+    """Ligne COPY complète (terminée par un saut de ligne)"""
+    return '\t'.join(copy_value(v) for v in values) + '\n'
+
+
+def proposal_category(themes):
+    """Catégorie d'une proposition (même règle que import_ivlp_proposals.ts)"""
+    if 'Education' in themes or 'Technology' in themes:
+        return 'academic'
+    if 'Arts & Culture' in themes:
+        return 'cultural'
+    if 'Human Rights' in themes or 'Democracy' in themes:
+        return 'nonprofit'
+    return 'governmental'
+
+
+def resource_row(resource, created_by=None):
+    """Ligne public.resources pour une proposition IVLP"""
+    themes = ', '.join(resource.get('themes', []))
+    regions = ', '.join(resource.get('regions', []))
+    metadata = resource.get('metadata', {})
+    return (
+        proposal_category(resource.get('themes', [])),
+        resource.get('title', ''),
+        f"{resource.get('description', '')}\n\nFiscal Year: {resource.get('fiscal_year', '')}\n"
+        f"Status: {resource.get('status', '').upper()}\nThemes: {themes}\nRegions: {regions}",
+        None,  # Les propositions IVLP sont des fichiers locaux
+        f"{themes} - {regions}",
+        None,
+        f"Document Type: {metadata.get('document_type', 'docx').upper()} - Priority: {resource.get('priority', 0)}",
+        bool(resource.get('is_active')),
+        created_by,
+        IMPORT_SOURCE
+    )
+
+
+def organization_category(org):
+    """Catégorie d'une organisation, déduite de son domaine"""
+    domain = (org.get('normalized_url') or '').split('/', 1)[0]
+    if domain.endswith(('.gov', '.mil')) or '.gov.' in domain:
+        return 'governmental'
+    if domain.endswith('.edu') or '.edu.' in domain or '.ac.' in domain:
+        return 'academic'
+    if any(word in (org.get('name') or '').lower() for word in ('museum', 'theatre', 'theater', 'arts', 'gallery')):
+        return 'cultural'
+    return 'nonprofit'
+
+
+def organization_row(org, created_by=None):
+    """Ligne public.resources pour une organisation canonique"""
+    description = org.get('description') or ''
+    if org.get('fiscal_years'):
+        description = f"{description}\n\nFiscal Years: {', '.join(org['fiscal_years'])}".strip()
+    return (
+        organization_category(org),
+        org.get('name') or org.get('url', ''),
+        description or None,
+        org.get('url') or None,
+        org.get('meeting_focus') or None,
+        None,
+        None,
+        True,
+        created_by,
+        IMPORT_SOURCE
+    )
+
+
+def iter_rows(resources, organizations=(), created_by=None, active_only=False):
+    """Lignes COPY des propositions puis des organisations"""
+    for resource in resources:
+        if active_only and not resource.get('is_active'):
+            continue
+        yield copy_line(resource_row(resource, created_by))
+    for org in organizations:
+        yield copy_line(organization_row(org, created_by))
+
+
+def write_copy_file(path, rows):
+    """Écrit les lignes dans un fichier COPY (texte, UTF-8) ; renvoie le nombre de lignes"""
+    count = 0
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        for line in rows:
+            f.write(line)
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def iter_batches(rows, batch_size=BATCH_SIZE):
+    """Regroupe les lignes en lots (liste de lignes)"""
+    batch = []
+    for line in rows:
+        batch.append(line)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def get_pool(dsn, max_size=4):
+    """Pool de connexions : psycopg_pool s'il est installé, sinon connexion simple"""
+    try:
+        import psycopg
+    except ImportError:
+        raise ImportError("psycopg est requis pour le chargement (pip install 'psycopg[binary]')")
+
+    try:
+        from psycopg_pool import ConnectionPool
+        return ConnectionPool(dsn, min_size=1, max_size=max_size, open=True)
+    except ImportError:
+        return _SingleConnectionPool(psycopg, dsn)
+
+
+class _SingleConnectionPool:
+    """Substitut minimal de ConnectionPool : une connexion réutilisée"""
+
+    def __init__(self, psycopg, dsn):
+        self.conn = psycopg.connect(dsn)
+
+    @contextlib.contextmanager
+    def connection(self):
+        yield self.conn
+
+    def close(self):
+        self.conn.close()
+
+
+def load_rows(pool, rows, batch_size=BATCH_SIZE, truncate=False):
+    """Charge les lignes par COPY, une transaction par lot
+
+    truncate : supprime d'abord, dans une transaction distincte, les lignes
+    d'un import précédent (import_source = 'ivlp'). Un lot en échec est
+    annulé, les lots déjà validés sont conservés. Renvoie le nombre de
+    lignes chargées.
+    """
+    loaded = 0
+    with pool.connection() as conn:
+        if truncate:
+            with conn.transaction(), conn.cursor() as cur:
+                cur.execute(f"DELETE FROM {TABLE} WHERE import_source = %s", (IMPORT_SOURCE,))
+                print(f"  {cur.rowcount} lignes importees supprimees")
+        for number, batch in enumerate(iter_batches(rows, batch_size), 1):
+            with conn.transaction(), conn.cursor() as cur:
+                with cur.copy(COPY_SQL) as copy:
+                    copy.write(''.join(batch))
+            loaded += len(batch)
+            print(f"  Lot {number}: {len(batch)} lignes ({loaded} au total)")
+    return loaded
+
+
+def load_inputs(resources_path, organizations_path, include_organizations=True):
+    with open(resources_path, 'r', encoding='utf-8') as f:
+        resources = json.load(f)['resources']
+    organizations = []
+    if include_organizations and os.path.exists(organizations_path):
+        with open(organizations_path, 'r', encoding='utf-8') as f:
+            organizations = json.load(f)
+    return resources, organizations
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export / chargement COPY de public.resources")
+    parser.add_argument('command', choices=['export', 'load'])
+    parser.add_argument('--input', default=RESOURCES_FILE, help="Ressources (database_resources.json)")
+    parser.add_argument('--organizations', default=ORGANIZATIONS_FILE, help="Organisations canoniques")
+    parser.add_argument('--no-organizations', action='store_true', help="Propositions uniquement")
+    parser.add_argument('--active-only', action='store_true', help="Seulement les propositions actives")
+    parser.add_argument('--created-by', default=os.environ.get('ADMIN_USER_ID'),
+                        help="UUID du profil importateur (defaut : $ADMIN_USER_ID)")
+    parser.add_argument('--output', default='resources.copy', help="Fichier COPY (export)")
+    parser.add_argument('--dsn', default=os.environ.get('DATABASE_URL'), help="Connexion Postgres (load)")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                        help="Lignes par lot (une transaction par lot)")
+    parser.add_argument('--truncate', action='store_true', help="Supprimer les lignes d'un import precedent avant le chargement")
+    args = parser.parse_args()
+
+    resources, organizations = load_inputs(args.input, args.organizations,
+                                           include_organizations=not args.no_organizations)
+    rows = iter_rows(resources, organizations, created_by=args.created_by, active_only=args.active_only)
+
+    print("="*80)
+    print("EXPORT POSTGRES - TABLE public.resources")
+    print("="*80)
+    print(f"Propositions : {len(resources)}")
+    print(f"Organisations: {len(organizations)}")
+
+    started = datetime.now()
+    if args.command == 'export':
+        count = write_copy_file(args.output, rows)
+        print(f"\n{count} lignes ecrites dans {args.output}")
+        print(f"Chargement : \\copy {TABLE} ({', '.join(RESOURCE_COLUMNS)}) FROM '{args.output}'")
+    else:
+        if not args.dsn:
+            parser.error("--dsn (ou DATABASE_URL) est requis pour load")
+        pool = get_pool(args.dsn)
+        try:
+            count = load_rows(pool, rows, batch_size=args.batch_size, truncate=args.truncate)
+        finally:
+            pool.close()
+        print(f"\n{count} lignes chargees dans {TABLE}")
+    print(f"Duree: {(datetime.now() - started).total_seconds():.2f}s")
+
+
+if __name__ == "__main__":
+    main()
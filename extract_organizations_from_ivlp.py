@@ -5,73 +5,29 @@ et créer des ressources détaillées
 """
 
 import os
-import re
-from docx import Document
+import time
+import argparse
+from org_rules import iter_profile_organizations
+from instrumentation import get_metrics, ProgressReporter, add_arguments, instrumented
+from snapshot import write_snapshot, snapshot_path
 from pathlib import Path
 import json
 
-def extract_organizations_from_docx(file_path):
-    """Extrait les organisations d'un fichier IVLP .docx"""
-    try:
-        doc = Document(file_path)
-        full_text = '\n'.join([para.text for para in doc.paragraphs if para.text.strip()])
-
-        organizations = []
-        current_org = None
-
-        # Patterns pour détecter les sections
-        url_pattern = r'https?://[^\s]+'
-
-        lines = full_text.split('\n')
-        i = 0
-
-        while i < len(lines):
-            line = lines[i].strip()
-
-            # Détecter un nom d'organisation (souvent en gras ou suivi d'une URL)
-            if line and not line.startswith('Meeting Focus:') and not line.startswith('Why '):
-                # Vérifier si la ligne suivante contient une URL
-                next_line = lines[i+1].strip() if i+1 < len(lines) else ''
-
-                if re.search(url_pattern, next_line):
-                    # C'est probablement une nouvelle organisation
-                    if current_org and current_org.get('name'):
-                        organizations.append(current_org)
-
-                    current_org = {
-                        'name': line,
-                        'url': next_line,
-                        'description': '',
-                        'meeting_focus': ''
-                    }
-                    i += 2
-                    continue
-
-                # Détecter Meeting Focus
-                elif line.startswith('Meeting Focus:'):
-                    if current_org:
-                        current_org['meeting_focus'] = line.replace('Meeting Focus:', '').strip()
-                    i += 1
-                    continue
-
-                # Ajouter à la description
-                elif current_org and line:
-                    if not current_org['description']:
-                        current_org['description'] = line
-                    else:
-                        current_org['description'] += ' ' + line
-
-            i += 1
-
-        # Ajouter la dernière organisation
-        if current_org and current_org.get('name'):
-            organizations.append(current_org)
-
-        return organizations
+def iter_organizations_from_docx(file_path):
+    """Extrait les organisations d'un fichier IVLP .docx, au fil de la lecture
 
+    Règles du profil 'ivlp' de org_rules : la ligne qui précède une URL est
+    le nom de l'organisation. Chaque organisation est produite dès que le
+    bloc suivant commence.
+    """
+    try:
+        yield from iter_profile_organizations(file_path, 'ivlp')
     except Exception as e:
         print(f"Erreur lors de la lecture de {file_path}: {e}")
-        return []
+
+def extract_organizations_from_docx(file_path):
+    """Extrait les organisations d'un fichier IVLP .docx (liste complète)"""
+    return list(iter_organizations_from_docx(file_path))
 
 def extract_all_organizations():
     """Extrait toutes les organisations de toutes les propositions IVLP"""
@@ -87,6 +43,9 @@ def extract_all_organizations():
     file_count = 0
     org_count = 0
 
+    metrics = get_metrics()
+    progress = ProgressReporter(None, label='Fichiers')
+
     for root, dirs, files in os.walk(base_path):
         for file in files:
             if file.endswith('.docx') and not file.startswith('~$'):
@@ -104,19 +63,20 @@ def extract_all_organizations():
                 elif 'FY2023' in root or 'FY 2023' in root:
                     fiscal_year = 'FY2023'
 
-                print(f"Analyse: {file} ({fiscal_year})")
-
-                orgs = extract_organizations_from_docx(file_path)
-
-                if orgs:
-                    print(f"  -> {len(orgs)} organisations trouvees")
-                    org_count += len(orgs)
+                found = 0
+                start = time.perf_counter()
+                for org in iter_organizations_from_docx(file_path):
+                    org['source_proposal'] = file
+                    org['fiscal_year'] = fiscal_year
+                    all_organizations.append(org)
+                    found += 1
 
-                    for org in orgs:
-                        org['source_proposal'] = file
-                        org['fiscal_year'] = fiscal_year
-                        all_organizations.append(org)
+                metrics.record_file(file_path, time.perf_counter() - start, organizations=found)
+                metrics.count('organizations', found)
+                org_count += found
+                progress.update(item=file_path)
 
+    progress.finish()
     print()
     print("="*80)
     print(f"Total: {file_count} fichiers analyses")
@@ -126,8 +86,10 @@ def extract_all_organizations():
 
     # Sauvegarder
     output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\organizations_extracted.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_organizations, f, indent=2, ensure_ascii=False)
+    with metrics.stage('write'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(all_organizations, f, indent=2, ensure_ascii=False)
+        write_snapshot(snapshot_path(output_path), all_organizations, 'organization')
 
     print(f"Sauvegarde dans: {output_path}")
     print()
@@ -146,4 +108,8 @@ def extract_all_organizations():
     return all_organizations
 
 if __name__ == "__main__":
-    extract_all_organizations()
+    parser = argparse.ArgumentParser(description="Extraction des organisations des propositions IVLP")
+    add_arguments(parser)
+    args = parser.parse_args()
+    with instrumented(args):
+        extract_all_organizations()
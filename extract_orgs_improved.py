@@ -4,83 +4,73 @@ Script ameliore pour extraire les organisations des propositions IVLP
 """
 
 import os
-import re
-from docx import Document
+import time
+import argparse
+from org_rules import iter_profile_organizations, PROFILES
+from instrumentation import get_metrics, ProgressReporter, add_arguments, instrumented
+from snapshot import write_snapshot, snapshot_path
 import json
 
-def clean_text(text):
-    """Nettoie le texte"""
-    if not text:
-        return ''
-    return text.replace('\u2019', "'").replace('\u2013', '-').replace('\u201c', '"').replace('\u201d', '"').strip()
+def iter_organizations_improved(file_path, profile='improved'):
+    """Extrait les organisations avec une meilleure logique, au fil de la lecture
 
-def extract_organizations_improved(file_path):
-    """Extrait les organisations avec une meilleure logique"""
+    Règles du profil 'improved' de org_rules : une URL ouvre un bloc, le
+    premier paragraphe court qui suit est le nom. Chaque organisation est
+    produite dès que l'URL suivante commence un nouveau bloc.
+    """
     try:
-        doc = Document(file_path)
-        organizations = []
-        current_org = None
-        collecting_description = False
-
-        for para in doc.paragraphs:
-            text = clean_text(para.text)
-
-            if not text:
-                continue
-
-            # Detecter une URL (debut d'organisation)
-            url_match = re.search(r'https?://[^\s]+', text)
-
-            if url_match and len(text) < 200:  # URL seule ou avec peu de texte
-                # Sauvegarder l'organisation precedente
-                if current_org and current_org.get('name'):
-                    organizations.append(current_org)
-
-                # Nouvelle organisation
-                current_org = {
-                    'name': '',
-                    'url': url_match.group(0),
-                    'description': '',
-                    'meeting_focus': ''
-                }
-                collecting_description = True
-                continue
-
-            # Detecter le nom de l'organisation (paragraphe avant l'URL ou gras)
-            if current_org and not current_org.get('name') and len(text) < 200 and text.count(' ') < 15:
-                current_org['name'] = text
-                continue
-
-            # Detecter Meeting Focus
-            if 'Meeting Focus:' in text or 'Meeting focus:' in text:
-                if current_org:
-                    meeting_text = re.sub(r'Meeting [Ff]ocus:\s*', '', text)
-                    current_org['meeting_focus'] = clean_text(meeting_text)
-                collecting_description = False
-                continue
-
-            # Collecter la description
-            if current_org and collecting_description and text:
-                # Ignorer certaines sections
-                if text.startswith('Why ') or text.startswith('Project ') or text.startswith('_____'):
-                    continue
-
-                if current_org['description']:
-                    current_org['description'] += ' ' + text
-                else:
-                    current_org['description'] = text
-
-        # Ajouter la derniere organisation
-        if current_org and current_org.get('name'):
-            organizations.append(current_org)
-
-        return organizations
-
+        yield from iter_profile_organizations(file_path, profile)
     except Exception as e:
         print(f"Erreur: {e}")
-        return []
+
+def extract_organizations_improved(file_path, profile='improved'):
+    """Extrait les organisations d'un fichier (liste complète)"""
+    return list(iter_organizations_improved(file_path, profile))
+
+def iter_organizations(path):
+    """Lit les organisations une par une depuis un fichier JSON Lines
+
+    Les anciens fichiers .json (liste complète) restent lisibles, mais sont
+    alors chargés en entier.
+    """
+    if not path.endswith('.jsonl'):
+        with open(path, 'r', encoding='utf-8') as f:
+            yield from json.load(f)
+        return
+
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+def write_organizations_jsonl(f, organizations):
+    """Écrit des organisations au format JSON Lines et vide le tampon
+
+    Le flush après chaque écriture permet aux lecteurs de commencer avant
+    la fin de l'extraction.
+    """
+    for org in organizations:
+        f.write(json.dumps(org, ensure_ascii=False))
+        f.write('\n')
+    f.flush()
 
 def main():
+    parser = argparse.ArgumentParser(description="Extraction amelioree des organisations")
+    parser.add_argument('--jsonl', action='store_true',
+                        help="Ecrire organizations_improved.jsonl au fil de l'extraction")
+    parser.add_argument('--rules', default='improved', choices=sorted(PROFILES),
+                        help="Regles d'extraction (voir org_rules.py)")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        run(args)
+
+def run(args):
+    metrics = get_metrics()
+    progress = ProgressReporter(None, label='Fichiers')
+
     base_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\Ressource'
     all_organizations = []
 
@@ -95,7 +85,7 @@ def main():
     if os.path.exists(test_path):
         print("Test sur: Fentanyl and Protecting Public Health")
         print("-"*80)
-        orgs = extract_organizations_improved(test_path)
+        orgs = extract_organizations_improved(test_path, args.rules)
 
         print(f"Organisations trouvees: {len(orgs)}")
         print()
@@ -115,6 +105,17 @@ def main():
     # Continuer avec tous les fichiers
     file_count = 0
     org_count = 0
+    with_url = 0
+    with_desc = 0
+    with_focus = 0
+
+    # En mode JSON Lines, les organisations sont écrites au fil de l'extraction
+    if args.jsonl:
+        output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\organizations_improved.jsonl'
+        jsonl_file = open(output_path, 'w', encoding='utf-8')
+    else:
+        output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\organizations_improved.json'
+        jsonl_file = None
 
     for root, dirs, files in os.walk(base_path):
         for file in files:
@@ -133,16 +134,33 @@ def main():
                 elif 'FY2023' in root:
                     fiscal_year = 'FY2023'
 
-                orgs = extract_organizations_improved(file_path)
+                found = 0
+                start = time.perf_counter()
+                for org in iter_organizations_improved(file_path, args.rules):
+                    org['source_proposal'] = file
+                    org['fiscal_year'] = fiscal_year
+                    found += 1
+
+                    # Statistiques
+                    with_url += bool(org.get('url'))
+                    with_desc += bool(org.get('description') and len(org['description']) > 50)
+                    with_focus += bool(org.get('meeting_focus') and len(org['meeting_focus']) > 20)
+
+                    # En JSON Lines, chaque organisation part dès qu'elle est complète
+                    if jsonl_file:
+                        write_organizations_jsonl(jsonl_file, [org])
+                    else:
+                        all_organizations.append(org)
 
-                if orgs:
-                    print(f"{file}: {len(orgs)} orgs")
-                    org_count += len(orgs)
+                metrics.record_file(file_path, time.perf_counter() - start, organizations=found)
+                metrics.count('organizations', found)
+                org_count += found
+                progress.update(item=file_path)
 
-                    for org in orgs:
-                        org['source_proposal'] = file
-                        org['fiscal_year'] = fiscal_year
-                        all_organizations.append(org)
+    progress.finish()
+    metrics.count('with_url', with_url)
+    metrics.count('with_description', with_desc)
+    metrics.count('with_meeting_focus', with_focus)
 
     print()
     print("="*80)
@@ -151,21 +169,22 @@ def main():
     print("="*80)
 
     # Sauvegarder
-    output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\organizations_improved.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(all_organizations, f, indent=2, ensure_ascii=False)
+    if jsonl_file:
+        jsonl_file.close()
+        # Relu au fil de l'eau : les organisations ne sont pas gardées en mémoire
+        all_organizations = iter_organizations(output_path)
+    else:
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(all_organizations, f, indent=2, ensure_ascii=False)
+    write_snapshot(snapshot_path(output_path), all_organizations, 'organization')
 
     print(f"Sauvegarde: {output_path}")
 
-    # Statistiques
-    with_url = len([o for o in all_organizations if o.get('url')])
-    with_desc = len([o for o in all_organizations if o.get('description') and len(o['description']) > 50])
-    with_focus = len([o for o in all_organizations if o.get('meeting_focus') and len(o['meeting_focus']) > 20])
-
-    print()
-    print(f"Avec URL: {with_url} ({with_url/len(all_organizations)*100:.1f}%)")
-    print(f"Avec description: {with_desc} ({with_desc/len(all_organizations)*100:.1f}%)")
-    print(f"Avec meeting focus: {with_focus} ({with_focus/len(all_organizations)*100:.1f}%)")
+    if org_count:
+        print()
+        print(f"Avec URL: {with_url} ({with_url/org_count*100:.1f}%)")
+        print(f"Avec description: {with_desc} ({with_desc/org_count*100:.1f}%)")
+        print(f"Avec meeting focus: {with_focus} ({with_focus/org_count*100:.1f}%)")
 
 if __name__ == "__main__":
     main()
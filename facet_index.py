@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Index bitmap des facettes des ressources (thème, région, année fiscale,
+statut, actif)
+
+Chaque valeur de facette est associée à un ensemble de bits (entier Python)
+dont le bit i indique que la ressource i (ordre de database_resources.json)
+possède cette valeur. Les filtres sont des ET/OU bit à bit et les comptages
+de simples popcounts, sans reparcourir les ressources.
+
+Le fichier database_resources.facets.json (écrit par
+prepare_database_resources) stocke les ensembles en hexadécimal.
+
+Exemples :
+  python facet_index.py --fiscal-year FY2026 --theme Health --active
+  python facet_index.py --counts theme --fiscal-year FY2025
+"""
+
+import os
+import json
+import argparse
+
+FACETS_FILE = 'database_resources.facets.json'
+FACETS_VERSION = 1
+
+# Facette -> fonction qui renvoie les valeurs d'une ressource
+FACETS = {
+    'theme': lambda r: r.get('themes', []),
+    'region': lambda r: r.get('regions', []),
+    'fiscal_year': lambda r: [r.get('fiscal_year')],
+    'status': lambda r: [r.get('status')],
+    'is_active': lambda r: [bool(r.get('is_active'))],
+}
+
+
+def popcount(bits):
+    return bits.bit_count()
+
+
+def bits_from_rows(rows, count):
+    """Ensemble de bits à partir d'une liste de positions (en O(count))"""
+    buffer = bytearray((count + 7) // 8)
+    for row in rows:
+        buffer[row >> 3] |= 1 << (row & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def iter_bits(bits):
+    """Positions des bits à 1, par ordre croissant (parcours octet par octet)"""
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, 'little')
+    for byte_index, byte in enumerate(data):
+        while byte:
+            low = byte & -byte
+            yield byte_index * 8 + low.bit_length() - 1
+            byte ^= low
+
+
+class FacetIndex:
+    """Ensembles de bits par valeur de facette"""
+
+    def __init__(self, count=0, bitmaps=None, ids=None):
+        self.count = count
+        self.bitmaps = bitmaps or {facet: {} for facet in FACETS}
+        self.ids = ids or []
+
+    @property
+    def all(self):
+        return (1 << self.count) - 1
+
+    @classmethod
+    def from_resources(cls, resources):
+        """Construit l'index en un passage sur les ressources"""
+        rows = {facet: {} for facet in FACETS}
+        ids = []
+        for row, resource in enumerate(resources):
+            ids.append(resource.get('id'))
+            for facet, values in FACETS.items():
+                facet_rows = rows[facet]
+                for value in set(values(resource)):
+                    facet_rows.setdefault(value, []).append(row)
+
+        count = len(ids)
+        bitmaps = {facet: {value: bits_from_rows(positions, count) for value, positions in values.items()}
+                   for facet, values in rows.items()}
+        return cls(count, bitmaps, ids)
+
+    def add(self, row, resource):
+        """Ajoute la ressource à la position row (ajout en fin de liste)"""
+        bit = 1 << row
+        for facet, values in FACETS.items():
+            bitmaps = self.bitmaps[facet]
+            for value in set(values(resource)):
+                bitmaps[value] = bitmaps.get(value, 0) | bit
+        if row >= len(self.ids):
+            self.ids.extend([None] * (row + 1 - len(self.ids)))
+        self.ids[row] = resource.get('id')
+        self.count = max(self.count, row + 1)
+
+    def bitmap(self, facet, value):
+        """Ensemble des ressources ayant une valeur ; une liste de valeurs = OU"""
+        bitmaps = self.bitmaps[facet]
+        if isinstance(value, (list, tuple, set)):
+            bits = 0
+            for v in value:
+                bits |= bitmaps.get(v, 0)
+            return bits
+        return bitmaps.get(value, 0)
+
+    def query(self, exclude=None, **criteria):
+        """ET des critères (facette=valeur ou liste de valeurs), moins les exclusions
+
+        query(fiscal_year='FY2026', theme=['Health', 'Climate'], is_active=True,
+              exclude={'region': 'Global'})
+        """
+        bits = self.all
+        for facet, value in criteria.items():
+            if value is not None:
+                bits &= self.bitmap(facet, value)
+        for facet, value in (exclude or {}).items():
+            bits &= ~self.bitmap(facet, value)
+        return bits & self.all
+
+    def count_matching(self, exclude=None, **criteria):
+        """Nombre de ressources correspondant aux critères (popcount seul)"""
+        return popcount(self.query(exclude=exclude, **criteria))
+
+    def facet_counts(self, facet, exclude=None, **criteria):
+        """Comptage par valeur d'une facette parmi les ressources filtrées"""
+        base = self.query(exclude=exclude, **criteria)
+        counts = {}
+        for value, bits in self.bitmaps[facet].items():
+            count = popcount(bits & base)
+            if count:
+                counts[value] = count
+        return counts
+
+    def rows(self, bits):
+        """Positions des ressources d'un ensemble"""
+        return list(iter_bits(bits))
+
+    def resource_ids(self, bits):
+        return [self.ids[row] for row in iter_bits(bits)]
+
+    def to_dict(self):
+        return {
+            'version': FACETS_VERSION,
+            'count': self.count,
+            'ids': self.ids,
+            # Les clés JSON sont des chaînes : is_active est stocké en 'true'/'false'
+            'bitmaps': {facet: {json.dumps(value) if not isinstance(value, str) else value: format(bits, 'x')
+                                for value, bits in bitmaps.items()}
+                        for facet, bitmaps in self.bitmaps.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != FACETS_VERSION:
+            raise ValueError(f"Version d'index non supportee: {data.get('version')}")
+        bitmaps = {}
+        for facet, values in data['bitmaps'].items():
+            decoded = {}
+            for key, hex_bits in values.items():
+                value = json.loads(key) if facet == 'is_active' or key == 'null' else key
+                decoded[value] = int(hex_bits, 16)
+            bitmaps[facet] = decoded
+        return cls(data['count'], bitmaps, data['ids'])
+
+    def save(self, path=FACETS_FILE):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=FACETS_FILE):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls.from_dict(json.load(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requete sur l'index bitmap des facettes")
+    parser.add_argument('--index', default=FACETS_FILE)
+    parser.add_argument('--fiscal-year', action='append')
+    parser.add_argument('--status', action='append')
+    parser.add_argument('--theme', action='append')
+    parser.add_argument('--region', action='append')
+    parser.add_argument('--active', action='store_true', help="Seulement les ressources actives")
+    parser.add_argument('--counts', choices=sorted(FACETS), help="Comptage par valeur de cette facette")
+    args = parser.parse_args()
+
+    index = FacetIndex.load(args.index)
+    criteria = {
+        'fiscal_year': args.fiscal_year,
+        'status': args.status,
+        'theme': args.theme,
+        'region': args.region,
+        'is_active': True if args.active else None
+    }
+
+    if args.counts:
+        counts = index.facet_counts(args.counts, **criteria)
+        for value, count in sorted(counts.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {value}: {count}")
+    else:
+        bits = index.query(**criteria)
+        for resource_id in index.resource_ids(bits):
+            print(f"  {resource_id}")
+        print(f"\n{popcount(bits)} ressources sur {index.count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -76,6 +76,7 @@ function mapIVLPToResource(ivlp: IVLPResource, userId: string) {
     accessibility: `Document Type: ${ivlp.metadata.document_type.toUpperCase()} - Priority: ${ivlp.priority}`,
     is_active: ivlp.is_active,
     created_by: userId,
+    import_source: 'ivlp',
     // Métadonnées supplémentaires stockées en JSON
     metadata: {
       ivlp_id: ivlp.id,
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Mesures d'exécution communes aux scripts du pipeline
+
+Chaque processus dispose d'un collecteur partagé (get_metrics) qui
+enregistre :
+  - le temps réel et CPU de chaque étape (metrics.stage('nom'))
+  - le temps de traitement et la taille de chaque fichier
+  - des compteurs libres (organisations extraites, thèmes, ...)
+  - le pic de mémoire résidente et les succès/échecs du cache .docx
+Les scripts exposent --metrics FICHIER.json et --profile FICHIER.prof
+(cProfile) via add_arguments(). ProgressReporter remplace les affichages
+ligne par ligne dans les boucles sur les fichiers.
+"""
+
+import os
+import sys
+import json
+import time
+import cProfile
+import contextlib
+from collections import Counter
+from datetime import datetime
+
+# Un fichier est signalé comme anormalement lent au-delà de N fois la médiane
+SLOW_FACTOR = 5.0
+SLOWEST_COUNT = 10
+PROGRESS_INTERVAL = 2.0  # secondes
+
+
+def peak_rss_bytes(children=False):
+    """Pic de mémoire résidente du processus (ou de ses enfants), None si inconnu"""
+    try:
+        import resource
+    except ImportError:
+        return _peak_rss_windows() if not children else None
+
+    who = resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF
+    peak = resource.getrusage(who).ru_maxrss
+    # ru_maxrss est en octets sous macOS, en kilo-octets ailleurs
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def _peak_rss_windows():
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+class Metrics:
+    """Collecteur de mesures d'un script"""
+
+    def __init__(self, name=None):
+        self.name = name or os.path.splitext(os.path.basename(sys.argv[0] or 'python'))[0]
+        self.started = datetime.now()
+        self.stages = {}
+        self.files = []
+        self.counters = Counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Mesure le temps réel et CPU d'un bloc (cumulé si l'étape se répète)"""
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            stats = self.stages.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0, 'calls': 0})
+            stats['wall_s'] += time.perf_counter() - wall_start
+            stats['cpu_s'] += time.process_time() - cpu_start
+            stats['calls'] += 1
+
+    def record_file(self, path, seconds, **extra):
+        """Enregistre le traitement d'un fichier (durée, taille, informations libres)"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = None
+        self.files.append({'path': path, 'seconds': round(seconds, 4), 'bytes': size, **extra})
+
+    def count(self, name, step=1):
+        self.counters[name] += step
+
+    def slow_files(self):
+        """(fichiers les plus lents, fichiers anormalement lents par rapport à la médiane)"""
+        by_time = sorted(self.files, key=lambda f: f['seconds'], reverse=True)
+        if not by_time:
+            return [], []
+        median = by_time[len(by_time) // 2]['seconds']
+        outliers = [f for f in by_time if median and f['seconds'] > SLOW_FACTOR * median]
+        return by_time[:SLOWEST_COUNT], outliers
+
+    def to_dict(self):
+        slowest, outliers = self.slow_files()
+        result = {
+            'script': self.name,
+            'started': self.started.isoformat(),
+            'finished': datetime.now().isoformat(),
+            'stages': {name: {'wall_s': round(s['wall_s'], 4), 'cpu_s': round(s['cpu_s'], 4),
+                              'calls': s['calls']} for name, s in self.stages.items()},
+            'counters': dict(self.counters),
+            'peak_rss_bytes': peak_rss_bytes(),
+            'peak_rss_children_bytes': peak_rss_bytes(children=True),
+            'files': {
+                'count': len(self.files),
+                'total_seconds': round(sum(f['seconds'] for f in self.files), 4),
+                'total_bytes': sum(f['bytes'] or 0 for f in self.files),
+                'slowest': slowest,
+                'outliers': outliers,
+                'all': self.files
+            }
+        }
+
+        # Le cache .docx n'est interrogé que s'il a déjà été chargé
+        docx_cache = sys.modules.get('docx_cache')
+        cache = getattr(docx_cache, '_default_cache', None)
+        if cache is not None:
+            result['docx_cache'] = {'hits': cache.hits, 'misses': cache.misses}
+        return result
+
+    def write(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def print_summary(self):
+        """Affiche les étapes et les fichiers anormalement lents"""
+        print(f"\nMesures ({self.name}):")
+        for name, s in self.stages.items():
+            print(f"  {name:<24} {s['wall_s']:8.2f}s reel  {s['cpu_s']:8.2f}s CPU")
+        _, outliers = self.slow_files()
+        for f in outliers[:SLOWEST_COUNT]:
+            print(f"  LENT: {os.path.basename(f['path'])} ({f['seconds']:.2f}s)")
+
+
+_default_metrics = None
+
+
+def get_metrics():
+    """Renvoie le collecteur partagé du processus courant"""
+    global _default_metrics
+    if _default_metrics is None:
+        _default_metrics = Metrics()
+    return _default_metrics
+
+
+class ProgressReporter:
+    """Affiche l'avancement au plus une fois toutes les `interval` secondes"""
+
+    def __init__(self, total, label='Fichiers', interval=PROGRESS_INTERVAL):
+        self.total = total
+        self.label = label
+        self.interval = interval
+        self.done = 0
+        self.started = time.perf_counter()
+        self.last_print = self.started
+
+    def update(self, step=1, item=None):
+        self.done += step
+        now = time.perf_counter()
+        if now - self.last_print >= self.interval or self.done == self.total:
+            self._print(now, item)
+
+    def finish(self):
+        """Affiche la dernière ligne si elle n'a pas déjà été affichée"""
+        if self.done != self.total:
+            self._print(time.perf_counter())
+
+    def _print(self, now, item=None):
+        self.last_print = now
+        elapsed = now - self.started
+        rate = self.done / elapsed if elapsed else 0.0
+        suffix = f" - {os.path.basename(item)}" if item else ''
+        total = f"/{self.total}" if self.total else ''
+        print(f"  {self.label}: {self.done}{total} ({rate:.1f}/s){suffix}", flush=True)
+
+
+def add_arguments(parser):
+    """Ajoute --metrics et --profile à un parseur argparse"""
+    parser.add_argument('--metrics', metavar='FICHIER',
+                        help="Ecrire les mesures d'execution (JSON)")
+    parser.add_argument('--profile', metavar='FICHIER',
+                        help="Profiler l'execution avec cProfile (fichier .prof)")
+
+
+@contextlib.contextmanager
+def instrumented(args):
+    """Exécute le bloc sous cProfile si demandé, puis écrit les mesures"""
+    metrics = get_metrics()
+    profiler = cProfile.Profile() if getattr(args, 'profile', None) else None
+    if profiler:
+        profiler.enable()
+    try:
+        with metrics.stage('total'):
+            yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profil cProfile: {args.profile}")
+        if getattr(args, 'metrics', None):
+            metrics.write(args.metrics)
+            metrics.print_summary()
+            print(f"Mesures: {args.metrics}")
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Détection de mots-clés multi-tables en un seul passage sur le texte
+
+Les tables de mots-clés (thèmes, régions...) sont compilées une seule fois
+dans un trie de mots. Le texte est découpé en mots puis parcouru une seule
+fois : chaque position avance dans le trie, ce qui trouve toutes les
+occurrences (y compris imbriquées, ex. "renewable energy" et "energy") en
+respectant les limites de mots ("oil" ne correspond plus à "toil").
+"""
+
+import re
+from collections import Counter
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Formes plurielles acceptées pour le dernier mot d'un mot-clé
+PLURAL_SUFFIXES = ('', 's', 'es')
+
+
+def tokenize(text):
+    """Découpe un texte en mots minuscules"""
+    return WORD_PATTERN.findall(text.lower())
+
+
+class KeywordMatcher:
+    """Trie de mots compilé à partir de tables {table: {catégorie: [mots-clés]}}"""
+
+    def __init__(self, tables):
+        self.tables = tables
+        self.root = {}
+        self.max_depth = 0
+
+        for table, categories in tables.items():
+            for category, keywords in categories.items():
+                for keyword in keywords:
+                    self._add(tokenize(keyword), (table, category))
+
+    def _add(self, words, hit):
+        if not words:
+            return
+        self.max_depth = max(self.max_depth, len(words))
+        node = self.root
+        for word in words[:-1]:
+            node = node.setdefault(word, ({}, []))[0]
+        for suffix in PLURAL_SUFFIXES:
+            hits = node.setdefault(words[-1] + suffix, ({}, []))[1]
+            if hit not in hits:
+                hits.append(hit)
+
+    def count(self, text):
+        """Compte les occurrences par table et catégorie : {table: Counter}"""
+        counts = {table: Counter() for table in self.tables}
+        words = tokenize(text)
+        n = len(words)
+
+        for i in range(n):
+            node = self.root
+            for j in range(i, min(n, i + self.max_depth)):
+                entry = node.get(words[j])
+                if entry is None:
+                    break
+                node, hits = entry
+                for table, category in hits:
+                    counts[table][category] += 1
+
+        return counts
+
+    def ranked(self, text):
+        """Renvoie {table: [catégories triées par nombre d'occurrences]}, et les comptes
+
+        À égalité, l'ordre de déclaration des catégories dans la table est conservé.
+        """
+        counts = self.count(text)
+        ranked = {}
+        for table, categories in self.tables.items():
+            order = {category: idx for idx, category in enumerate(categories)}
+            ranked[table] = sorted(counts[table], key=lambda c: (-counts[table][c], order[c]))
+        return ranked, counts
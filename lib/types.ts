@@ -213,6 +213,7 @@ export interface Resource {
   accessibility: string | null;
   is_active: boolean;
   created_by: string;
+  import_source?: string | null;
   created_at: string;
   updated_at: string;
 }
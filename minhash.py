@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Signatures MinHash et index LSH pour repérer les propositions dont le
+contenu est presque identique (même si le titre a changé)
+
+Le texte est découpé en shingles de SHINGLE_SIZE mots ; la signature
+MinHash estime la similarité de Jaccard entre deux ensembles de shingles.
+Elle est calculée par hachage à permutation unique : chaque shingle n'est
+haché qu'une fois et réparti dans l'une des NUM_PERM cases, dont on garde
+le minimum ; les cases vides empruntent la valeur de la case non vide
+suivante (densification). L'index LSH (bandes de lignes de la signature)
+ne compare que les documents qui partagent au moins une bande, au lieu de
+toutes les paires.
+"""
+
+import hashlib
+from collections import defaultdict
+
+from keyword_matcher import tokenize
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+JACCARD_THRESHOLD = 0.8
+
+# Valeurs de case sur 40 bits ; une case vide reçoit valeur + distance * VALUE_RANGE
+VALUE_RANGE = 1 << 40
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """Ensemble des shingles (suites de `size` mots) d'un texte"""
+    words = tokenize(text or '')
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _hash(shingle):
+    return int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def signature(text, num_perm=NUM_PERM):
+    """Signature MinHash d'un texte (liste de num_perm entiers), None si vide"""
+    bins = [None] * num_perm
+    for shingle in shingles(text):
+        h = _hash(shingle)
+        position, value = h % num_perm, (h // num_perm) % VALUE_RANGE
+        if bins[position] is None or value < bins[position]:
+            bins[position] = value
+
+    if all(value is None for value in bins):
+        return None
+
+    # Densification : case vide -> case non vide suivante (circulairement)
+    sig = []
+    for position in range(num_perm):
+        distance = 0
+        while bins[(position + distance) % num_perm] is None:
+            distance += 1
+        sig.append(bins[(position + distance) % num_perm] + distance * VALUE_RANGE)
+    return sig
+
+
+def estimate_jaccard(sig1, sig2):
+    """Similarité de Jaccard estimée : part des positions égales"""
+    return sum(1 for x, y in zip(sig1, sig2) if x == y) / len(sig1)
+
+
+def lsh_params(threshold, num_perm=NUM_PERM):
+    """Choisit (bandes, lignes) dont le seuil (1/b)^(1/r) est le plus proche de threshold
+
+    On préfère un seuil LSH légèrement inférieur au seuil demandé, pour
+    limiter les faux négatifs (les candidats sont ensuite vérifiés).
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        lsh_threshold = (1 / bands) ** (1 / rows)
+        error = abs(lsh_threshold - threshold) + (0 if lsh_threshold <= threshold else 0.1)
+        if best is None or error < best[0]:
+            best = (error, bands, rows)
+    return best[1], best[2]
+
+
+class LSHIndex:
+    """Index LSH de signatures MinHash"""
+
+    def __init__(self, threshold=JACCARD_THRESHOLD, num_perm=NUM_PERM):
+        self.threshold = threshold
+        self.bands, self.rows = lsh_params(threshold, num_perm)
+        self.buckets = [defaultdict(list) for _ in range(self.bands)]
+        self.signatures = {}
+
+    def _band_keys(self, sig):
+        for band in range(self.bands):
+            yield band, tuple(sig[band * self.rows:(band + 1) * self.rows])
+
+    def add(self, key, sig):
+        self.signatures[key] = sig
+        for band, band_key in self._band_keys(sig):
+            self.buckets[band][band_key].append(key)
+
+    def candidate_pairs(self):
+        """Paires (clé1, clé2) partageant au moins une bande"""
+        pairs = set()
+        for bucket in self.buckets:
+            for keys in bucket.values():
+                for pos, key1 in enumerate(keys):
+                    for key2 in keys[pos + 1:]:
+                        pairs.add((key1, key2))
+        return pairs
+
+    def similar_pairs(self):
+        """Paires candidates dont la similarité estimée atteint le seuil"""
+        result = []
+        for key1, key2 in self.candidate_pairs():
+            sim = estimate_jaccard(self.signatures[key1], self.signatures[key2])
+            if sim >= self.threshold:
+                result.append((key1, key2, sim))
+        return result
+
+    def clusters(self):
+        """Groupes de clés reliées par des paires similaires (composantes connexes)"""
+        parent = {key: key for key in self.signatures}
+
+        def find(key):
+            while parent[key] != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        pairs = self.similar_pairs()
+        for key1, key2, _ in pairs:
+            root1, root2 = find(key1), find(key2)
+            if root1 != root2:
+                parent[root2] = root1
+
+        groups = defaultdict(list)
+        for key in self.signatures:
+            groups[find(key)].append(key)
+        return [members for members in groups.values() if len(members) > 1], pairs
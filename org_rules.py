@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Moteur de règles commun aux extracteurs d'organisations
+
+Les documents sont lus une seule fois sous forme d'événements de
+paragraphes (texte + gras, niveau de titre, cibles des hyperliens ; voir
+docx_reader.paragraph_event). Chaque profil de PROFILES décrit de façon
+déclarative comment reconnaître une organisation :
+  - 'ivlp'     : la ligne qui précède une URL est le nom
+                 (extract_organizations_from_ivlp)
+  - 'improved' : une URL ouvre un bloc, le premier paragraphe court qui
+                 suit est le nom (extract_orgs_improved)
+  - 'styled'   : un paragraphe en gras ou un titre suivi d'une URL (ou
+                 portant lui-même un hyperlien) est le nom ; à défaut,
+                 règle de 'improved'
+Les profils sont compilés une fois (expressions régulières, préfixes,
+prédicats), puis plusieurs profils peuvent être évalués dans le même
+passage sur les événements (extract_profiles).
+
+Exemple :
+  python org_rules.py --profiles ivlp,improved,styled
+"""
+
+import os
+import re
+import argparse
+
+URL_PATTERN = re.compile(r'https?://[^\s]+')
+
+PROFILES = {
+    'ivlp': {
+        'unit': 'line',
+        'clean': False,
+        'name_before_url': 'any',
+        'url_starts_block': False,
+        'url_max_length': None,
+        'url_value': 'line',
+        'ignore_prefixes': ('Meeting Focus:', 'Why '),
+    },
+    'improved': {
+        'unit': 'paragraph',
+        'clean': True,
+        'name_before_url': None,
+        'url_starts_block': True,
+        'url_max_length': 200,
+        'url_value': 'match',
+        'name_after_url': {'max_length': 200, 'max_spaces': 15},
+        'meeting_focus': r'Meeting [Ff]ocus:',
+        'skip_prefixes': ('Why ', 'Project ', '_____'),
+    },
+    'styled': {
+        'unit': 'paragraph',
+        'clean': True,
+        'name_before_url': 'styled',
+        'linked_name': True,
+        'url_starts_block': True,
+        'url_max_length': 200,
+        'url_value': 'link',
+        'name_after_url': {'max_length': 200, 'max_spaces': 15},
+        'meeting_focus': r'Meeting [Ff]ocus:',
+        'skip_prefixes': ('Why ', 'Project ', '_____'),
+    },
+}
+
+
+def clean_text(text):
+    """Nettoie le texte"""
+    if not text:
+        return ''
+    return text.replace('\u2019', "'").replace('\u2013', '-').replace('\u201c', '"').replace('\u201d', '"').strip()
+
+
+def is_styled(unit):
+    """Paragraphe mis en valeur : gras ou titre"""
+    return unit.get('bold', False) or unit.get('heading') is not None
+
+
+def web_links(unit):
+    """Cibles http(s) des hyperliens d'une unité (hors mailto:, ...)"""
+    return [link for link in unit.get('links', ()) if link.startswith(('http://', 'https://'))]
+
+
+NAME_PREDICATES = {
+    'any': lambda unit: True,
+    'styled': is_styled,
+}
+
+
+class RuleSet:
+    """Profil compilé"""
+
+    def __init__(self, name, profile):
+        self.name = name
+        self.split_lines = profile.get('unit') == 'line'
+        self.clean = clean_text if profile.get('clean') else str.strip
+        self.name_before_url = NAME_PREDICATES.get(profile.get('name_before_url'))
+        self.linked_name = profile.get('linked_name', False)
+        self.url_starts_block = profile.get('url_starts_block', False)
+        self.url_max_length = profile.get('url_max_length')
+        self.url_value = profile.get('url_value', 'match')
+        after = profile.get('name_after_url')
+        self.name_max_length = after['max_length'] if after else None
+        self.name_max_spaces = after['max_spaces'] if after else None
+        focus = profile.get('meeting_focus')
+        self.focus_pattern = re.compile(focus) if focus else None
+        self.focus_prefix = re.compile(focus + r'\s*') if focus else None
+        self.ignore_prefixes = tuple(profile.get('ignore_prefixes', ()))
+        self.skip_prefixes = tuple(profile.get('skip_prefixes', ()))
+
+    def units(self, event):
+        """Unités (dictionnaires texte + style) produites par un événement de paragraphe"""
+        if not self.split_lines:
+            text = self.clean(event['text'])
+            if text:
+                yield dict(event, text=text)
+            return
+        if event['text'].strip():
+            for line in event['text'].split('\n'):
+                yield dict(event, text=line.strip())
+
+    def url_match(self, unit):
+        """URL d'une unité qui peut ouvrir ou compléter une organisation, sinon None"""
+        text = unit['text']
+        if self.url_max_length is not None and len(text) >= self.url_max_length:
+            return None
+        if self.url_value == 'link':
+            links = web_links(unit)
+            if links:
+                return links[0]
+        match = URL_PATTERN.search(text)
+        if match is None:
+            return None
+        return text if self.url_value == 'line' else match.group(0)
+
+
+def compile_profile(name):
+    return RuleSet(name, PROFILES[name])
+
+
+class OrganizationMatcher:
+    """Applique un profil compilé à un flux d'événements (une unité d'avance)"""
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.current = None
+        self.description = []
+        self.collecting = False
+        self.pending = None
+
+    def _finish(self):
+        org = self.current
+        self.current = None
+        if org and org.get('name'):
+            org['description'] = ' '.join(self.description)
+            return org
+        return None
+
+    def _start(self, name, url):
+        org = self._finish()
+        self.current = {'name': name, 'url': url, 'description': '', 'meeting_focus': ''}
+        self.description = []
+        self.collecting = True
+        return org
+
+    def _process(self, unit, next_unit):
+        """Traite une unité ; renvoie (organisation terminée ou None, unité suivante consommée)"""
+        rules = self.rules
+        text = unit['text']
+        if not text or text.startswith(rules.ignore_prefixes):
+            return None, False
+
+        # Nom suivi d'une URL
+        if rules.name_before_url and next_unit is not None and rules.name_before_url(unit):
+            url = rules.url_match(next_unit)
+            if url is not None:
+                return self._start(text, url), True
+
+        # Nom mis en valeur qui porte lui-même le lien
+        if rules.linked_name and is_styled(unit) and web_links(unit) and not URL_PATTERN.search(text):
+            return self._start(text, web_links(unit)[0]), False
+
+        # URL qui ouvre un bloc (nom cherché dans les paragraphes suivants)
+        if rules.url_starts_block:
+            url = rules.url_match(unit)
+            if url is not None:
+                return self._start('', url), False
+
+        if self.current is None:
+            return None, False
+
+        # Nom : premier paragraphe court après l'URL
+        if (rules.name_max_length and not self.current['name']
+                and len(text) < rules.name_max_length and text.count(' ') < rules.name_max_spaces):
+            self.current['name'] = text
+            return None, False
+
+        if rules.focus_pattern and rules.focus_pattern.search(text):
+            self.current['meeting_focus'] = clean_text(rules.focus_prefix.sub('', text))
+            self.collecting = False
+            return None, False
+
+        if self.collecting and not text.startswith(rules.skip_prefixes):
+            self.description.append(text)
+        return None, False
+
+    def feed(self, event):
+        """Ajoute un événement de paragraphe ; produit les organisations terminées"""
+        for unit in self.rules.units(event):
+            if self.pending is None:
+                self.pending = unit
+                continue
+            org, consumed = self._process(self.pending, unit)
+            self.pending = None if consumed else unit
+            if org:
+                yield org
+
+    def close(self):
+        """Fin du document ; produit les dernières organisations"""
+        if self.pending is not None:
+            org, _ = self._process(self.pending, None)
+            self.pending = None
+            if org:
+                yield org
+        org = self._finish()
+        if org:
+            yield org
+
+
+_compiled = {}
+
+
+def get_rules(profile):
+    if profile not in _compiled:
+        _compiled[profile] = compile_profile(profile)
+    return _compiled[profile]
+
+
+def iter_profile_organizations(file_path, profile):
+    """Organisations d'un document selon un profil, au fil de la lecture"""
+    from docx_cache import read_paragraph_events
+
+    matcher = OrganizationMatcher(get_rules(profile))
+    for event in read_paragraph_events(file_path):
+        yield from matcher.feed(event)
+    yield from matcher.close()
+
+
+def extract_profiles(file_path, profiles):
+    """Organisations d'un document pour plusieurs profils, en un seul passage
+
+    Renvoie {profil: [organisations]}.
+    """
+    from docx_cache import read_paragraph_events
+
+    matchers = {profile: OrganizationMatcher(get_rules(profile)) for profile in profiles}
+    results = {profile: [] for profile in profiles}
+    for event in read_paragraph_events(file_path):
+        for profile, matcher in matchers.items():
+            results[profile].extend(matcher.feed(event))
+    for profile, matcher in matchers.items():
+        results[profile].extend(matcher.close())
+    return results
+
+
+def main():
+    from analyze_proposals import list_proposal_files
+
+    parser = argparse.ArgumentParser(description="Comparaison des profils d'extraction d'organisations")
+    parser.add_argument('--root', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Ressource'))
+    parser.add_argument('--profiles', default=','.join(PROFILES),
+                        help="Profils a evaluer (separes par des virgules)")
+    args = parser.parse_args()
+
+    profiles = args.profiles.split(',')
+    totals = {profile: [0, 0, 0] for profile in profiles}
+    for file_path in list_proposal_files(args.root):
+        for profile, organizations in extract_profiles(file_path, profiles).items():
+            totals[profile][0] += len(organizations)
+            totals[profile][1] += sum(1 for org in organizations if org['description'])
+            totals[profile][2] += sum(1 for org in organizations if org['meeting_focus'])
+
+    print(f"{'Profil':<10} {'Organisations':>14} {'Avec description':>17} {'Avec focus':>11}")
+    for profile, (count, with_description, with_focus) in totals.items():
+        print(f"{profile:<10} {count:>14} {with_description:>17} {with_focus:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Point d'entrée unique du pipeline des ressources IVLP
+
+Les étapes analyze -> prepare -> detect / clean forment un graphe : chaque
+étape reçoit directement les objets Python de l'étape précédente, sans
+réécrire ni relire de gros fichiers JSON intermédiaires. Une étape dont
+les entrées (fichiers de Ressource/ et code des étapes amont) n'ont pas
+changé depuis la dernière exécution est sautée, son artefact sur disque
+étant réutilisé. Les modules lourds (lecture .docx) ne sont importés que
+si une étape doit réellement s'exécuter.
+
+Exemples :
+  python pipeline.py run-all
+  python pipeline.py detect --root /chemin/vers/MVPSandiegodiplo
+  python pipeline.py run-all --force --keep-intermediate
+"""
+
+import os
+import io
+import json
+import hashlib
+import argparse
+import contextlib
+from datetime import datetime
+
+from instrumentation import get_metrics, add_arguments, instrumented
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_FILE = '.pipeline_state.json'
+
+# Artefacts finaux (relatifs à --root)
+INVENTORY_FILE = 'proposals_inventory.json'
+RESOURCES_FILE = 'database_resources.json'
+REPORT_FILE = 'duplicates_report.json'
+CLEANED_FILE = 'database_resources_cleaned.json'
+# Sorties dérivées de RESOURCES_FILE (prepare_database_resources.write_derived_outputs)
+STORE_DIR = 'database_resources.columns'
+FACETS_FILE = 'database_resources.facets.json'
+SNAPSHOT_FILE = 'database_resources.snap'
+
+
+def source_fingerprint(*module_files):
+    """Empreinte du code source des modules d'une étape"""
+    digest = hashlib.sha256()
+    for name in module_files:
+        with open(os.path.join(PROJECT_DIR, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_json(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_json(path, data):
+    """Écrit un artefact JSON de façon atomique"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+class Stage:
+    """Étape du pipeline
+
+    run(context, *entrées) -> valeur ; artifact : fichier (relatif à --root)
+    où la valeur est matérialisée, ou None pour une étape purement en mémoire.
+    outputs : autres fichiers écrits par l'étape ; l'étape n'est sautée que
+    s'ils existent tous.
+    """
+
+    def __init__(self, name, deps, modules, run, artifact=None, outputs=()):
+        self.name = name
+        self.deps = deps
+        self.modules = modules
+        self.run = run
+        self.artifact = artifact
+        self.outputs = list(outputs)
+
+
+class Pipeline:
+    """Exécute les étapes à la demande, en mémoire, avec saut des étapes inchangées"""
+
+    def __init__(self, root, stages, force=False, workers=None, keep_intermediate=False, quiet=False):
+        self.root = root
+        self.stages = {stage.name: stage for stage in stages}
+        self.force = force
+        self.workers = workers
+        self.keep_intermediate = keep_intermediate
+        self.quiet = quiet
+        self.values = {}
+        self.fingerprints = {}
+        self.report = {}
+        self._manifest = None
+
+        state_path = os.path.join(root, STATE_FILE)
+        self.state = load_json(state_path) if os.path.exists(state_path) else {}
+        self.state.setdefault('stages', {})
+
+    @property
+    def ressource_path(self):
+        return os.path.join(self.root, 'Ressource')
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def manifest(self):
+        """Manifeste des fichiers de Ressource/ (calculé une fois par exécution)"""
+        from analyze_proposals import list_proposal_files, build_manifest
+
+        if self._manifest is None:
+            self._manifest = build_manifest(list_proposal_files(self.ressource_path),
+                                            previous=self.state.get('manifest'))
+            self.state['manifest'] = self._manifest
+        return self._manifest
+
+    def input_fingerprint(self):
+        """Empreinte des fichiers de Ressource/ (via le manifeste de analyze_proposals)"""
+        manifest = self.manifest()
+        digest = hashlib.sha256()
+        for path in sorted(manifest):
+            digest.update(f"{os.path.relpath(path, self.ressource_path)}\0{manifest[path]['hash']}\n".encode('utf-8'))
+        return digest.hexdigest()
+
+    def fingerprint(self, name):
+        """Empreinte d'une étape : son code + les empreintes de ses dépendances"""
+        if name not in self.fingerprints:
+            stage = self.stages[name]
+            digest = hashlib.sha256(name.encode('utf-8'))
+            digest.update(source_fingerprint(*stage.modules).encode('utf-8'))
+            if not stage.deps:
+                digest.update(self.input_fingerprint().encode('utf-8'))
+            for dep in stage.deps:
+                digest.update(self.fingerprint(dep).encode('utf-8'))
+            self.fingerprints[name] = digest.hexdigest()
+        return self.fingerprints[name]
+
+    def is_fresh(self, name):
+        stage = self.stages[name]
+        artifact = stage.artifact
+        return (not self.force and artifact is not None
+                and all(os.path.exists(self.path(output)) for output in [artifact] + stage.outputs)
+                and self.state['stages'].get(name) == self.fingerprint(name))
+
+    def value(self, name, materialize=True):
+        """Renvoie la sortie d'une étape, en l'exécutant si nécessaire"""
+        if name in self.values:
+            return self.values[name]
+
+        stage = self.stages[name]
+        if self.is_fresh(name):
+            self.report[name] = 'skipped'
+            value = load_json(self.path(stage.artifact))
+        else:
+            inputs = [self.value(dep, materialize=self.keep_intermediate) for dep in stage.deps]
+            print(f"[{name}] execution...")
+            started = datetime.now()
+            with get_metrics().stage(name):
+                if self.quiet:
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        value = stage.run(self, *inputs)
+                else:
+                    value = stage.run(self, *inputs)
+            elapsed = (datetime.now() - started).total_seconds()
+            self.report[name] = f"ran in {elapsed:.2f}s"
+
+            if stage.artifact and materialize:
+                save_json(self.path(stage.artifact), value)
+                self.state['stages'][name] = self.fingerprint(name)
+
+        self.values[name] = value
+        return value
+
+    def run(self, targets):
+        for target in targets:
+            self.value(target)
+        save_json(self.path(STATE_FILE), self.state)
+        return self.report
+
+
+# =============================================
+# ÉTAPES
+# =============================================
+
+def run_analyze(pipeline):
+    from analyze_proposals import list_proposal_files, analyze_files, sort_proposals
+    return sort_proposals(analyze_files(list_proposal_files(pipeline.ressource_path),
+                                        workers=pipeline.workers))
+
+
+def run_prepare(pipeline, proposals):
+    from analyze_proposals import manifest_fingerprint, drop_unreadable
+    from prepare_database_resources import format_for_database, create_summary, write_derived_outputs
+
+    # Même empreinte que analyze_proposals : les fichiers illisibles n'y figurent pas
+    manifest = dict(pipeline.manifest())
+    drop_unreadable(manifest, list(manifest), {p['file_path'] for p in proposals})
+
+    resources = format_for_database(proposals)
+    data = {
+        'summary': create_summary(resources),
+        'resources': resources,
+        'last_updated': datetime.now().isoformat(),
+        'data_source': pipeline.ressource_path,
+        'manifest_fingerprint': manifest_fingerprint(manifest)
+    }
+    write_derived_outputs(pipeline.path(RESOURCES_FILE), resources, data['summary'])
+    return data
+
+
+def run_detect(pipeline, proposals, data):
+    from detect_duplicates import detect_duplicates, body_signatures, MEMO_FILE
+    return detect_duplicates(resources=data['resources'], report_path=None,
+                             memo_path=pipeline.path(MEMO_FILE), signatures=body_signatures(proposals))
+
+
+def run_clean(pipeline, data):
+    from clean_and_verify import clean_duplicates
+    cleaned = clean_duplicates(data=data, output_path=None)
+    cleaned['data_source'] = data.get('data_source', pipeline.ressource_path)
+    return cleaned
+
+
+STAGES = [
+    Stage('analyze', [], ['analyze_proposals.py', 'keyword_matcher.py', 'minhash.py', 'docx_cache.py', 'docx_reader.py'],
+          run_analyze, artifact=INVENTORY_FILE),
+    Stage('prepare', ['analyze'], ['prepare_database_resources.py', 'resource_store.py', 'facet_index.py',
+                                   'snapshot.py'],
+          run_prepare, artifact=RESOURCES_FILE, outputs=[STORE_DIR, FACETS_FILE, SNAPSHOT_FILE]),
+    Stage('detect', ['analyze', 'prepare'], ['detect_duplicates.py', 'minhash.py', 'keyword_matcher.py'],
+          run_detect, artifact=REPORT_FILE),
+    Stage('clean', ['prepare'], ['clean_and_verify.py'],
+          run_clean, artifact=CLEANED_FILE),
+]
+
+COMMANDS = {
+    'analyze': ['analyze'],
+    'prepare': ['prepare'],
+    'detect': ['detect'],
+    'clean': ['clean'],
+    'run-all': ['prepare', 'detect', 'clean'],
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline des ressources IVLP")
+    parser.add_argument('command', choices=sorted(COMMANDS), help="Etape(s) a executer")
+    parser.add_argument('--root', default=PROJECT_DIR,
+                        help="Dossier du projet (contient Ressource/) ; defaut : dossier du script")
+    parser.add_argument('--force', action='store_true', help="Re-executer meme si rien n'a change")
+    parser.add_argument('--workers', type=int, default=None, help="Processus pour analyze")
+    parser.add_argument('--keep-intermediate', action='store_true',
+                        help="Ecrire aussi les artefacts intermediaires (ex. proposals_inventory.json)")
+    parser.add_argument('--verbose', action='store_true', help="Afficher la sortie detaillee des etapes")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    with instrumented(args):
+        run(args)
+
+
+def run(args):
+    pipeline = Pipeline(args.root, STAGES, force=args.force, workers=args.workers,
+                        keep_intermediate=args.keep_intermediate, quiet=not args.verbose)
+
+    # La commande d'une seule étape matérialise toujours sa propre sortie
+    report = pipeline.run(COMMANDS[args.command])
+
+    print("="*80)
+    print("PIPELINE TERMINE")
+    print("="*80)
+    for name in pipeline.stages:
+        if name in report:
+            print(f"  {name:<10} {report[name]}")
+    for name in COMMANDS[args.command]:
+        print(f"  -> {pipeline.path(pipeline.stages[name].artifact)}")
+
+
+if __name__ == "__main__":
+    main()
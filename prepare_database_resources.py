@@ -4,9 +4,16 @@ Script pour préparer les ressources pour la base de données du site
 avec vérification de l'actualité
 """
 
+import os
 import json
+import argparse
 from datetime import datetime
 
+from instrumentation import get_metrics, add_arguments, instrumented
+from resource_store import write_store
+from facet_index import FacetIndex
+from snapshot import write_snapshot, snapshot_path
+
 def determine_status(fiscal_year):
     """Détermine le statut d'actualité d'une proposition"""
     current_year = 2025  # Année actuelle (novembre 2025)
@@ -20,131 +27,333 @@ def determine_status(fiscal_year):
     else:
         return 'unknown'
 
+PRIORITY_MAP = {
+    'FY2026': 4,
+    'FY2025': 3,
+    'FY2024': 2,
+    'FY2023': 1
+}
+
+def build_resource(proposal, resource_id):
+    """Construit une ressource de base de données à partir d'une proposition"""
+    # Déterminer le statut
+    status = determine_status(proposal.get('fiscal_year', ''))
+
+    # Déterminer la priorité (plus récent = plus prioritaire)
+    priority = PRIORITY_MAP.get(proposal.get('fiscal_year', ''), 0)
+
+    return {
+        'id': resource_id,
+        'title': proposal.get('title', ''),
+        'description': proposal.get('text_preview', ''),
+        'type': 'IVLP Proposal',
+        'fiscal_year': proposal.get('fiscal_year', ''),
+        'status': status,
+        'priority': priority,
+        'themes': proposal.get('themes', []),
+        'regions': proposal.get('regions', []),
+        'file_path': proposal.get('file_path', ''),
+        'filename': proposal.get('filename', ''),
+        'created_date': datetime.now().isoformat(),
+        'is_active': status in ['current', 'upcoming'],  # Seules les propositions actuelles et à venir sont actives
+        'metadata': {
+            'years_mentioned': proposal.get('years_mentioned', []),
+            'document_type': 'docx' if proposal.get('file_path', '').endswith('.docx') else 'pdf'
+        }
+    }
+
+def make_resource_id(proposal, idx):
+    """Identifiant de ressource : IVLP-<année fiscale>-<numéro>"""
+    return f"IVLP-{proposal.get('fiscal_year', 'UNKNOWN')}-{idx:03d}"
+
 def format_for_database(proposals):
     """Formate les propositions pour la base de données"""
 
     resources = []
 
     for idx, proposal in enumerate(proposals, 1):
-        # Déterminer le statut
-        status = determine_status(proposal.get('fiscal_year', ''))
-
-        # Déterminer la priorité (plus récent = plus prioritaire)
-        priority_map = {
-            'FY2026': 4,
-            'FY2025': 3,
-            'FY2024': 2,
-            'FY2023': 1
-        }
-        priority = priority_map.get(proposal.get('fiscal_year', ''), 0)
-
         # Créer la ressource formatée
-        resource = {
-            'id': f"IVLP-{proposal.get('fiscal_year', 'UNKNOWN')}-{idx:03d}",
-            'title': proposal.get('title', ''),
-            'description': proposal.get('text_preview', ''),
-            'type': 'IVLP Proposal',
-            'fiscal_year': proposal.get('fiscal_year', ''),
-            'status': status,
-            'priority': priority,
-            'themes': proposal.get('themes', []),
-            'regions': proposal.get('regions', []),
-            'file_path': proposal.get('file_path', ''),
-            'filename': proposal.get('filename', ''),
-            'created_date': datetime.now().isoformat(),
-            'is_active': status in ['current', 'upcoming'],  # Seules les propositions actuelles et à venir sont actives
-            'metadata': {
-                'years_mentioned': proposal.get('years_mentioned', []),
-                'document_type': 'docx' if proposal.get('file_path', '').endswith('.docx') else 'pdf'
-            }
-        }
-
-        resources.append(resource)
+        resources.append(build_resource(proposal, make_resource_id(proposal, idx)))
 
     return resources
 
-def create_summary(resources):
-    """Crée un résumé des ressources"""
+def apply_delta(resources, delta, summary=None):
+    """Applique un delta d'inventaire (voir analyze_proposals) aux ressources existantes
+
+    Les ressources inchangées gardent leur identifiant ; une proposition
+    modifiée garde celui de sa version précédente ; les nouvelles reçoivent
+    le numéro suivant. Si summary (ResourceSummary) est fourni, il est mis à
+    jour au passage. Renvoie (ressources, delta de ressources).
+    """
+    removed_paths = set(delta.get('removed', []))
+    modified = {p['file_path']: p for p in delta.get('modified', [])}
+    known_paths = {resource['file_path'] for resource in resources}
+    # Proposition modifiée absente des ressources : traitée comme ajoutée
+    added = list(delta.get('added', [])) + [p for path, p in modified.items() if path not in known_paths]
+
+    updated = []
+    upserted = []
+    removed_ids = []
+    affected_titles = set()
+    next_idx = 1
 
-    summary = {
-        'total_resources': len(resources),
-        'by_status': {},
-        'by_fiscal_year': {},
-        'by_theme': {},
-        'by_region': {},
-        'active_count': 0,
-        'archived_count': 0
+    for resource in resources:
+        next_idx = max(next_idx, int(resource['id'].rsplit('-', 1)[-1]) + 1)
+        path = resource['file_path']
+
+        if path in removed_paths:
+            removed_ids.append(resource['id'])
+            affected_titles.add(resource['title'])
+            if summary is not None:
+                summary.remove(resource)
+        elif path in modified:
+            affected_titles.add(resource['title'])
+            new_resource = build_resource(modified[path], resource['id'])
+            new_resource['created_date'] = resource.get('created_date', new_resource['created_date'])
+            updated.append(new_resource)
+            upserted.append(new_resource)
+            if summary is not None:
+                summary.update(resource, new_resource)
+        else:
+            updated.append(resource)
+
+    for proposal in added:
+        new_resource = build_resource(proposal, make_resource_id(proposal, next_idx))
+        next_idx += 1
+        updated.append(new_resource)
+        upserted.append(new_resource)
+        if summary is not None:
+            summary.add(new_resource)
+
+    for resource in upserted:
+        affected_titles.add(resource['title'])
+
+    # Même ordre que l'inventaire (année fiscale, titre)
+    updated.sort(key=lambda r: (r['fiscal_year'] or '', r['title']))
+
+    resource_delta = {
+        'full': False,
+        'upserted': upserted,
+        'removed_ids': removed_ids,
+        'affected_titles': sorted(affected_titles)
     }
+    return updated, resource_delta
+
+class ResourceSummary:
+    """Agrégats des ressources (par statut, année fiscale, thème, région)
+
+    Maintenu de façon incrémentale : ajouter, retirer ou mettre à jour une
+    ressource coûte O(thèmes + régions), sans reparcourir la collection.
+    to_dict()/from_dict() donnent le format du champ 'summary' des fichiers
+    database_resources*.json.
+    """
+
+    COUNTERS = ('by_status', 'by_fiscal_year', 'by_theme', 'by_region')
+
+    def __init__(self):
+        self.total_resources = 0
+        self.active_count = 0
+        self.archived_count = 0
+        self.by_status = {}
+        self.by_fiscal_year = {}
+        self.by_theme = {}
+        self.by_region = {}
+
+    @staticmethod
+    def _bump(counter, key, step):
+        count = counter.get(key, 0) + step
+        if count:
+            counter[key] = count
+        else:
+            counter.pop(key, None)
 
-    for resource in resources:
-        # Par statut
-        status = resource['status']
-        summary['by_status'][status] = summary['by_status'].get(status, 0) + 1
+    def _apply(self, resource, step):
+        self.total_resources += step
 
-        # Par année fiscale
-        fy = resource['fiscal_year']
-        summary['by_fiscal_year'][fy] = summary['by_fiscal_year'].get(fy, 0) + 1
+        # Par statut et par année fiscale
+        self._bump(self.by_status, resource['status'], step)
+        self._bump(self.by_fiscal_year, resource['fiscal_year'], step)
 
-        # Par thème
+        # Par thème et par région
         for theme in resource['themes']:
-            summary['by_theme'][theme] = summary['by_theme'].get(theme, 0) + 1
-
-        # Par région
+            self._bump(self.by_theme, theme, step)
         for region in resource['regions']:
-            summary['by_region'][region] = summary['by_region'].get(region, 0) + 1
+            self._bump(self.by_region, region, step)
 
         # Compteurs actif/archivé
         if resource['is_active']:
-            summary['active_count'] += 1
+            self.active_count += step
         else:
-            summary['archived_count'] += 1
+            self.archived_count += step
 
-    return summary
+    def add(self, resource):
+        self._apply(resource, 1)
+
+    def remove(self, resource):
+        self._apply(resource, -1)
+
+    def update(self, old_resource, new_resource):
+        self.remove(old_resource)
+        self.add(new_resource)
+
+    @classmethod
+    def from_resources(cls, resources):
+        summary = cls()
+        for resource in resources:
+            summary.add(resource)
+        return summary
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls()
+        summary.total_resources = data.get('total_resources', 0)
+        summary.active_count = data.get('active_count', 0)
+        summary.archived_count = data.get('archived_count', 0)
+        for name in cls.COUNTERS:
+            setattr(summary, name, dict(data.get(name, {})))
+        return summary
+
+    def to_dict(self):
+        return {
+            'total_resources': self.total_resources,
+            'by_status': dict(self.by_status),
+            'by_fiscal_year': dict(self.by_fiscal_year),
+            'by_theme': dict(self.by_theme),
+            'by_region': dict(self.by_region),
+            'active_count': self.active_count,
+            'archived_count': self.archived_count
+        }
+
+def create_summary(resources):
+    """Crée un résumé des ressources"""
+    return ResourceSummary.from_resources(resources).to_dict()
+
+def write_derived_outputs(output_path, resources, summary):
+    """Sorties dérivées de database_resources.json, à côté de celui-ci
+
+    Version en colonnes (resource_store.py), index bitmap des facettes
+    (facet_index.py) et instantané binaire pour la recherche par id
+    (snapshot.py). Renvoie leurs chemins.
+    """
+    base = os.path.splitext(output_path)[0]
+    store_path, facets_path = base + '.columns', base + '.facets.json'
+    write_store(store_path, resources)
+    FacetIndex.from_resources(resources).save(facets_path)
+    write_snapshot(snapshot_path(output_path), resources, 'resource', summary)
+    return store_path, facets_path, snapshot_path(output_path)
 
 def main():
-    # Charger l'inventaire
-    with open(r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_inventory.json', 'r', encoding='utf-8') as f:
-        proposals = json.load(f)
+    parser = argparse.ArgumentParser(description="Préparation des ressources pour la base de données")
+    parser.add_argument('--delta', action='store_true',
+                        help="Appliquer uniquement proposals_delta.json aux ressources existantes")
+    add_arguments(parser)
+    args = parser.parse_args()
 
-    # Formater pour la base de données
-    resources = format_for_database(proposals)
+    with instrumented(args):
+        run(args)
 
-    # Créer le résumé
-    summary = create_summary(resources)
+def run(args):
+    from analyze_proposals import load_json, manifest_fingerprint
+
+    metrics = get_metrics()
+
+    output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\database_resources.json'
+    delta_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_delta.json'
+    resource_delta_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\database_resources_delta.json'
+    manifest_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_manifest.json'
+
+    delta = None
+    existing = None
+    if args.delta and os.path.exists(delta_path) and os.path.exists(output_path):
+        with open(delta_path, 'r', encoding='utf-8') as f:
+            delta = json.load(f)
+        if delta.get('full'):
+            delta = None
+        else:
+            with metrics.stage('load'):
+                with open(output_path, 'r', encoding='utf-8') as f:
+                    existing = json.load(f)
+            # Le delta doit partir de l'état des ressources existantes : sinon
+            # (delta précédent non appliqué, ressources reconstruites depuis),
+            # reconstruction complète
+            current = existing.get('manifest_fingerprint')
+            if current and delta.get('target') == current:
+                print("Delta deja applique")
+                delta = {'full': False, 'base': current, 'target': current}
+            elif not delta.get('base') or delta['base'] != current:
+                print("Delta calcule sur un autre etat des ressources : reconstruction complete")
+                delta = None
+
+    if delta is not None:
+        # Appliquer uniquement les changements à la base existante
+        with metrics.stage('apply_delta'):
+            summary = ResourceSummary.from_dict(existing['summary'])
+            resources, resource_delta = apply_delta(existing['resources'], delta, summary=summary)
+            summary = summary.to_dict()
+        fingerprint = delta.get('target')
+        resource_delta['base'] = existing['manifest_fingerprint']
+        resource_delta['target'] = fingerprint
+        metrics.count('upserted', len(resource_delta['upserted']))
+        metrics.count('removed', len(resource_delta['removed_ids']))
+    else:
+        # Charger l'inventaire
+        with metrics.stage('load'):
+            with open(r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\proposals_inventory.json', 'r', encoding='utf-8') as f:
+                proposals = json.load(f)
+
+        # Formater pour la base de données
+        with metrics.stage('format'):
+            resources = format_for_database(proposals)
+        resource_delta = {'full': True, 'upserted': [], 'removed_ids': [], 'affected_titles': []}
+        # L'inventaire et le manifeste sont écrits ensemble par analyze_proposals
+        fingerprint = manifest_fingerprint(load_json(manifest_path, None))
+
+        # Créer le résumé
+        with metrics.stage('summary'):
+            summary = create_summary(resources)
+    metrics.count('resources', len(resources))
 
     # Sauvegarder les ressources formatées
     output_data = {
         'summary': summary,
         'resources': resources,
         'last_updated': datetime.now().isoformat(),
-        'data_source': 'C:\\Users\\yoanb\\Desktop\\MVPSandiegodiplo\\Ressource'
+        'data_source': 'C:\\Users\\yoanb\\Desktop\\MVPSandiegodiplo\\Ressource',
+        'manifest_fingerprint': fingerprint
     }
 
-    output_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\database_resources.json'
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(output_data, f, indent=2, ensure_ascii=False)
-
-    # Créer aussi une version CSV pour faciliter l'import
-    import csv
-    csv_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\database_resources.csv'
-    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.DictWriter(f, fieldnames=[
-            'id', 'title', 'fiscal_year', 'status', 'priority',
-            'themes', 'regions', 'is_active', 'file_path'
-        ])
-        writer.writeheader()
-        for resource in resources:
-            writer.writerow({
-                'id': resource['id'],
-                'title': resource['title'],
-                'fiscal_year': resource['fiscal_year'],
-                'status': resource['status'],
-                'priority': resource['priority'],
-                'themes': ', '.join(resource['themes']),
-                'regions': ', '.join(resource['regions']),
-                'is_active': resource['is_active'],
-                'file_path': resource['file_path']
-            })
+    with metrics.stage('write'):
+        with open(output_path, 'w', encoding='utf-8') as f:
+            json.dump(output_data, f, indent=2, ensure_ascii=False)
+
+        # Delta de ressources pour clean_and_verify --delta
+        with open(resource_delta_path, 'w', encoding='utf-8') as f:
+            json.dump(resource_delta, f, indent=2, ensure_ascii=False)
+
+        # Colonnes, facettes et instantané
+        store_path, facets_path, _ = write_derived_outputs(output_path, resources, output_data['summary'])
+
+        # Créer aussi une version CSV pour faciliter l'import
+        import csv
+        csv_path = r'C:\Users\yoanb\Desktop\MVPSandiegodiplo\database_resources.csv'
+        with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=[
+                'id', 'title', 'fiscal_year', 'status', 'priority',
+                'themes', 'regions', 'is_active', 'file_path'
+            ])
+            writer.writeheader()
+            for resource in resources:
+                writer.writerow({
+                    'id': resource['id'],
+                    'title': resource['title'],
+                    'fiscal_year': resource['fiscal_year'],
+                    'status': resource['status'],
+                    'priority': resource['priority'],
+                    'themes': ', '.join(resource['themes']),
+                    'regions': ', '.join(resource['regions']),
+                    'is_active': resource['is_active'],
+                    'file_path': resource['file_path']
+                })
 
     # Afficher le résumé
     print(f"\n{'='*80}")
@@ -182,6 +391,8 @@ def main():
     print(f"{'='*40}")
     print(f"  JSON: {output_path}")
     print(f"  CSV: {csv_path}")
+    print(f"  Colonnes: {store_path}")
+    print(f"  Facettes: {facets_path}")
 
     print(f"\n{'='*40}")
     print(f"RECOMMANDATIONS")
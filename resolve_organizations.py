@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Script pour regrouper les organisations extraites en organisations canoniques
+
+La même organisation apparaît dans plusieurs propositions et années fiscales
+avec des noms, descriptions et URL légèrement différents. Ce script :
+  1. normalise les URL (schéma, www, slash final, paramètres de suivi)
+  2. regroupe par URL normalisée, puis, à l'intérieur d'un même domaine,
+     par similarité des mots du nom
+  3. fusionne chaque groupe en une organisation canonique avec la liste de
+     ses apparitions (source_proposal, fiscal_year)
+  4. enregistre un index variante -> identifiant canonique
+"""
+
+import re
+import json
+import hashlib
+from collections import Counter, defaultdict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from extract_orgs_improved import iter_organizations
+
+# Paramètres de suivi ignorés dans les URL
+TRACKING_PARAMS = {'fbclid', 'gclid', 'mc_cid', 'mc_eid', 'ref', 'source'}
+NAME_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+NAME_STOPWORDS = {'the', 'of', 'and', 'for', 'a', 'an', 'in', 'at', 'de', 'la'}
+NAME_SIMILARITY = 0.8
+
+
+def normalize_url(url):
+    """Normalise une URL : sans schéma, sans www, sans slash final ni suivi
+
+    'https://www.Example.org/About/?utm_source=x' -> 'example.org/About'
+    """
+    if not url:
+        return ''
+    url = url.strip().rstrip('.,;:)]}>"\'')
+    if '://' not in url:
+        url = 'http://' + url
+
+    parts = urlsplit(url)
+    host = parts.netloc.lower()
+    if '@' in host:
+        host = host.split('@', 1)[1]
+    if host.endswith(':80') or host.endswith(':443'):
+        host = host.rsplit(':', 1)[0]
+    if host.startswith('www.'):
+        host = host[4:]
+
+    path = parts.path.rstrip('/')
+    for index_page in ('/index.html', '/index.htm', '/index.php'):
+        if path.lower().endswith(index_page):
+            path = path[:-len(index_page)]
+
+    query = [(k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+             if not k.lower().startswith('utm_') and k.lower() not in TRACKING_PARAMS]
+    return urlunsplit(('', host, path, urlencode(sorted(query)), '')).lstrip('/')
+
+
+def url_domain(normalized_url):
+    """Domaine d'une URL normalisée"""
+    return normalized_url.split('/', 1)[0]
+
+
+def name_tokens(name):
+    """Mots significatifs d'un nom d'organisation"""
+    words = NAME_WORD_PATTERN.findall((name or '').lower())
+    return frozenset(w for w in words if w not in NAME_STOPWORDS)
+
+
+def jaccard(a, b):
+    """Similarité de Jaccard entre deux ensembles"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class UnionFind:
+    """Ensembles disjoints (fusion des enregistrements d'une même organisation)"""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, x):
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[max(ra, rb)] = min(ra, rb)
+
+
+def canonical_id(normalized_url):
+    """Identifiant stable d'une organisation canonique"""
+    return 'ORG-' + hashlib.sha1(normalized_url.encode('utf-8')).hexdigest()[:12]
+
+
+def resolve_organizations(organizations, name_similarity=NAME_SIMILARITY):
+    """Regroupe les enregistrements d'organisations
+
+    Renvoie (organisations canoniques, index variante -> id canonique).
+    """
+    records = list(organizations)
+    urls = [normalize_url(org.get('url', '')) for org in records]
+    tokens = [name_tokens(org.get('name', '')) for org in records]
+    groups = UnionFind(len(records))
+
+    # Bloc 1 : URL normalisée identique
+    by_url = {}
+    for idx, url in enumerate(urls):
+        if url:
+            if url in by_url:
+                groups.union(by_url[url], idx)
+            else:
+                by_url[url] = idx
+
+    # Bloc 2 : même domaine et noms similaires (comparaison limitée au bloc
+    # domaine x mot du nom, et aux représentants de chaque URL distincte)
+    by_domain_token = defaultdict(list)
+    for url, idx in by_url.items():
+        for token in tokens[idx]:
+            by_domain_token[(url_domain(url), token)].append(idx)
+
+    compared = set()
+    for block in by_domain_token.values():
+        for pos, i in enumerate(block):
+            for j in block[pos + 1:]:
+                if (i, j) in compared:
+                    continue
+                compared.add((i, j))
+                if jaccard(tokens[i], tokens[j]) >= name_similarity:
+                    groups.union(i, j)
+
+    members = defaultdict(list)
+    for idx in range(len(records)):
+        members[groups.find(idx)].append(idx)
+
+    canonical = []
+    index = {}
+    for root in sorted(members):
+        idxs = members[root]
+        url_counts = Counter(urls[i] for i in idxs if urls[i])
+        name_counts = Counter(records[i].get('name', '') for i in idxs if records[i].get('name'))
+
+        # URL et nom les plus fréquents ; à égalité, le plus long
+        best_url = max(url_counts, key=lambda u: (url_counts[u], len(u))) if url_counts else ''
+        best_name = max(name_counts, key=lambda n: (name_counts[n], len(n))) if name_counts else ''
+        org_id = canonical_id(best_url or best_name)
+        original_urls = [records[i].get('url', '') for i in idxs if urls[i] == best_url]
+
+        appearances = []
+        seen = set()
+        for i in idxs:
+            key = (records[i].get('source_proposal'), records[i].get('fiscal_year'))
+            if key not in seen:
+                seen.add(key)
+                appearances.append({'source_proposal': key[0], 'fiscal_year': key[1]})
+
+        canonical.append({
+            'id': org_id,
+            'name': best_name,
+            'url': max(original_urls, key=original_urls.count) if original_urls else '',
+            'normalized_url': best_url,
+            'description': max((records[i].get('description', '') for i in idxs), key=len),
+            'meeting_focus': max((records[i].get('meeting_focus', '') for i in idxs), key=len),
+            'name_variants': sorted(name_counts),
+            'url_variants': sorted(url_counts),
+            'fiscal_years': sorted({a['fiscal_year'] for a in appearances if a['fiscal_year']}),
+            'appearances': appearances,
+            'record_count': len(idxs)
+        })
+
+        for url in url_counts:
+            index['url:' + url] = org_id
+        for i in idxs:
+            if urls[i] and tokens[i]:
+                index['name:' + url_domain(urls[i]) + ':' + ' '.join(sorted(tokens[i]))] = org_id
+
+    return canonical, index
+
+
+def lookup(index, url=None, name=None):
+    """Retrouve l'identifiant canonique d'une variante (URL, ou nom + URL)"""
+    normalized = normalize_url(url) if url else ''
+    if normalized and 'url:' + normalized in index:
+        return index['url:' + normalized]
+    if normalized and name:
+        key = 'name:' + url_domain(normalized) + ':' + ' '.join(sorted(name_tokens(name)))
+        return index.get(key)
+    return None
+
+
+def main():
+    input_path = 'organizations_improved.json'
+    output_path = 'organizations_canonical.json'
+    index_path = 'organizations_index.json'
+
+    print("="*80)
+    print("RESOLUTION DES ORGANISATIONS")
+    print("="*80)
+
+    organizations = list(iter_organizations(input_path))
+    canonical, index = resolve_organizations(organizations)
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(canonical, f, indent=2, ensure_ascii=False)
+
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False)
+
+    multi_year = len([org for org in canonical if len(org['fiscal_years']) > 1])
+
+    print(f"\nEnregistrements en entree     : {len(organizations)}")
+    print(f"Organisations canoniques      : {len(canonical)}")
+    if organizations:
+        print(f"Reduction                     : {(1 - len(canonical) / len(organizations)) * 100:.1f}%")
+    print(f"Presentes sur plusieurs annees: {multi_year}")
+    print(f"Variantes indexees            : {len(index)}")
+    print(f"\nSauvegarde: {output_path}")
+    print(f"Index: {index_path}")
+
+
+if __name__ == "__main__":
+    main()
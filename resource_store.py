@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Stockage en colonnes des ressources (alternative à database_resources.json)
+
+Le dossier database_resources.columns/ contient :
+  - meta.json : nombre de lignes, description des colonnes et dictionnaires
+    des facettes (fiscal_year, status, type, themes, regions)
+  - <colonne>.bin : codes des facettes (un entier par ligne, ou décalages +
+    codes pour les listes themes/regions), is_active et priority
+  - <colonne>.json : colonnes texte (id, title, description, ...), chacune
+    dans son propre fichier
+Un lecteur ne charge que les colonnes utilisées : filtrer les propositions
+actives FY2026 sur le thème Health ne lit que quelques petits tableaux.
+
+Exemple :
+  python resource_store.py --fiscal-year FY2026 --theme Health --active
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from array import array
+
+STORE_VERSION = 1
+STORE_DIR = 'database_resources.columns'
+
+# Colonnes à valeur unique encodées par dictionnaire
+CATEGORY_COLUMNS = ('fiscal_year', 'status', 'type')
+# Colonnes à valeurs multiples encodées par dictionnaire (décalages + codes)
+LIST_COLUMNS = ('themes', 'regions')
+# Colonnes numériques : nom -> typecode array
+NUMBER_COLUMNS = {'is_active': 'B', 'priority': 'h'}
+# Colonnes texte (ou JSON libre), une par fichier
+TEXT_COLUMNS = ('id', 'title', 'description', 'file_path', 'filename', 'created_date', 'metadata')
+
+CODE_TYPE = 'H'    # 65 535 valeurs distinctes par facette
+OFFSET_TYPE = 'I'
+
+
+def _write_array(path, values):
+    if sys.byteorder != 'little':
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, 'wb') as f:
+        values.tofile(f)
+
+
+def _read_array(path, typecode):
+    values = array(typecode)
+    with open(path, 'rb') as f:
+        values.frombytes(f.read())
+    if sys.byteorder != 'little':
+        values.byteswap()
+    return values
+
+
+def _intern(dictionary, index, value):
+    """Code d'une valeur dans un dictionnaire (ajoutée si nouvelle)"""
+    code = index.get(value)
+    if code is None:
+        code = index[value] = len(dictionary)
+        dictionary.append(value)
+    return code
+
+
+def write_store(path, resources):
+    """Écrit les ressources au format colonnes (remplacement atomique du dossier)"""
+    resources = list(resources)
+    tmp_path = path + '.tmp'
+    if os.path.exists(tmp_path):
+        shutil.rmtree(tmp_path)
+    os.makedirs(tmp_path)
+
+    dictionaries = {}
+    columns = {}
+
+    for name in CATEGORY_COLUMNS:
+        dictionary, index = [], {}
+        codes = array(CODE_TYPE, (_intern(dictionary, index, r.get(name)) for r in resources))
+        _write_array(os.path.join(tmp_path, f"{name}.bin"), codes)
+        dictionaries[name] = dictionary
+        columns[name] = {'kind': 'category', 'file': f"{name}.bin"}
+
+    for name in LIST_COLUMNS:
+        dictionary, index = [], {}
+        offsets = array(OFFSET_TYPE, [0])
+        codes = array(CODE_TYPE)
+        for r in resources:
+            codes.extend(_intern(dictionary, index, value) for value in r.get(name, []))
+            offsets.append(len(codes))
+        _write_array(os.path.join(tmp_path, f"{name}.offsets.bin"), offsets)
+        _write_array(os.path.join(tmp_path, f"{name}.bin"), codes)
+        dictionaries[name] = dictionary
+        columns[name] = {'kind': 'list', 'file': f"{name}.bin", 'offsets': f"{name}.offsets.bin"}
+
+    for name, typecode in NUMBER_COLUMNS.items():
+        values = array(typecode, (int(r.get(name) or 0) for r in resources))
+        _write_array(os.path.join(tmp_path, f"{name}.bin"), values)
+        columns[name] = {'kind': 'number', 'file': f"{name}.bin", 'typecode': typecode}
+
+    for name in TEXT_COLUMNS:
+        with open(os.path.join(tmp_path, f"{name}.json"), 'w', encoding='utf-8') as f:
+            json.dump([r.get(name) for r in resources], f, ensure_ascii=False, separators=(',', ':'))
+        columns[name] = {'kind': 'text', 'file': f"{name}.json"}
+
+    with open(os.path.join(tmp_path, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({
+            'version': STORE_VERSION,
+            'count': len(resources),
+            'columns': columns,
+            'dictionaries': dictionaries
+        }, f, indent=2, ensure_ascii=False)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+
+
+class ResourceStore:
+    """Lecteur du stockage en colonnes ; chaque colonne est chargée à la demande"""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, 'meta.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('version') != STORE_VERSION:
+            raise ValueError(f"Version de stockage non supportee: {meta.get('version')}")
+        self.count = meta['count']
+        self.columns = meta['columns']
+        self.dictionaries = meta['dictionaries']
+        self._loaded = {}
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def column(self, name):
+        """Données brutes d'une colonne (codes, (décalages, codes), nombres ou textes)"""
+        if name not in self._loaded:
+            spec = self.columns[name]
+            if spec['kind'] == 'category':
+                data = _read_array(self._file(spec['file']), CODE_TYPE)
+            elif spec['kind'] == 'list':
+                data = (_read_array(self._file(spec['offsets']), OFFSET_TYPE),
+                        _read_array(self._file(spec['file']), CODE_TYPE))
+            elif spec['kind'] == 'number':
+                data = _read_array(self._file(spec['file']), spec['typecode'])
+            else:
+                with open(self._file(spec['file']), 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            self._loaded[name] = data
+        return self._loaded[name]
+
+    def code(self, name, value):
+        """Code d'une valeur de facette, ou None si elle n'apparaît pas"""
+        try:
+            return self.dictionaries[name].index(value)
+        except ValueError:
+            return None
+
+    def value(self, name, row):
+        """Valeur décodée d'une colonne pour une ligne"""
+        kind = self.columns[name]['kind']
+        data = self.column(name)
+        if kind == 'category':
+            return self.dictionaries[name][data[row]]
+        if kind == 'list':
+            offsets, codes = data
+            return [self.dictionaries[name][c] for c in codes[offsets[row]:offsets[row + 1]]]
+        if kind == 'number':
+            return bool(data[row]) if name == 'is_active' else data[row]
+        return data[row]
+
+    def filter(self, fiscal_year=None, status=None, theme=None, region=None, is_active=None):
+        """Indices des lignes qui satisfont tous les critères donnés"""
+        rows = range(self.count)
+
+        for name, value in (('fiscal_year', fiscal_year), ('status', status)):
+            if value is not None:
+                code = self.code(name, value)
+                codes = self.column(name)
+                rows = [row for row in rows if codes[row] == code]
+
+        for name, value in (('themes', theme), ('regions', region)):
+            if value is not None:
+                code = self.code(name, value)
+                offsets, codes = self.column(name)
+                rows = [row for row in rows if code in codes[offsets[row]:offsets[row + 1]]]
+
+        if is_active is not None:
+            flags = self.column('is_active')
+            rows = [row for row in rows if bool(flags[row]) == is_active]
+
+        return list(rows)
+
+    def rows(self, indices, columns=None):
+        """Reconstitue des ressources (dictionnaires) limitées aux colonnes demandées"""
+        columns = columns or list(self.columns)
+        return [{name: self.value(name, row) for name in columns} for row in indices]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Requete sur le stockage en colonnes des ressources")
+    parser.add_argument('--store', default=STORE_DIR)
+    parser.add_argument('--fiscal-year')
+    parser.add_argument('--status')
+    parser.add_argument('--theme')
+    parser.add_argument('--region')
+    parser.add_argument('--active', action='store_true', help="Seulement les ressources actives")
+    parser.add_argument('--columns', default='id,title,fiscal_year',
+                        help="Colonnes a afficher (separees par des virgules)")
+    args = parser.parse_args()
+
+    store = ResourceStore(args.store)
+    indices = store.filter(fiscal_year=args.fiscal_year, status=args.status, theme=args.theme,
+                           region=args.region, is_active=True if args.active else None)
+    for row in store.rows(indices, columns=args.columns.split(',')):
+        print(' | '.join(str(v) for v in row.values()))
+    print(f"\n{len(indices)} ressources sur {store.count}")
+
+
+if __name__ == "__main__":
+    main()
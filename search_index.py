@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Index de recherche plein texte (BM25) sur les propositions et organisations
+
+L'index est une base SQLite (search_index.db) construite à partir des
+sorties du pipeline : database_resources.json (propositions, texte complet
+lu via le cache .docx quand le fichier est disponible) et
+organizations_improved.json (nom, description, meeting focus). Les
+organisations héritent des thèmes et régions de leur proposition source.
+
+Utilisation :
+  python search_index.py build
+  python search_index.py update        # applique database_resources_delta.json
+
+L'index retient l'empreinte du manifeste de l'état indexé (table meta,
+voir analyze_proposals.manifest_fingerprint) : un delta n'est appliqué que
+s'il part de cet état, sinon l'index est reconstruit.
+  python search_index.py query "maritime security" --fiscal-year FY2025 --theme Maritime -k 5
+"""
+
+import os
+import sys
+import json
+import math
+import sqlite3
+import argparse
+from collections import Counter
+
+from keyword_matcher import tokenize
+from snapshot import organization_id
+
+INDEX_FILE = 'search_index.db'
+RESOURCES_FILE = 'database_resources.json'
+ORGANIZATIONS_FILE = 'organizations_improved.json'
+RESOURCE_DELTA_FILE = 'database_resources_delta.json'
+
+# Paramètres BM25
+K1 = 1.2
+B = 0.75
+
+STOPWORDS = {
+    'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'has', 'have', 'in',
+    'is', 'it', 'its', 'of', 'on', 'or', 'that', 'the', 'their', 'this', 'to', 'was',
+    'were', 'will', 'with'
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    doc_id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    source TEXT,
+    title TEXT,
+    fiscal_year TEXT,
+    length INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS facets (
+    doc_id TEXT NOT NULL,
+    facet TEXT NOT NULL,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    term TEXT NOT NULL,
+    doc_id TEXT NOT NULL,
+    tf INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    key TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_postings_term ON postings(term);
+CREATE INDEX IF NOT EXISTS idx_postings_doc ON postings(doc_id);
+CREATE INDEX IF NOT EXISTS idx_facets_doc ON facets(doc_id);
+CREATE INDEX IF NOT EXISTS idx_facets_value ON facets(facet, value);
+CREATE INDEX IF NOT EXISTS idx_docs_source ON docs(source);
+"""
+
+
+def analyze(text):
+    """Termes indexés d'un texte (mots minuscules hors mots vides)"""
+    return [word for word in tokenize(text or '') if word not in STOPWORDS]
+
+
+def open_index(path=INDEX_FILE):
+    """Ouvre (ou crée) l'index"""
+    conn = sqlite3.connect(path)
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _stat(conn, key):
+    row = conn.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else 0
+
+
+def get_fingerprint(conn):
+    """Empreinte du manifeste de l'état indexé (None si inconnue)"""
+    row = conn.execute("SELECT value FROM meta WHERE key = 'manifest_fingerprint'").fetchone()
+    return row[0] if row else None
+
+
+def _set_fingerprint(conn, fingerprint):
+    conn.execute("INSERT OR REPLACE INTO meta(key, value) VALUES('manifest_fingerprint', ?)", (fingerprint,))
+
+
+def _bump_stat(conn, key, step):
+    conn.execute(
+        "INSERT INTO stats(key, value) VALUES(?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+        (key, step)
+    )
+
+
+def remove_documents(conn, doc_ids):
+    """Retire des documents de l'index"""
+    for doc_id in doc_ids:
+        row = conn.execute("SELECT length FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row is None:
+            continue
+        conn.execute("DELETE FROM postings WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM facets WHERE doc_id = ?", (doc_id,))
+        conn.execute("DELETE FROM docs WHERE doc_id = ?", (doc_id,))
+        _bump_stat(conn, 'doc_count', -1)
+        _bump_stat(conn, 'total_length', -row[0])
+
+
+def add_documents(conn, documents):
+    """Ajoute ou remplace des documents
+
+    Chaque document : {doc_id, kind, source, title, fiscal_year, text,
+    themes, regions, payload}
+    """
+    documents = list(documents)
+    remove_documents(conn, [doc['doc_id'] for doc in documents])
+
+    for doc in documents:
+        terms = Counter(analyze(doc['text']))
+        length = sum(terms.values())
+        conn.execute(
+            "INSERT INTO docs(doc_id, kind, source, title, fiscal_year, length, payload) "
+            "VALUES(?, ?, ?, ?, ?, ?, ?)",
+            (doc['doc_id'], doc['kind'], doc.get('source'), doc.get('title'),
+             doc.get('fiscal_year'), length, json.dumps(doc['payload'], ensure_ascii=False))
+        )
+        conn.executemany(
+            "INSERT INTO postings(term, doc_id, tf) VALUES(?, ?, ?)",
+            [(term, doc['doc_id'], tf) for term, tf in terms.items()]
+        )
+        facets = [('theme', v) for v in doc.get('themes', [])] + [('region', v) for v in doc.get('regions', [])]
+        conn.executemany(
+            "INSERT INTO facets(doc_id, facet, value) VALUES(?, ?, ?)",
+            [(doc['doc_id'], facet, value) for facet, value in facets]
+        )
+        _bump_stat(conn, 'doc_count', 1)
+        _bump_stat(conn, 'total_length', length)
+
+
+def proposal_text(resource):
+    """Texte d'une proposition : document complet si disponible, sinon titre + aperçu"""
+    text = f"{resource.get('title', '')}\n{resource.get('description', '')}"
+    file_path = resource.get('file_path', '')
+    if file_path and os.path.exists(file_path):
+        try:
+            from docx_cache import read_paragraphs
+            text = resource.get('title', '') + '\n' + '\n'.join(read_paragraphs(file_path))
+        except Exception as e:
+            print(f"Erreur lors de la lecture de {file_path}: {e}")
+    return text
+
+
+def proposal_documents(resources):
+    """Documents d'index pour les propositions"""
+    for resource in resources:
+        yield {
+            'doc_id': resource['id'],
+            'kind': 'proposal',
+            'source': resource.get('filename', ''),
+            'title': resource.get('title', ''),
+            'fiscal_year': resource.get('fiscal_year'),
+            'text': proposal_text(resource),
+            'themes': resource.get('themes', []),
+            'regions': resource.get('regions', []),
+            'payload': {
+                'id': resource['id'],
+                'title': resource.get('title', ''),
+                'fiscal_year': resource.get('fiscal_year'),
+                'status': resource.get('status'),
+                'themes': resource.get('themes', []),
+                'regions': resource.get('regions', [])
+            }
+        }
+
+
+def organization_documents(organizations, resources):
+    """Documents d'index pour les organisations (facettes héritées de la proposition)"""
+    by_source = {resource.get('filename', '') + '.docx': resource for resource in resources}
+    seen = set()
+    for org in organizations:
+        doc_id = organization_id(org)
+        if doc_id in seen:
+            continue  # Même organisation répétée dans une proposition
+        seen.add(doc_id)
+        source = org.get('source_proposal') or ''
+        resource = by_source.get(source, {})
+        yield {
+            'doc_id': doc_id,
+            'kind': 'organization',
+            'source': os.path.splitext(source)[0],
+            'title': org.get('name', ''),
+            'fiscal_year': org.get('fiscal_year'),
+            'text': '\n'.join([org.get('name') or '', org.get('description') or '',
+                               org.get('meeting_focus') or '']),
+            'themes': resource.get('themes', []),
+            'regions': resource.get('regions', []),
+            'payload': {
+                'name': org.get('name', ''),
+                'url': org.get('url', ''),
+                'meeting_focus': org.get('meeting_focus', ''),
+                'source_proposal': source,
+                'fiscal_year': org.get('fiscal_year')
+            }
+        }
+
+
+def build_index(conn, resources, organizations, fingerprint=None):
+    """Reconstruit l'index complet
+
+    fingerprint : empreinte du manifeste des ressources indexées.
+    """
+    for table in ('docs', 'facets', 'postings', 'stats'):
+        conn.execute(f"DELETE FROM {table}")
+    add_documents(conn, proposal_documents(resources))
+    add_documents(conn, organization_documents(organizations, resources))
+    _set_fingerprint(conn, fingerprint)
+    conn.commit()
+
+
+def update_index(conn, resource_delta, resources, organizations=()):
+    """Met à jour l'index avec un delta de ressources (voir prepare_database_resources)
+
+    Les propositions modifiées/ajoutées sont ré-indexées, les supprimées
+    retirées ; les organisations de ces propositions sont remplacées par
+    celles fournies. Le delta doit partir de l'état indexé (resource_delta
+    ['base']), sinon ValueError ; l'empreinte cible est enregistrée dans la
+    même transaction que les documents.
+    """
+    base = get_fingerprint(conn)
+    if not base or resource_delta.get('base') != base:
+        raise ValueError(f"Delta calcule sur un autre etat (base {resource_delta.get('base')}, "
+                         f"index {base})")
+
+    upserted = resource_delta.get('upserted', [])
+    removed_ids = resource_delta.get('removed_ids', [])
+
+    touched_sources = {r.get('filename', '') for r in upserted}
+    for doc_id in removed_ids:
+        row = conn.execute("SELECT source FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        if row:
+            touched_sources.add(row[0])
+
+    remove_documents(conn, removed_ids)
+    add_documents(conn, proposal_documents(upserted))
+
+    # Organisations des propositions touchées
+    stale = [row[0] for source in touched_sources for row in conn.execute(
+        "SELECT doc_id FROM docs WHERE kind = 'organization' AND source = ?", (source,))]
+    remove_documents(conn, stale)
+    orgs = [org for org in organizations
+            if os.path.splitext(org.get('source_proposal') or '')[0] in touched_sources]
+    add_documents(conn, organization_documents(orgs, resources))
+    _set_fingerprint(conn, resource_delta.get('target'))
+    conn.commit()
+
+
+def search(conn, query, k=10, kind=None, fiscal_year=None, theme=None, region=None):
+    """Renvoie les k meilleurs documents pour une requête (score BM25)"""
+    terms = list(dict.fromkeys(analyze(query)))
+    if not terms:
+        return []
+
+    doc_count = _stat(conn, 'doc_count')
+    if not doc_count:
+        return []
+    avg_length = _stat(conn, 'total_length') / doc_count
+
+    # Filtres sur les documents
+    conditions = []
+    params = []
+    if kind:
+        conditions.append("d.kind = ?")
+        params.append(kind)
+    if fiscal_year:
+        conditions.append("d.fiscal_year = ?")
+        params.append(fiscal_year)
+    for facet, value in (('theme', theme), ('region', region)):
+        if value:
+            conditions.append("EXISTS (SELECT 1 FROM facets f WHERE f.doc_id = d.doc_id "
+                              "AND f.facet = ? AND f.value = ?)")
+            params.extend([facet, value])
+    where = (' AND ' + ' AND '.join(conditions)) if conditions else ''
+
+    scores = Counter()
+    lengths = {}
+    for term in terms:
+        df = conn.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+        if not df:
+            continue
+        idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+        rows = conn.execute(
+            "SELECT p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_id = p.doc_id "
+            "WHERE p.term = ?" + where, [term] + params
+        )
+        for doc_id, tf, length in rows:
+            lengths[doc_id] = length
+            norm = K1 * (1 - B + B * length / avg_length) if avg_length else K1
+            scores[doc_id] += idf * tf * (K1 + 1) / (tf + norm)
+
+    results = []
+    for doc_id, score in scores.most_common(k):
+        kind_value, payload = conn.execute(
+            "SELECT kind, payload FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+        results.append({'doc_id': doc_id, 'kind': kind_value, 'score': round(score, 4),
+                        **json.loads(payload)})
+    return results
+
+
+def load_pipeline_outputs():
+    """Charge les ressources (et l'empreinte de leur manifeste) et les organisations du pipeline"""
+    with open(RESOURCES_FILE, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    organizations = []
+    if os.path.exists(ORGANIZATIONS_FILE):
+        from extract_orgs_improved import iter_organizations
+        organizations = list(iter_organizations(ORGANIZATIONS_FILE))
+    return data['resources'], organizations, data.get('manifest_fingerprint')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index de recherche des propositions et organisations")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('build', help="Reconstruire l'index complet")
+    sub.add_parser('update', help=f"Appliquer {RESOURCE_DELTA_FILE}")
+    query_parser = sub.add_parser('query', help="Rechercher")
+    query_parser.add_argument('text')
+    query_parser.add_argument('-k', type=int, default=10)
+    query_parser.add_argument('--kind', choices=['proposal', 'organization'])
+    query_parser.add_argument('--fiscal-year')
+    query_parser.add_argument('--theme')
+    query_parser.add_argument('--region')
+    parser.add_argument('--index', default=INDEX_FILE)
+    args = parser.parse_args()
+
+    conn = open_index(args.index)
+
+    if args.command == 'build':
+        resources, organizations, fingerprint = load_pipeline_outputs()
+        build_index(conn, resources, organizations, fingerprint)
+        print(f"Index construit: {_stat(conn, 'doc_count')} documents -> {args.index}")
+
+    elif args.command == 'update':
+        if not os.path.exists(RESOURCE_DELTA_FILE):
+            print(f"Aucun delta trouve ({RESOURCE_DELTA_FILE})")
+            sys.exit(1)
+        with open(RESOURCE_DELTA_FILE, 'r', encoding='utf-8') as f:
+            resource_delta = json.load(f)
+        resources, organizations, fingerprint = load_pipeline_outputs()
+        current = get_fingerprint(conn)
+        if not resource_delta.get('full') and current and current == fingerprint:
+            print("Index deja a jour")
+        elif resource_delta.get('full') or resource_delta.get('target') != fingerprint:
+            if not resource_delta.get('full'):
+                print("Delta calcule sur un autre etat des ressources : reconstruction complete")
+            build_index(conn, resources, organizations, fingerprint)
+        else:
+            try:
+                update_index(conn, resource_delta, resources, organizations)
+            except ValueError as e:
+                print(f"{e} : reconstruction complete")
+                conn.rollback()
+                build_index(conn, resources, organizations, fingerprint)
+        print(f"Index mis a jour: {_stat(conn, 'doc_count')} documents")
+
+    else:
+        for hit in search(conn, args.text, k=args.k, kind=args.kind, fiscal_year=args.fiscal_year,
+                          theme=args.theme, region=args.region):
+            label = hit.get('title') or hit.get('name')
+            print(f"{hit['score']:8.3f}  [{hit['kind']}] {label} ({hit.get('fiscal_year')})")
+            if hit.get('url'):
+                print(f"          {hit['url']}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
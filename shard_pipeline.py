@@ -0,0 +1,373 @@
+#!/usr/bin/env python3
+"""
+Exécution répartie (map-reduce) par partition de Ressource/
+
+Une partition est un dossier de premier niveau de Ressource/ (un dossier
+« Proposals Sent FY… » par année fiscale et par poste). Chaque machine
+traite un lot de partitions (map) et écrit un fichier de résultats
+partiels : inventaire, organisations des deux extracteurs (un seul passage
+par document, voir org_rules) et résumé. L'étape reduce fusionne les
+fichiers de façon déterministe (ordre indépendant du découpage), attribue
+les identifiants comme prepare_database_resources, puis lance la détection
+des doublons sur l'ensemble, ce qui couvre les doublons entre partitions.
+
+Les chemins sont stockés relativement à Ressource/ : les machines n'ont
+pas besoin du même dossier racine.
+
+Exemples :
+  python shard_pipeline.py list
+  python shard_pipeline.py map --shard 0 --shards 3 --output shard-0.json
+  python shard_pipeline.py reduce shard-0.json shard-1.json shard-2.json
+  python shard_pipeline.py local --shards 4
+"""
+
+import os
+import json
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+from instrumentation import get_metrics, add_arguments, instrumented
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+SHARD_VERSION = 1
+
+INVENTORY_FILE = 'proposals_inventory.json'
+RESOURCES_FILE = 'database_resources.json'
+REPORT_FILE = 'duplicates_report.json'
+# Sortie d'organisations -> profil de org_rules
+ORGANIZATION_PROFILES = {
+    'organizations_improved.json': 'improved',
+    'organizations_extracted.json': 'ivlp',
+}
+
+
+def save_json(path, data, indent=2):
+    """Écrit un fichier JSON de façon atomique"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def relative_path(file_path, ressource_path):
+    """Chemin relatif à Ressource/, avec des / (identique sous Windows et Linux)"""
+    return os.path.relpath(file_path, ressource_path).replace(os.sep, '/')
+
+
+def partition_of(relative):
+    """Partition d'un chemin relatif ; les fichiers à la racine forment la partition '.'"""
+    parts = relative.split('/')
+    return parts[0] if len(parts) > 1 else '.'
+
+
+def list_partitions(ressource_path):
+    """Partitions {nom: [chemins .docx relatifs à Ressource/, triés]}"""
+    from analyze_proposals import list_proposal_files
+
+    partitions = {}
+    for file_path in list_proposal_files(ressource_path):
+        relative = relative_path(file_path, ressource_path)
+        partitions.setdefault(partition_of(relative), []).append(relative)
+    for files in partitions.values():
+        files.sort()
+    return partitions
+
+
+def assign_partitions(partitions, shards):
+    """Répartit les partitions entre shards (la plus grosse d'abord, vers le shard le moins chargé)
+
+    Déterministe : ne dépend que des noms et tailles des partitions.
+    """
+    loads = [[0, shard, []] for shard in range(shards)]
+    for name in sorted(partitions, key=lambda name: (-len(partitions[name]), name)):
+        target = min(loads, key=lambda load: (load[0], load[1]))
+        target[0] += len(partitions[name])
+        target[2].append(name)
+    return [sorted(load[2]) for load in loads]
+
+
+# =============================================
+# MAP
+# =============================================
+
+def map_partitions(ressource_path, names, workers=1):
+    """Traite des partitions ; renvoie le contenu d'un fichier de résultats partiels"""
+    from analyze_proposals import analyze_files, extract_proposal_info
+    from docx_cache import file_sha256
+    from prepare_database_resources import build_resource, ResourceSummary
+    from org_rules import extract_profiles
+
+    metrics = get_metrics()
+    partitions = list_partitions(ressource_path)
+    missing = [name for name in names if name not in partitions]
+    if missing:
+        raise ValueError(f"Partitions introuvables: {', '.join(missing)}")
+
+    relatives = [relative for name in sorted(names) for relative in partitions[name]]
+    file_paths = [os.path.join(ressource_path, *relative.split('/')) for relative in relatives]
+
+    with metrics.stage('analyze'):
+        proposals = analyze_files(file_paths, workers=workers)
+    for proposal in proposals:
+        proposal['file_path'] = relative_path(proposal['file_path'], ressource_path)
+
+    # Sortie -> partition -> organisations (ordre des documents)
+    organizations = {name: {partition: [] for partition in names} for name in ORGANIZATION_PROFILES}
+    with metrics.stage('organizations'):
+        for relative, file_path in zip(relatives, file_paths):
+            fiscal_year = extract_proposal_info(file_path, ' ')['fiscal_year']
+            try:
+                found = extract_profiles(file_path, ORGANIZATION_PROFILES.values())
+            except Exception as e:
+                print(f"Erreur lors de la lecture de {file_path}: {e}")
+                continue
+            for name, profile in ORGANIZATION_PROFILES.items():
+                for org in found[profile]:
+                    org['source_proposal'] = os.path.basename(relative)
+                    org['fiscal_year'] = fiscal_year
+                    organizations[name][partition_of(relative)].append(org)
+
+    # Résumé partiel (indépendant des identifiants attribués au reduce)
+    summary = ResourceSummary()
+    for proposal in proposals:
+        summary.add(build_resource(proposal, None))
+
+    metrics.count('files', len(file_paths))
+    metrics.count('proposals', len(proposals))
+    return {
+        'version': SHARD_VERSION,
+        'partitions': sorted(names),
+        'files': {relative: file_sha256(file_path) for relative, file_path in zip(relatives, file_paths)},
+        'proposals': proposals,
+        'organizations': organizations,
+        'summary': summary.to_dict(),
+        'created': datetime.now().isoformat(),
+    }
+
+
+def run_map(ressource_path, names, output_path, workers=1):
+    shard = map_partitions(ressource_path, names, workers=workers)
+    save_json(output_path, shard, indent=None)
+    print(f"{len(shard['partitions'])} partitions, {len(shard['proposals'])} propositions -> {output_path}")
+    return shard
+
+
+# =============================================
+# REDUCE
+# =============================================
+
+def merge_summaries(summaries):
+    """Somme de résumés partiels (format ResourceSummary.to_dict)"""
+    from prepare_database_resources import ResourceSummary
+
+    merged = ResourceSummary()
+    for data in summaries:
+        partial = ResourceSummary.from_dict(data)
+        merged.total_resources += partial.total_resources
+        merged.active_count += partial.active_count
+        merged.archived_count += partial.archived_count
+        for name in ResourceSummary.COUNTERS:
+            counter = getattr(merged, name)
+            for key, count in getattr(partial, name).items():
+                ResourceSummary._bump(counter, key, count)
+    return merged.to_dict()
+
+
+def reduce_shards(shards, ressource_path):
+    """Fusionne des résultats partiels ; renvoie (inventaire, données ressources, organisations)
+
+    L'ordre final ne dépend pas du découpage : propositions triées par
+    chemin puis (année fiscale, titre), organisations par partition puis document.
+    """
+    from analyze_proposals import sort_proposals
+    from prepare_database_resources import format_for_database
+
+    seen = {}
+    for position, shard in enumerate(shards):
+        if shard.get('version') != SHARD_VERSION:
+            raise ValueError(f"Version de fichier partiel non supportee: {shard.get('version')}")
+        for name in shard['partitions']:
+            if name in seen:
+                raise ValueError(f"Partition traitee deux fois: {name} (fichiers {seen[name]} et {position})")
+            seen[name] = position
+
+    proposals = [proposal for shard in shards for proposal in shard['proposals']]
+    proposals.sort(key=lambda p: p['file_path'])
+    for proposal in proposals:
+        proposal['file_path'] = os.path.join(ressource_path, *proposal['file_path'].split('/'))
+    sort_proposals(proposals)
+
+    resources = format_for_database(proposals)
+    summary = merge_summaries(shard['summary'] for shard in shards)
+
+    # Organisations : ordre des partitions puis des documents
+    organizations = {}
+    for name in ORGANIZATION_PROFILES:
+        by_partition = {}
+        for shard in shards:
+            by_partition.update(shard['organizations'].get(name, {}))
+        organizations[name] = [org for partition in sorted(by_partition) for org in by_partition[partition]]
+
+    data = {
+        'summary': summary,
+        'resources': resources,
+        'last_updated': datetime.now().isoformat(),
+        'data_source': ressource_path,
+        'partitions': sorted(seen),
+    }
+    return proposals, data, organizations
+
+
+def run_reduce(shard_paths, root, detect=True):
+    from resource_store import write_store, STORE_DIR
+    from facet_index import FacetIndex, FACETS_FILE
+    from snapshot import write_snapshot, snapshot_path
+
+    metrics = get_metrics()
+    ressource_path = os.path.join(root, 'Ressource')
+
+    with metrics.stage('load'):
+        shards = []
+        for path in shard_paths:
+            with open(path, 'r', encoding='utf-8') as f:
+                shards.append(json.load(f))
+
+    with metrics.stage('merge'):
+        proposals, data, organizations = reduce_shards(shards, ressource_path)
+
+    with metrics.stage('write'):
+        save_json(os.path.join(root, INVENTORY_FILE), proposals)
+        save_json(os.path.join(root, RESOURCES_FILE), data)
+        write_store(os.path.join(root, STORE_DIR), data['resources'])
+        FacetIndex.from_resources(data['resources']).save(os.path.join(root, FACETS_FILE))
+        write_snapshot(snapshot_path(os.path.join(root, RESOURCES_FILE)), data['resources'], 'resource',
+                       data['summary'])
+        for name, orgs in organizations.items():
+            save_json(os.path.join(root, name), orgs)
+            write_snapshot(snapshot_path(os.path.join(root, name)), orgs, 'organization')
+
+    print("="*80)
+    print("REDUCE TERMINE")
+    print("="*80)
+    print(f"Fichiers partiels: {len(shards)}, partitions: {len(data['partitions'])}")
+    print(f"Propositions: {len(proposals)}")
+    for name, orgs in organizations.items():
+        print(f"Organisations ({name}): {len(orgs)}")
+
+    if not detect:
+        return data
+
+    # Doublons sur l'ensemble fusionné : couvre les paires entre partitions
+    from detect_duplicates import detect_duplicates, body_signatures, MEMO_FILE
+    with metrics.stage('detect'):
+        report = detect_duplicates(resources=data['resources'], report_path=None,
+                                   memo_path=os.path.join(root, MEMO_FILE),
+                                   signatures=body_signatures(proposals))
+
+    shard_of_partition = {name: position for position, shard in enumerate(shards)
+                          for name in shard['partitions']}
+    shard_by_id = {resource['id']: shard_of_partition.get(partition_of(relative_path(resource['file_path'], ressource_path)))
+                   for resource in data['resources']}
+
+    def spans_shards(ids):
+        return len({shard_by_id.get(resource_id) for resource_id in ids}) > 1
+
+    report['cross_shard'] = {
+        'exact_duplicate_groups': sum(1 for items in report['exact_duplicate_groups'].values()
+                                      if spans_shards(item['id'] for item in items)),
+        'similar_pairs': sum(1 for pair in report['similar_pairs']
+                             if spans_shards((pair['item1']['id'], pair['item2']['id']))),
+        'similar_body_groups': sum(1 for items in report['similar_body_groups']
+                                   if spans_shards(item['id'] for item in items)),
+    }
+    save_json(os.path.join(root, REPORT_FILE), report)
+    print(f"Doublons entre fichiers partiels: {report['cross_shard']}")
+    return data
+
+
+# =============================================
+# EXÉCUTION LOCALE (un processus par shard)
+# =============================================
+
+def _map_worker(job):
+    ressource_path, names, output_path = job
+    # Sortie détaillée d'un worker : inutile en parallèle
+    import io
+    import contextlib
+    with contextlib.redirect_stdout(io.StringIO()):
+        run_map(ressource_path, names, output_path, workers=1)
+    return output_path
+
+
+def run_local(root, shards, work_dir, workers=None, detect=True):
+    """Simule `shards` machines par des processus locaux, puis fusionne"""
+    ressource_path = os.path.join(root, 'Ressource')
+    assignment = assign_partitions(list_partitions(ressource_path), shards)
+    os.makedirs(work_dir, exist_ok=True)
+
+    jobs = [(ressource_path, names, os.path.join(work_dir, f"shard-{position}.json"))
+            for position, names in enumerate(assignment) if names]
+    for position, (_, names, _) in enumerate(jobs):
+        print(f"Shard {position}: {', '.join(names)}")
+
+    with get_metrics().stage('map'):
+        with ProcessPoolExecutor(max_workers=workers or min(len(jobs), os.cpu_count() or 1)) as executor:
+            shard_paths = list(executor.map(_map_worker, jobs))
+    return run_reduce(shard_paths, root, detect=detect)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Execution repartie par partition de Ressource/")
+    parser.add_argument('--root', default=PROJECT_DIR,
+                        help="Dossier du projet (contient Ressource/) ; defaut : dossier du script")
+    add_arguments(parser)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser('list', help="Lister les partitions et leur repartition")
+
+    map_parser = commands.add_parser('map', help="Traiter un lot de partitions")
+    map_parser.add_argument('--partitions', help="Noms de partitions (separes par des virgules)")
+    map_parser.add_argument('--shard', type=int, help="Numero de ce shard (avec --shards)")
+    map_parser.add_argument('--shards', type=int, default=1)
+    map_parser.add_argument('--workers', type=int, default=None, help="Processus pour l'analyse")
+    map_parser.add_argument('--output', required=True)
+
+    reduce_parser = commands.add_parser('reduce', help="Fusionner des fichiers partiels")
+    reduce_parser.add_argument('inputs', nargs='+')
+    reduce_parser.add_argument('--no-detect', action='store_true', help="Sans detection des doublons")
+
+    local_parser = commands.add_parser('local', help="map (un processus par shard) puis reduce")
+    local_parser.add_argument('--shards', type=int, default=os.cpu_count() or 1)
+    local_parser.add_argument('--work-dir', default='shards')
+    local_parser.add_argument('--no-detect', action='store_true', help="Sans detection des doublons")
+
+    args = parser.parse_args()
+    with instrumented(args):
+        run(args)
+
+
+def run(args):
+    ressource_path = os.path.join(args.root, 'Ressource')
+
+    if args.command == 'list':
+        partitions = list_partitions(ressource_path)
+        for name in sorted(partitions):
+            print(f"  {len(partitions[name]):>5} fichiers  {name}")
+        print(f"\n{len(partitions)} partitions")
+    elif args.command == 'map':
+        if args.partitions:
+            names = args.partitions.split(',')
+        elif args.shard is not None:
+            names = assign_partitions(list_partitions(ressource_path), args.shards)[args.shard]
+        else:
+            names = sorted(list_partitions(ressource_path))
+        run_map(ressource_path, names, args.output, workers=args.workers)
+    elif args.command == 'reduce':
+        run_reduce(args.inputs, args.root, detect=not args.no_detect)
+    else:
+        run_local(args.root, args.shards, args.work_dir, detect=not args.no_detect)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Instantanés binaires avec index des identifiants (accès direct par id)
+
+Retrouver une ressource (IVLP-FY2025-042) ou une organisation dans
+database_resources.json ou organizations_improved.json demande de lire et
+de décoder tout le fichier. Un instantané se compose de trois fichiers :
+  - <nom>.snap.<id> : en-tête (signature, identifiant de l'instantané,
+    type d'enregistrement, métadonnées JSON) puis les enregistrements les
+    uns après les autres : longueur (uint32), longueur de l'id (uint16),
+    id, enregistrement en JSON compact
+  - <nom>.snap.<id>.idx : table de hachage à adressage ouvert (sondage
+    linéaire), une case par id : hash de l'id, décalage et longueur de
+    l'enregistrement dans les données
+  - <nom>.snap : pointeur (petit JSON) vers la version courante
+Le lecteur projette les deux premiers fichiers en mémoire (mmap) : une
+recherche lit une case de l'index puis décode un seul enregistrement,
+quel que soit le nombre d'enregistrements.
+
+Les fichiers d'une version ne sont jamais réécrits : une nouvelle version
+porte un autre <id> (empreinte du contenu) et seul le pointeur est
+remplacé. Sous Windows, un fichier projeté en mémoire ne peut être ni
+remplacé ni supprimé : un lecteur ouvert garde sa version, et les
+anciennes versions encore ouvertes ne sont supprimées qu'à une écriture
+suivante. Rouvrir Snapshot pour voir la dernière version.
+
+Identifiants : 'id' pour les ressources, organization_id() pour les
+organisations. Si un id est répété, seul le premier enregistrement est
+indexé (tous restent dans le .snap, voir Snapshot.__iter__).
+
+Exemples :
+  python snapshot.py database_resources.snap IVLP-FY2025-042
+  python snapshot.py --from organizations_improved.json
+"""
+
+import os
+import re
+import sys
+import json
+import mmap
+import time
+import struct
+import hashlib
+import argparse
+
+SNAPSHOT_VERSION = 1
+DATA_MAGIC = b'IVSNAP1\0'
+INDEX_MAGIC = b'IVSNIX1\0'
+
+DATA_HEADER = struct.Struct('<8s16sI')      # signature, identifiant, longueur des métadonnées
+INDEX_HEADER = struct.Struct('<8s16sQQ')    # signature, identifiant, nombre d'ids, nombre de cases
+RECORD_HEADER = struct.Struct('<IH')        # longueur de l'enregistrement, longueur de l'id
+SLOT = struct.Struct('<QQI')                # hash de l'id, décalage (0 = case vide), longueur
+
+MIN_CAPACITY = 8
+
+
+def organization_id(org):
+    """Identifiant stable d'un enregistrement d'organisation"""
+    key = '\0'.join([org.get('source_proposal') or '', org.get('name') or '', org.get('url') or ''])
+    return 'ORGREC-' + hashlib.sha1(key.encode('utf-8')).hexdigest()[:12]
+
+
+KEYS = {
+    'resource': lambda resource: resource['id'],
+    'organization': organization_id,
+}
+
+
+def key_hash(key):
+    """Hash 64 bits d'un identifiant (stable d'une exécution à l'autre)"""
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def snapshot_path(json_path):
+    """Chemin de l'instantané correspondant à un fichier .json / .jsonl"""
+    return os.path.splitext(json_path)[0] + '.snap'
+
+
+def version_path(path, snapshot_id):
+    """Fichier de données d'une version (l'index y ajoute .idx)"""
+    return f"{path}.{snapshot_id}"
+
+
+def index_path(data_path):
+    return data_path + '.idx'
+
+
+def _replace(source, target, attempts=10):
+    """os.replace, réessayé brièvement si un lecteur a le fichier ouvert (Windows)"""
+    for attempt in range(attempts):
+        try:
+            os.replace(source, target)
+            return
+        except PermissionError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(0.05 * (attempt + 1))
+
+
+def prune_versions(path, keep):
+    """Supprime les versions autres que keep ; celles encore ouvertes sont gardées"""
+    directory = os.path.dirname(path) or '.'
+    pattern = re.compile(re.escape(os.path.basename(path)) + r'\.([0-9a-f]{32})(\.idx)?$')
+    removed = 0
+    for name in os.listdir(directory):
+        match = pattern.match(name)
+        if match and match.group(1) != keep:
+            try:
+                os.remove(os.path.join(directory, name))
+                removed += 1
+            except OSError:
+                pass  # Projeté en mémoire par un lecteur (Windows)
+    return removed
+
+
+def _map(path):
+    """Projection en lecture seule d'un fichier"""
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_pointer(path):
+    """Version courante d'un instantané : {'id', 'data', 'index'}"""
+    with open(path, 'r', encoding='utf-8') as f:
+        pointer = json.load(f)
+    directory = os.path.dirname(path)
+    pointer['data'] = os.path.join(directory, pointer['data'])
+    pointer['index'] = os.path.join(directory, pointer['index'])
+    return pointer
+
+
+def write_snapshot(path, records, kind, meta=None):
+    """Écrit une nouvelle version d'un instantané et bascule le pointeur
+
+    records peut être un itérateur : seuls les décalages sont gardés en
+    mémoire. Aucun fichier projeté par un lecteur n'est remplacé (voir
+    l'en-tête du module). Renvoie (nombre d'enregistrements, nombre d'ids
+    indexés).
+    """
+    key_of = KEYS[kind]
+    header = json.dumps({'version': SNAPSHOT_VERSION, 'kind': kind, 'meta': meta or {}},
+                        ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    digest = hashlib.blake2b(digest_size=16)
+    entries = {}
+    count = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        # Identifiant provisoire, remplacé par l'empreinte du contenu à la fin
+        f.write(DATA_HEADER.pack(DATA_MAGIC, b'\0' * 16, len(header)))
+        f.write(header)
+        digest.update(header)
+        offset = DATA_HEADER.size + len(header)
+        for record in records:
+            key = key_of(record).encode('utf-8')
+            payload = json.dumps(record, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            data = RECORD_HEADER.pack(len(key) + len(payload), len(key)) + key + payload
+            f.write(data)
+            digest.update(data)
+            if key not in entries:
+                entries[key] = (offset, len(data))
+            offset += len(data)
+            count += 1
+        snapshot_id = digest.digest()
+        f.seek(0)
+        f.write(DATA_HEADER.pack(DATA_MAGIC, snapshot_id, len(header)))
+
+    # Table à moitié pleine au plus : sondages courts
+    capacity = MIN_CAPACITY
+    while capacity < 2 * len(entries):
+        capacity *= 2
+    table = bytearray(SLOT.size * capacity)
+    for key, (offset, length) in entries.items():
+        value = key_hash(key.decode('utf-8'))
+        slot = value & (capacity - 1)
+        while SLOT.unpack_from(table, slot * SLOT.size)[1]:
+            slot = (slot + 1) & (capacity - 1)
+        SLOT.pack_into(table, slot * SLOT.size, value, offset, length)
+
+    tmp_index = index_path(tmp_path)
+    with open(tmp_index, 'wb') as f:
+        f.write(INDEX_HEADER.pack(INDEX_MAGIC, snapshot_id, len(entries), capacity))
+        f.write(table)
+
+    # Version adressée par son contenu : si elle existe déjà (éventuellement
+    # ouverte par un lecteur), elle est identique et n'est pas réécrite
+    data_path = version_path(path, snapshot_id.hex())
+    for source, target in ((tmp_path, data_path), (tmp_index, index_path(data_path))):
+        if os.path.exists(target):
+            os.remove(source)
+        else:
+            os.replace(source, target)
+
+    # Le pointeur n'est jamais projeté en mémoire : il peut être remplacé
+    pointer = {'version': SNAPSHOT_VERSION, 'id': snapshot_id.hex(),
+               'data': os.path.basename(data_path), 'index': os.path.basename(index_path(data_path))}
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(pointer, f)
+    _replace(tmp_path, path)
+    prune_versions(path, keep=snapshot_id.hex())
+    return count, len(entries)
+
+
+def write_json_snapshot(json_path):
+    """Instantané d'un fichier JSON existant (ressources ou organisations)"""
+    from extract_orgs_improved import iter_organizations
+
+    path = snapshot_path(json_path)
+    if json_path.endswith('.jsonl'):
+        return path, write_snapshot(path, iter_organizations(json_path), 'organization')
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if isinstance(data, dict) and 'resources' in data:
+        meta = {key: value for key, value in data.items() if key not in ('resources', 'removed_duplicates')}
+        return path, write_snapshot(path, data['resources'], 'resource', meta)
+    return path, write_snapshot(path, data, 'organization')
+
+
+class Snapshot:
+    """Lecture d'un instantané projeté en mémoire"""
+
+    def __init__(self, path):
+        self.path = path
+        # Une version peut être supprimée entre la lecture du pointeur et
+        # l'ouverture des fichiers : relire alors le pointeur
+        for attempt in range(3):
+            pointer = read_pointer(path)
+            try:
+                self._data = _map(pointer['data'])
+            except FileNotFoundError:
+                if attempt == 2:
+                    raise
+                continue
+            try:
+                self._index = _map(pointer['index'])
+                break
+            except BaseException as error:
+                self._data.close()
+                if attempt == 2 or not isinstance(error, FileNotFoundError):
+                    raise
+
+        magic, snapshot_id, header_length = DATA_HEADER.unpack_from(self._data, 0)
+        index_magic, index_id, self._count, self._capacity = INDEX_HEADER.unpack_from(self._index, 0)
+        if magic != DATA_MAGIC or index_magic != INDEX_MAGIC:
+            self.close()
+            raise ValueError(f"{path}: ce n'est pas un instantané")
+        if snapshot_id != index_id:
+            self.close()
+            raise ValueError(f"{path}: l'index ne correspond pas aux données")
+
+        header = json.loads(self._data[DATA_HEADER.size:DATA_HEADER.size + header_length])
+        if header['version'] != SNAPSHOT_VERSION:
+            self.close()
+            raise ValueError(f"{path}: version {header['version']} non prise en charge")
+        self.id = snapshot_id.hex()
+        self.kind = header['kind']
+        self.meta = header['meta']
+        self._records_offset = DATA_HEADER.size + header_length
+
+    def _locate(self, key):
+        """(décalage, longueur) de l'enregistrement d'un id, sinon None"""
+        value = key_hash(key)
+        encoded = key.encode('utf-8')
+        mask = self._capacity - 1
+        slot = value & mask
+        while True:
+            slot_hash, offset, length = SLOT.unpack_from(self._index, INDEX_HEADER.size + slot * SLOT.size)
+            if not offset:
+                return None
+            if slot_hash == value:
+                _, key_length = RECORD_HEADER.unpack_from(self._data, offset)
+                start = offset + RECORD_HEADER.size
+                if self._data[start:start + key_length] == encoded:
+                    return offset, length
+            slot = (slot + 1) & mask
+
+    def _decode(self, offset, length):
+        _, key_length = RECORD_HEADER.unpack_from(self._data, offset)
+        return json.loads(self._data[offset + RECORD_HEADER.size + key_length:offset + length])
+
+    def get(self, key, default=None):
+        location = self._locate(key)
+        return default if location is None else self._decode(*location)
+
+    def __getitem__(self, key):
+        location = self._locate(key)
+        if location is None:
+            raise KeyError(key)
+        return self._decode(*location)
+
+    def __contains__(self, key):
+        return self._locate(key) is not None
+
+    def __len__(self):
+        """Nombre d'ids indexés"""
+        return self._count
+
+    def __iter__(self):
+        """Tous les enregistrements, dans l'ordre d'écriture"""
+        for _, offset, length in self._scan():
+            yield self._decode(offset, length)
+
+    def keys(self):
+        for key, _, _ in self._scan():
+            yield key
+
+    def _scan(self):
+        offset = self._records_offset
+        end = len(self._data)
+        while offset < end:
+            record_length, key_length = RECORD_HEADER.unpack_from(self._data, offset)
+            start = offset + RECORD_HEADER.size
+            length = RECORD_HEADER.size + record_length
+            yield self._data[start:start + key_length].decode('utf-8'), offset, length
+            offset += length
+
+    def close(self):
+        self._data.close()
+        self._index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Instantanes binaires : recherche par identifiant")
+    parser.add_argument('snapshot', nargs='?', help="Fichier .snap")
+    parser.add_argument('ids', nargs='*', help="Identifiants a afficher")
+    parser.add_argument('--from', dest='source', metavar='JSON',
+                        help="Creer l'instantane d'un fichier JSON existant")
+    args = parser.parse_args()
+
+    if args.source:
+        path, (count, indexed) = write_json_snapshot(args.source)
+        print(f"{path}: {count} enregistrements, {indexed} ids indexes")
+        return
+    if not args.snapshot:
+        parser.error("indiquer un instantane ou --from")
+
+    with Snapshot(args.snapshot) as snap:
+        if not args.ids:
+            print(f"{args.snapshot}: {snap.kind}, {len(snap)} ids, instantane {snap.id}")
+            return
+        missing = 0
+        for key in args.ids:
+            record = snap.get(key)
+            if record is None:
+                print(f"{key}: introuvable", file=sys.stderr)
+                missing += 1
+            else:
+                print(json.dumps(record, indent=2, ensure_ascii=False))
+        sys.exit(1 if missing else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -113,10 +113,14 @@ CREATE TABLE IF NOT EXISTS public.resources (
   accessibility TEXT,
   is_active BOOLEAN DEFAULT TRUE,
   created_by UUID REFERENCES public.profiles(id),
+  import_source TEXT, -- 'ivlp' pour les lignes importées (export_to_postgres.py), NULL sinon
   created_at TIMESTAMPTZ DEFAULT NOW(),
   updated_at TIMESTAMPTZ DEFAULT NOW()
 );
 
+-- Bases créées avant l'ajout de la colonne
+ALTER TABLE public.resources ADD COLUMN IF NOT EXISTS import_source TEXT;
+
 -- =============================================
 -- INDEXES
 -- =============================================
@@ -126,6 +130,7 @@ CREATE INDEX IF NOT EXISTS idx_projects_created_by ON public.projects(created_by
 CREATE INDEX IF NOT EXISTS idx_documents_project_id ON public.documents(project_id);
 CREATE INDEX IF NOT EXISTS idx_proposals_project_id ON public.proposals(project_id);
 CREATE INDEX IF NOT EXISTS idx_resources_category ON public.resources(category);
+CREATE INDEX IF NOT EXISTS idx_resources_import_source ON public.resources(import_source);
 
 -- =============================================
 -- ROW LEVEL SECURITY (RLS)
@@ -0,0 +1,158 @@
+"""Vérification des URL contre un serveur HTTP local (check_urls.py)"""
+
+import time
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from check_urls import UrlChecker, check_urls, stale_urls
+
+PAGE = b'<html><body>' + b'Organisation de San Diego. ' * 20 + b'</body></html>'
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive
+    connections = 0
+    paths = []
+
+    def setup(self):
+        type(self).connections += 1
+        super().setup()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None, chunked=False):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            if self.command != 'HEAD':
+                for start in range(0, len(body), 100):
+                    chunk = body[start:start + 100]
+                    self.wfile.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+                self.wfile.write(b'0\r\n\r\n')
+            return
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        if self.path.startswith('/no-head'):
+            self._send(405)
+        else:
+            self.do_GET()
+
+    def do_GET(self):
+        type(self).paths.append(self.path)
+        if self.path.startswith('/encoded/'):
+            self._send(200, PAGE)
+        elif self.path in ('/ok', '/no-head') or self.path.startswith('/page/'):
+            self._send(200, PAGE)
+        elif self.path == '/empty':
+            self._send(200, b'<p></p>')
+        elif self.path == '/chunked':
+            self._send(200, PAGE, chunked=True)
+        elif self.path == '/no-head/chunked-empty':
+            self._send(200, b' ', chunked=True)
+        elif self.path == '/moved':
+            self._send(301, headers={'Location': '/ok'})
+        elif self.path == '/slow':
+            time.sleep(1.5)
+            self._send(200, PAGE)
+        else:
+            self._send(404, b'not found')
+
+
+@pytest.fixture
+def server():
+    StubHandler.connections = 0
+    StubHandler.paths = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def run_check(urls, **options):
+    options.setdefault('retries', 0)
+    results, checked = asyncio.run(check_urls(urls, cache={}, **options))
+    return results
+
+
+def test_statuses(server):
+    results = run_check([f'{server}/ok', f'{server}/missing', f'{server}/moved',
+                         f'{server}/no-head', f'{server}/empty', 'ftp://example.org/'])
+
+    assert results[f'{server}/ok']['is_valid']
+    assert results[f'{server}/missing']['status_code'] == 404
+    assert not results[f'{server}/missing']['is_valid']
+    assert results[f'{server}/moved']['is_valid']
+    assert results[f'{server}/moved']['final_url'] == f'{server}/ok'
+    assert results[f'{server}/no-head']['is_valid']
+    assert results[f'{server}/empty']['is_empty']
+    assert results['ftp://example.org/']['error'] == 'Only HTTP and HTTPS protocols are allowed'
+
+
+def test_chunked_bodies(server):
+    # HEAD refusé : le corps chunked du GET est décodé puis jugé
+    results = run_check([f'{server}/chunked', f'{server}/no-head/chunked-empty'])
+    assert results[f'{server}/chunked']['is_valid']
+    assert not results[f'{server}/chunked'].get('is_empty')
+    assert results[f'{server}/no-head/chunked-empty']['is_empty']
+
+
+def test_connections_are_reused(server):
+    urls = [f'{server}/page/{i}' for i in range(40)] + [f'{server}/chunked']
+    results = run_check(urls, per_host=2)
+    assert all(result['is_valid'] for result in results.values())
+    # Deux connexions actives au plus pour l'hôte, réutilisées d'une requête à l'autre
+    assert StubHandler.connections <= 2
+
+
+def test_timeout(server):
+    results = run_check([f'{server}/slow'], timeout=0.5)
+    assert results[f'{server}/slow']['error'] == 'Request timeout'
+
+
+def test_request_target_is_encoded(server):
+    url = f'{server}/encoded/café menu?q=a b&r=%C3%A9'
+    assert run_check([url])[url]['is_valid']
+    assert StubHandler.paths[-1] == '/encoded/caf%C3%A9%20menu?q=a%20b&r=%C3%A9'
+
+
+def test_timeout_on_reused_connection_is_not_retried(server):
+    async def check_slow_after_ok():
+        checker = UrlChecker(timeout=0.5, retries=0)
+        try:
+            await checker.check(f'{server}/ok')
+            started = time.perf_counter()
+            result = await checker.check(f'{server}/slow')
+            return result, time.perf_counter() - started
+        finally:
+            await checker.close()
+
+    result, elapsed = asyncio.run(check_slow_after_ok())
+    assert result['error'] == 'Request timeout'
+    # Un seul délai : pas de seconde tentative sur une nouvelle connexion
+    assert elapsed < 0.9
+
+
+def test_failures_expire_sooner():
+    now = 1_000_000
+    cache = {
+        'https://ok.example/': {'is_valid': True, 'checked_at': now - 7200},
+        'https://down.example/': {'is_valid': False, 'checked_at': now - 7200},
+        'https://recent.example/': {'is_valid': False, 'checked_at': now - 60},
+    }
+    urls = list(cache) + ['https://new.example/']
+    assert stale_urls(urls, cache, ttl_seconds=86400, now=now, failure_ttl_seconds=3600) == [
+        'https://down.example/', 'https://new.example/']
@@ -0,0 +1,77 @@
+"""Filtrage par trigrammes des titres similaires (detect_duplicates.py)
+
+compare_titles doit trouver exactement les paires d'une comparaison
+de toutes les paires avec SequenceMatcher.
+"""
+
+import os
+import json
+import random
+import string
+from difflib import SequenceMatcher
+
+import pytest
+
+from detect_duplicates import compare_titles, comparison_title
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WORDS = ['maritime', 'security', 'water', 'resource', 'management', 'youth', 'leadership',
+         'climate', 'energy', 'democracy', 'ivlp', 'proposal', 'fy2025', 'and', 'in', 'the']
+
+
+def brute_force(titles, threshold=0.85):
+    pairs = []
+    for j in range(len(titles)):
+        for i in range(j):
+            sim = SequenceMatcher(None, *sorted((titles[i], titles[j]))).ratio()
+            if threshold < sim < 1.0:
+                pairs.append((i, j, sim))
+    return sorted(pairs)
+
+
+def mutate(rng, title):
+    chars = list(title)
+    for _ in range(rng.randint(0, 4)):
+        position = rng.randint(0, len(chars))
+        operation = rng.random()
+        if operation < 0.4 or not chars:
+            chars.insert(position, rng.choice(string.ascii_lowercase + ' '))
+        elif operation < 0.8:
+            del chars[min(position, len(chars) - 1)]
+        else:
+            chars[min(position, len(chars) - 1)] = rng.choice(string.ascii_lowercase)
+    return ''.join(chars)
+
+
+def random_titles(rng, count):
+    titles = []
+    for _ in range(count):
+        if titles and rng.random() < 0.5:
+            titles.append(mutate(rng, rng.choice(titles)))
+        elif rng.random() < 0.1:
+            titles.append(''.join(rng.choice('abc') for _ in range(rng.randint(0, 5))))  # très courts
+        else:
+            titles.append(' '.join(rng.choice(WORDS) for _ in range(rng.randint(1, 7))))
+    return titles
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_brute_force(seed):
+    rng = random.Random(seed)
+    titles = random_titles(rng, 60)
+    threshold = rng.choice([0.6, 0.75, 0.85, 0.95])
+    expected = brute_force(titles, threshold)
+    assert sorted(compare_titles(titles, threshold)) == expected
+
+    # Nouveaux titres seulement (voir SimilarityMemo)
+    start = rng.randint(0, len(titles))
+    assert sorted(compare_titles(titles, threshold, start=start)) == [pair for pair in expected if pair[1] >= start]
+
+
+def test_matches_brute_force_on_resources():
+    path = os.path.join(PROJECT_DIR, 'database_resources.json')
+    if not os.path.exists(path):
+        pytest.skip("database_resources.json absent")
+    with open(path, 'r', encoding='utf-8') as f:
+        titles = [comparison_title(resource['title']) for resource in json.load(f)['resources']]
+    assert sorted(compare_titles(titles)) == brute_force(titles)
@@ -0,0 +1,34 @@
+"""Cache des paragraphes .docx : éviction LRU et pré-vérifications (docx_cache.py)"""
+
+import os
+
+from docx_cache import DocxCache
+
+
+def parser(file_path):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return [{'text': line} for line in f.read().splitlines()]
+
+
+def test_eviction_prunes_path_records(tmp_path):
+    cache_dir = tmp_path / 'cache'
+    cache = DocxCache(str(cache_dir), max_bytes=4096, parser=parser)
+
+    for number in range(60):
+        path = tmp_path / f'proposal-{number}.docx'
+        path.write_text(f'Proposition {number}\n' + 'Organisation de San Diego\n' * 5, encoding='utf-8')
+        assert cache.paragraphs(str(path))[0] == f'Proposition {number}'
+
+    entries = {name[:-len('.json')] for name in os.listdir(cache_dir) if name.endswith('.json')}
+    records = os.listdir(cache_dir / 'paths')
+    assert cache.total_bytes <= cache.max_bytes
+    assert len(entries) < 60
+    # Une pré-vérification par entrée encore présente
+    assert len(records) == len(entries)
+
+    # Fichier évincé : relu puis de nouveau en cache
+    misses = cache.misses
+    assert cache.paragraphs(str(tmp_path / 'proposal-0.docx'))[0] == 'Proposition 0'
+    assert cache.misses == misses + 1
+    assert cache.paragraphs(str(tmp_path / 'proposal-0.docx'))[0] == 'Proposition 0'
+    assert cache.misses == misses + 1
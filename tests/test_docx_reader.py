@@ -0,0 +1,60 @@
+"""Lecture directe des .docx et repli python-docx (docx_reader.py)"""
+
+import zipfile
+
+import pytest
+
+import docx_reader
+
+docx = pytest.importorskip('docx')
+
+
+@pytest.fixture
+def document(tmp_path):
+    doc = docx.Document()
+    doc.add_heading('Organisations', level=2)
+    paragraph = doc.add_paragraph()
+    paragraph.add_run('San Diego Zoo').bold = True
+    doc.add_paragraph('https://zoo.sandiegozoo.org')
+    table = doc.add_table(rows=1, cols=2)
+    table.cell(0, 0).text = 'Cellule A'
+    table.cell(0, 1).text = 'Cellule B'
+    doc.add_paragraph('Fin')
+    path = tmp_path / 'proposal.docx'
+    doc.save(path)
+    return str(path)
+
+
+def rewrite(path, name, replace):
+    """Remplace une partie du paquet .docx"""
+    with zipfile.ZipFile(path) as archive:
+        parts = {item: archive.read(item) for item in archive.namelist()}
+    parts[name] = replace(parts[name])
+    with zipfile.ZipFile(path, 'w') as archive:
+        for item, data in parts.items():
+            archive.writestr(item, data)
+
+
+def test_fallback_matches_direct_reading(document):
+    for include_tables in (True, False):
+        assert (docx_reader.read_paragraphs_python_docx(document, include_tables)
+                == list(docx_reader.iter_paragraphs(document, include_tables)))
+        assert (docx_reader.read_paragraph_events_python_docx(document, include_tables)
+                == list(docx_reader.iter_paragraph_events(document, include_tables)))
+
+    texts = docx_reader.read_paragraphs(document)
+    assert texts == ['Organisations', 'San Diego Zoo', 'https://zoo.sandiegozoo.org',
+                     'Cellule A', 'Cellule B', 'Fin']
+    events = docx_reader.read_paragraph_events(document)
+    assert events[0]['heading'] == 2
+    assert events[1]['bold']
+
+
+def test_invalid_outline_level_is_ignored(document):
+    rewrite(document, 'word/document.xml', lambda xml: xml.replace(
+        b'<w:p>', b'<w:p><w:pPr><w:outlineLvl w:val="x"/></w:pPr>', 1))
+    rewrite(document, 'word/styles.xml', lambda xml: xml.replace(
+        b'</w:style>', b'<w:pPr><w:outlineLvl w:val="1.5"/></w:pPr></w:style>', 1))
+
+    events = docx_reader.read_paragraph_events(document)
+    assert [event['text'] for event in events][1:3] == ['San Diego Zoo', 'https://zoo.sandiegozoo.org']
@@ -0,0 +1,107 @@
+"""Lignes COPY et chargement dans public.resources (export_to_postgres.py)
+
+Le chargement (load_rows) n'est testé que si TEST_DATABASE_URL désigne une
+base Postgres jetable ; il utilise une table temporaire de même structure.
+Sans cette variable, test_round_trip et test_failed_batch_keeps_committed_batches
+sont ignorés et seul le format des lignes est vérifié :
+  TEST_DATABASE_URL=postgresql://postgres@localhost/test python -m pytest tests/test_export_to_postgres.py
+"""
+
+import os
+
+import pytest
+
+import export_to_postgres
+from export_to_postgres import copy_line, copy_value, iter_rows, load_rows
+
+RESOURCES = [
+    {'title': f'Proposition {i}', 'description': 'Tab\tet\nsaut', 'fiscal_year': 'FY2025',
+     'status': 'active', 'themes': ['Education'], 'regions': ['Europe'], 'priority': 1,
+     'is_active': True, 'metadata': {'document_type': 'docx'}}
+    for i in range(7)
+]
+ORGANIZATIONS = [{'name': 'San Diego Zoo', 'url': 'https://zoo.sandiegozoo.org',
+                  'normalized_url': 'zoo.sandiegozoo.org', 'fiscal_years': ['FY2025']}]
+
+
+def test_copy_values():
+    assert copy_value(None) == '\\N'
+    assert copy_value(True) == 't'
+    # Échappement du tableau puis échappement COPY
+    assert copy_value(['a', 'b"c', None]) == '{"a","b\\\\"c",NULL}'
+    assert copy_value('a\\b\tc\nd\re') == 'a\\\\b\\tc\\nd\\re'
+    assert copy_line(['x', None, False]) == 'x\t\\N\tf\n'
+
+
+def test_rows_are_tagged_as_imported():
+    rows = list(iter_rows(RESOURCES, ORGANIZATIONS))
+    assert len(rows) == 8
+    for line in rows:
+        fields = line.rstrip('\n').split('\t')
+        assert len(fields) == len(export_to_postgres.RESOURCE_COLUMNS)
+        assert fields[-1] == export_to_postgres.IMPORT_SOURCE
+    assert rows[0].split('\t')[0] == 'academic'
+    assert '\\t' in rows[0] and '\\n' in rows[0]
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    dsn = os.environ.get('TEST_DATABASE_URL')
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL non défini")
+    psycopg = pytest.importorskip('psycopg')
+
+    pool = export_to_postgres._SingleConnectionPool(psycopg, dsn)
+    pool.conn.autocommit = True   # conn.transaction() ouvre alors une vraie transaction
+    pool.conn.execute("""
+        CREATE TEMP TABLE resources (
+          id SERIAL PRIMARY KEY,
+          category TEXT NOT NULL CHECK (category IN ('governmental', 'academic', 'nonprofit', 'cultural')),
+          name TEXT NOT NULL,
+          description TEXT,
+          url TEXT,
+          meeting_focus TEXT,
+          price TEXT,
+          accessibility TEXT,
+          is_active BOOLEAN DEFAULT TRUE,
+          created_by UUID,
+          import_source TEXT
+        )""")
+    table = 'pg_temp.resources'
+    monkeypatch.setattr(export_to_postgres, 'TABLE', table)
+    monkeypatch.setattr(export_to_postgres, 'COPY_SQL', export_to_postgres.COPY_SQL.replace('public.resources', table))
+    yield pool
+    pool.close()
+
+
+def count(pool, where='TRUE'):
+    return pool.conn.execute(f"SELECT count(*) FROM pg_temp.resources WHERE {where}").fetchone()[0]
+
+
+def test_round_trip(pool):
+    pool.conn.execute("INSERT INTO pg_temp.resources (category, name) VALUES ('cultural', 'Créée dans l''application')")
+
+    assert load_rows(pool, iter_rows(RESOURCES, ORGANIZATIONS), batch_size=3) == 8
+    # Rechargement : les lignes importées sont remplacées, pas dupliquées
+    assert load_rows(pool, iter_rows(RESOURCES, ORGANIZATIONS), batch_size=3, truncate=True) == 8
+    assert count(pool, "import_source = 'ivlp'") == 8
+    assert count(pool, "import_source IS NULL") == 1
+
+    name, description, is_active = pool.conn.execute(
+        "SELECT name, description, is_active FROM pg_temp.resources WHERE name = 'Proposition 0'").fetchone()
+    assert description.startswith('Tab\tet\nsaut\n\nFiscal Year: FY2025')
+    assert is_active
+
+
+def test_failed_batch_keeps_committed_batches(pool):
+    load_rows(pool, iter_rows(RESOURCES))
+    bad = {**RESOURCES[0], 'title': None}   # name NOT NULL
+
+    # Lots de 3 : les deux premiers sont validés, le troisième (avec la ligne invalide) annulé
+    with pytest.raises(Exception):
+        load_rows(pool, iter_rows(RESOURCES[:5] + [bad] + RESOURCES[5:]), batch_size=3, truncate=True)
+    assert count(pool) == 3
+
+    # Relancer avec --truncate repart d'un import complet
+    assert load_rows(pool, iter_rows(RESOURCES), batch_size=3, truncate=True) == 7
+    assert count(pool) == 7
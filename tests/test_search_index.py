@@ -0,0 +1,44 @@
+"""Index BM25 et application des deltas de ressources (search_index.py)"""
+
+import pytest
+
+from search_index import build_index, get_fingerprint, open_index, search, update_index
+
+
+def resource(number, title):
+    return {'id': f'IVLP-FY2025-{number:03d}', 'title': title, 'description': title,
+            'filename': title.replace(' ', '_'), 'fiscal_year': 'FY2025',
+            'themes': ['Education'], 'regions': ['Europe']}
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = open_index(str(tmp_path / 'search_index.db'))
+    build_index(conn, [resource(1, 'Maritime security'), resource(2, 'Water management')], [], 'fp-1')
+    yield conn
+    conn.close()
+
+
+def test_delta_from_indexed_state(conn):
+    delta = {'full': False, 'base': 'fp-1', 'target': 'fp-2',
+             'upserted': [resource(3, 'Maritime law')], 'removed_ids': ['IVLP-FY2025-002']}
+    update_index(conn, delta, [resource(1, 'Maritime security'), resource(3, 'Maritime law')])
+
+    assert get_fingerprint(conn) == 'fp-2'
+    assert sorted(hit['doc_id'] for hit in search(conn, 'maritime')) == ['IVLP-FY2025-001', 'IVLP-FY2025-003']
+    assert search(conn, 'water') == []
+
+
+def test_delta_from_other_state_is_refused(conn):
+    delta = {'full': False, 'base': 'fp-0', 'target': 'fp-1',
+             'upserted': [resource(3, 'Maritime law')], 'removed_ids': []}
+    with pytest.raises(ValueError):
+        update_index(conn, delta, [])
+
+    # Rejouer un delta déjà appliqué est aussi refusé
+    applied = {'full': False, 'base': 'fp-1', 'target': 'fp-2', 'upserted': [], 'removed_ids': []}
+    update_index(conn, applied, [])
+    with pytest.raises(ValueError):
+        update_index(conn, applied, [])
+    assert get_fingerprint(conn) == 'fp-2'
+    assert len(search(conn, 'maritime')) == 1
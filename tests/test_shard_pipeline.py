@@ -0,0 +1,62 @@
+"""Exécution répartie sur le corpus Ressource/ (shard_pipeline.py)
+
+Le reduce de plusieurs fichiers partiels doit donner exactement les
+sorties d'une exécution en un seul processus.
+"""
+
+import os
+import json
+
+import pytest
+
+import docx_cache
+from analyze_proposals import analyze_files, list_proposal_files, sort_proposals
+from prepare_database_resources import format_for_database, create_summary
+from shard_pipeline import assign_partitions, list_partitions, map_partitions, reduce_shards
+
+RESSOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Ressource')
+
+pytestmark = pytest.mark.skipif(not os.path.isdir(RESSOURCE), reason="Ressource/ absent")
+
+
+@pytest.fixture(scope='module', autouse=True)
+def cache(tmp_path_factory):
+    # Cache .docx partagé par les tests du module, hors du dossier utilisateur
+    previous = os.environ.get('DOCX_CACHE_DIR')
+    os.environ['DOCX_CACHE_DIR'] = str(tmp_path_factory.mktemp('cache'))
+    docx_cache._default_cache = None
+    yield
+    if previous is None:
+        os.environ.pop('DOCX_CACHE_DIR')
+    else:
+        os.environ['DOCX_CACHE_DIR'] = previous
+    docx_cache._default_cache = None
+
+
+def sharded(shards):
+    """Map de chaque shard (aller-retour JSON, comme les fichiers partiels) puis reduce"""
+    assignment = assign_partitions(list_partitions(RESSOURCE), shards)
+    results = [json.loads(json.dumps(map_partitions(RESSOURCE, names, workers=1)))
+               for names in assignment if names]
+    return reduce_shards(results, RESSOURCE)
+
+
+def without_dates(resources):
+    return [{key: value for key, value in resource.items() if key != 'created_date'}
+            for resource in resources]
+
+
+def test_reduce_matches_single_process():
+    inventory = sort_proposals(analyze_files(list_proposal_files(RESSOURCE), workers=1))
+    resources = format_for_database(inventory)
+    assert len(resources) == 127
+
+    proposals, data, organizations = sharded(2)
+    assert len(data['partitions']) == len(list_partitions(RESSOURCE))
+    assert without_dates(data['resources']) == without_dates(resources)
+    assert data['summary'] == create_summary(resources)
+    assert [p['file_path'] for p in proposals] == [p['file_path'] for p in inventory]
+
+    # Le découpage ne change pas les organisations
+    _, _, single = sharded(1)
+    assert organizations == single
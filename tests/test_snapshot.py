@@ -0,0 +1,35 @@
+"""Instantanés versionnés derrière un pointeur (snapshot.py)"""
+
+import os
+
+from snapshot import Snapshot, write_snapshot
+
+
+def resources(value):
+    return [{'id': f'IVLP-FY2025-{i:03d}', 'value': value} for i in range(20)]
+
+
+def test_lookup_and_rewrite_with_open_reader(tmp_path):
+    path = str(tmp_path / 'database_resources.snap')
+    assert write_snapshot(path, resources(1), 'resource', {'total': 20}) == (20, 20)
+
+    reader = Snapshot(path)
+    assert reader['IVLP-FY2025-007'] == {'id': 'IVLP-FY2025-007', 'value': 1}
+    assert reader.meta == {'total': 20}
+    assert 'IVLP-FY2025-999' not in reader
+
+    # Nouvelle version écrite à côté : le lecteur ouvert garde la sienne
+    write_snapshot(path, resources(2), 'resource')
+    assert reader['IVLP-FY2025-007']['value'] == 1
+    with Snapshot(path) as latest:
+        assert latest['IVLP-FY2025-007']['value'] == 2
+        assert latest.id != reader.id
+        latest_id = latest.id
+    reader.close()
+
+    write_snapshot(path, resources(2), 'resource')
+    assert sorted(os.listdir(tmp_path)) == [
+        'database_resources.snap',
+        f'database_resources.snap.{latest_id}',
+        f'database_resources.snap.{latest_id}.idx',
+    ]
@@ -0,0 +1,128 @@
+"""Retraitement incrémental de Ressource/ (watch_ressource.py)
+
+Après n'importe quelle suite de lots, les sorties doivent être celles d'une
+reconstruction complète du corpus (aux identifiants et dates près).
+"""
+
+import os
+import json
+
+import pytest
+
+import docx_cache
+from analyze_proposals import analyze_files, list_proposal_files, sort_proposals
+from prepare_database_resources import format_for_database
+from watch_ressource import (Reingester, run_batch, MANIFEST_FILE, RESOURCES_FILE,
+                             ORGANIZATIONS_IMPROVED_FILE, ORGANIZATIONS_EXTRACTED_FILE)
+
+docx = pytest.importorskip('docx')
+
+def proposal(description, name, url):
+    """Paragraphes d'un document : nom avant l'URL (profil ivlp) et après (profil improved)"""
+    return [description, name, url, name]
+
+
+PROPOSALS = {
+    'FY2025/Education_Exchange.docx': proposal('Education and university exchange in Europe',
+                                               'San Diego State University', 'https://www.sdsu.edu'),
+    'FY2025/Climate_Action.docx': proposal('Climate and renewable energy in Africa',
+                                           'Scripps Institution of Oceanography', 'https://scripps.ucsd.edu'),
+    'FY2026/Arts_Program.docx': proposal('Arts and culture exchange in Asia',
+                                         'San Diego Museum of Art', 'https://www.sdmart.org'),
+}
+
+
+def write_docx(path, paragraphs):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    doc = docx.Document()
+    for text in paragraphs:
+        doc.add_paragraph(text)
+    doc.save(path)
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    monkeypatch.setenv('DOCX_CACHE_DIR', str(tmp_path / 'cache'))
+    monkeypatch.setattr(docx_cache, '_default_cache', None)
+    for relative, paragraphs in PROPOSALS.items():
+        write_docx(str(tmp_path / 'Ressource' / relative), paragraphs)
+    return str(tmp_path)
+
+
+def catch_up(root):
+    """Équivalent de watch_ressource.py --once"""
+    reingester = Reingester(root, workers=1)
+    run_batch(reingester, reingester.pending_changes())
+    return reingester
+
+
+def load(root, name):
+    with open(os.path.join(root, name), 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def comparable(resources):
+    """Ressources sans identifiant ni date de création"""
+    return [{key: value for key, value in resource.items() if key not in ('id', 'created_date')}
+            for resource in resources]
+
+
+def assert_full_rebuild(root):
+    inventory = analyze_files(list_proposal_files(os.path.join(root, 'Ressource')), workers=1)
+    expected = format_for_database(sort_proposals(inventory))
+    resources = load(root, RESOURCES_FILE)['resources']
+
+    assert comparable(resources) == comparable(expected)
+    assert len({resource['id'] for resource in resources}) == len(resources)
+    assert load(root, RESOURCES_FILE)['summary']['total_resources'] == len(expected)
+
+    # Organisations : mêmes enregistrements qu'un passage sur un projet vierge
+    rebuilt = Reingester(root, workers=1)
+    rebuilt.manifest = {}
+    rebuilt.data = None
+    rebuilt.rebuild_organizations = set(rebuilt.organizations)
+    organizations = rebuilt.extract_organizations(sorted(rebuilt.pending_changes()), set())
+    for name in (ORGANIZATIONS_IMPROVED_FILE, ORGANIZATIONS_EXTRACTED_FILE):
+        key = lambda org: json.dumps(org, sort_keys=True)
+        assert sorted(load(root, name), key=key) == sorted(organizations[name], key=key)
+
+
+def test_batches_match_full_rebuild(root):
+    catch_up(root)
+    assert_full_rebuild(root)
+
+    ressource = os.path.join(root, 'Ressource')
+    os.remove(os.path.join(ressource, 'FY2025', 'Climate_Action.docx'))
+    write_docx(os.path.join(ressource, 'FY2025', 'Education_Exchange.docx'),
+               proposal('Technology and education in Latin America', 'UC San Diego', 'https://ucsd.edu'))
+    write_docx(os.path.join(ressource, 'FY2026', 'Democracy_Forum.docx'),
+               proposal('Democracy and human rights in Europe', 'World Affairs Council',
+                        'https://www.wacsd.org'))
+    catch_up(root)
+    assert_full_rebuild(root)
+
+    # Rien n'a changé : les sorties restent identiques
+    before = load(root, RESOURCES_FILE)['resources']
+    catch_up(root)
+    assert load(root, RESOURCES_FILE)['resources'] == before
+
+
+def test_missing_manifest_does_not_duplicate(root):
+    catch_up(root)
+    os.remove(os.path.join(root, MANIFEST_FILE))
+
+    catch_up(root)
+    assert len(load(root, RESOURCES_FILE)['resources']) == len(PROPOSALS)
+    assert_full_rebuild(root)
+
+
+def test_unreadable_file_is_removed(root):
+    catch_up(root)
+    path = os.path.join(root, 'Ressource', 'FY2026', 'Arts_Program.docx')
+    with open(path, 'wb') as f:
+        f.write(b'pas un docx')
+
+    catch_up(root)
+    titles = [resource['title'] for resource in load(root, RESOURCES_FILE)['resources']]
+    assert titles == ['Climate Action', 'Education Exchange']
+    assert path not in load(root, MANIFEST_FILE)
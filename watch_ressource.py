@@ -0,0 +1,467 @@
+#!/usr/bin/env python3
+"""
+Surveillance continue de Ressource/ : les propositions ajoutées, modifiées
+ou supprimées sont retraitées quelques secondes après leur dépôt
+
+Seuls les documents concernés sont relus (analyze_proposals, puis
+apply_delta de prepare_database_resources et les deux extracteurs
+d'organisations) ; les autres entrées des fichiers de sortie sont reprises
+telles quelles. Les sorties sont écrites dans un fichier temporaire puis
+remplacées par os.replace : un lecteur voit l'ancienne ou la nouvelle
+version, jamais un fichier à moitié écrit.
+
+Les événements sont regroupés (anti-rebond) : Word écrit un document en
+plusieurs fois et crée un fichier de verrouillage ~$..., ignoré comme dans
+les autres scripts. Sous Linux, inotify est utilisé directement (ctypes) ;
+ailleurs (Windows, macOS), le dossier est parcouru périodiquement.
+
+Au démarrage, les changements survenus pendant l'arrêt sont rattrapés
+grâce au manifeste (proposals_manifest.json).
+
+Exemples :
+  python watch_ressource.py
+  python watch_ressource.py --root /chemin/vers/MVPSandiegodiplo --debounce 5
+  python watch_ressource.py --once
+"""
+
+import os
+import sys
+import json
+import time
+import errno
+import select
+import struct
+import argparse
+from datetime import datetime
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+INVENTORY_FILE = 'proposals_inventory.json'
+MANIFEST_FILE = 'proposals_manifest.json'
+RESOURCES_FILE = 'database_resources.json'
+ORGANIZATIONS_IMPROVED_FILE = 'organizations_improved.json'
+ORGANIZATIONS_EXTRACTED_FILE = 'organizations_extracted.json'
+
+# Sortie d'organisations -> profil de org_rules (extract_orgs_improved, extract_organizations_from_ivlp)
+ORGANIZATION_PROFILES = {
+    ORGANIZATIONS_IMPROVED_FILE: 'improved',
+    ORGANIZATIONS_EXTRACTED_FILE: 'ivlp',
+}
+
+DEBOUNCE = 2.0        # secondes sans nouvel événement avant de traiter le lot
+MAX_DELAY = 30.0      # un lot est traité au plus tard après ce délai
+POLL_INTERVAL = 2.0   # parcours périodique (hors Linux)
+
+
+def is_proposal(path):
+    """Document .docx à traiter (hors fichiers de verrouillage Word ~$)"""
+    name = os.path.basename(path)
+    return name.endswith('.docx') and not name.startswith('~$')
+
+
+def save_json(path, data, indent=2):
+    """Écrit un fichier JSON de façon atomique"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=indent, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+# =============================================
+# SURVEILLANCE DU DOSSIER
+# =============================================
+
+class InotifyWatcher:
+    """Surveillance récursive par inotify (Linux, via ctypes)
+
+    poll(timeout) renvoie l'ensemble des chemins .docx touchés, ou None si
+    la file du noyau a débordé (il faut alors tout rescanner).
+    """
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+    EVENT = struct.Struct('iIII')
+
+    def __init__(self, root):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1")
+        self.ctypes = ctypes
+        self.dirs = {}
+        self.watch_tree(root)
+
+    def watch_tree(self, path):
+        """Surveille un dossier et ses sous-dossiers ; renvoie les .docx déjà présents"""
+        found = set()
+        for root, dirs, files in os.walk(path):
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(root), self.MASK)
+            if wd < 0:
+                raise OSError(self.ctypes.get_errno(), f"inotify_add_watch {root}")
+            self.dirs[wd] = root
+            found.update(os.path.join(root, name) for name in files if is_proposal(name))
+        return found
+
+    def poll(self, timeout):
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    return None
+                if mask & self.IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                directory = self.dirs.get(wd)
+                if directory is None or not name:
+                    continue
+                path = os.path.join(directory, name)
+                if mask & self.IN_ISDIR:
+                    # Dossier créé ou déplacé dans l'arborescence : surveiller
+                    # et traiter les documents qu'il contient déjà
+                    if mask & (self.IN_CREATE | self.IN_MOVED_TO) and os.path.isdir(path):
+                        changed |= self.watch_tree(path)
+                    elif mask & self.IN_MOVED_FROM:
+                        return None
+                elif is_proposal(path):
+                    changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Surveillance par parcours périodique (taille et date des fichiers)"""
+
+    def __init__(self, root, interval=POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = self.scan()
+
+    def scan(self):
+        snapshot = {}
+        for root, dirs, files in os.walk(self.root):
+            for name in files:
+                if is_proposal(name):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        snapshot = self.scan()
+        changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                   if snapshot.get(path) != self.snapshot.get(path)}
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(root, polling=False):
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except (OSError, AttributeError) as e:
+            print(f"inotify indisponible ({e}), parcours periodique")
+    return PollingWatcher(root)
+
+
+class Debouncer:
+    """Regroupe les chemins jusqu'à DEBOUNCE secondes de calme (ou MAX_DELAY au total)"""
+
+    def __init__(self, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.pending = set()
+        self.first = None
+        self.last = None
+
+    def add(self, paths, now=None):
+        if not paths:
+            return
+        now = now or time.monotonic()
+        self.pending |= paths
+        self.first = self.first or now
+        self.last = now
+
+    def timeout(self, now=None):
+        """Temps d'attente avant le prochain lot possible"""
+        if not self.pending:
+            return self.debounce
+        now = now or time.monotonic()
+        return max(0.0, min(self.last + self.debounce, self.first + self.max_delay) - now)
+
+    def ready(self, now=None):
+        return bool(self.pending) and self.timeout(now) == 0.0
+
+    def take(self):
+        paths, self.pending = self.pending, set()
+        self.first = self.last = None
+        return paths
+
+
+# =============================================
+# RETRAITEMENT INCRÉMENTAL
+# =============================================
+
+class Reingester:
+    """État des sorties du projet et application d'un lot de chemins modifiés"""
+
+    def __init__(self, root, workers=None):
+        from analyze_proposals import load_json
+
+        self.root = root
+        self.workers = workers
+        self.inventory = load_json(self.path(INVENTORY_FILE), [])
+        self.manifest = load_json(self.path(MANIFEST_FILE), {})
+        self.data = load_json(self.path(RESOURCES_FILE), None)
+        # Sans manifeste, les sorties existantes ne peuvent pas être comparées
+        # au corpus : reconstruction complète, comme analyze_proposals
+        if not self.manifest:
+            self.data = None
+        self.organizations = {}
+        # Sortie d'organisations absente : elle est reconstruite sur tout le corpus
+        self.rebuild_organizations = set()
+        for name in ORGANIZATION_PROFILES:
+            self.organizations[name] = load_json(self.path(name), None) if self.manifest else None
+            if self.organizations[name] is None:
+                self.organizations[name] = []
+                self.rebuild_organizations.add(name)
+
+    @property
+    def ressource_path(self):
+        return os.path.join(self.root, 'Ressource')
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def pending_changes(self):
+        """Chemins modifiés depuis le manifeste (rattrapage au démarrage ou après débordement)"""
+        from analyze_proposals import list_proposal_files, build_manifest, diff_manifest
+
+        current = build_manifest(list_proposal_files(self.ressource_path), previous=self.manifest)
+        added, modified, removed = diff_manifest(self.manifest, current)
+        paths = set(added) | set(modified) | set(removed)
+        if self.rebuild_organizations or self.data is None:
+            paths |= set(current)
+        return paths
+
+    def process(self, paths):
+        """Retraite un lot de chemins ; renvoie (ajoutés, modifiés, supprimés)"""
+        from analyze_proposals import (build_manifest, diff_manifest, analyze_files, sort_proposals,
+                                       drop_unreadable, manifest_fingerprint)
+        from prepare_database_resources import apply_delta, format_for_database, ResourceSummary
+
+        existing = [path for path in paths if os.path.exists(path)]
+        previous = {path: self.manifest[path] for path in paths if path in self.manifest}
+        current = build_manifest(existing, previous=previous)
+        added, modified, removed = diff_manifest(previous, current)
+
+        # Sortie absente : tous les documents sont traités comme ajoutés
+        full = self.data is None
+        if full:
+            added = sorted(current)
+            modified = []
+        targets = added + modified
+        organization_targets = sorted(current) if self.rebuild_organizations else targets
+        if not targets and not removed and not self.rebuild_organizations:
+            return added, modified, removed
+
+        workers = self.workers or (None if len(targets) > 8 else 1)
+        changed = analyze_files(targets, workers=workers) if targets else []
+        changed_by_path = {p['file_path']: p for p in changed}
+
+        # Fichier modifié devenu illisible : retiré comme un fichier supprimé,
+        # et absent du manifeste pour être relu au prochain lot
+        unreadable = [path for path in modified if path not in changed_by_path]
+        drop_unreadable(current, targets, changed_by_path)
+
+        # Inventaire (reconstruit entièrement si les ressources le sont)
+        modified = [path for path in modified if path in changed_by_path]
+        removed = removed + unreadable
+        stale = set(modified) | set(removed)
+        previous_by_path = {p['file_path']: p for p in self.inventory if p['file_path'] in stale}
+        inventory = [] if full else [p for p in self.inventory if p['file_path'] not in stale]
+        inventory.extend(changed)
+        sort_proposals(inventory)
+
+        # Ressources : même logique que prepare_database_resources --delta
+        if full:
+            resources = format_for_database(inventory)
+            summary = ResourceSummary.from_resources(resources)
+        else:
+            summary = ResourceSummary.from_dict(self.data['summary'])
+            resources, _ = apply_delta(self.data['resources'], {
+                'added': [changed_by_path[path] for path in added if path in changed_by_path],
+                'modified': [changed_by_path[path] for path in modified if path in changed_by_path],
+                'removed': removed
+            }, summary=summary)
+
+        # Les extracteurs identifient un document par son nom et son année fiscale
+        replaced = {(os.path.basename(path), proposal['fiscal_year'])
+                    for proposals in (previous_by_path, changed_by_path)
+                    for path, proposal in proposals.items()}
+        organizations = self.extract_organizations(organization_targets, replaced)
+
+        # Tout est calculé : l'état n'est modifié qu'ici (un lot interrompu est rejoué)
+        self.inventory = inventory
+        self.data = {
+            'summary': summary.to_dict(),
+            'resources': resources,
+            'last_updated': datetime.now().isoformat(),
+            'data_source': self.ressource_path
+        }
+        self.organizations = organizations
+        self.rebuild_organizations = set()
+        for path in removed:
+            self.manifest.pop(path, None)
+        self.manifest.update(current)
+        self.data['manifest_fingerprint'] = manifest_fingerprint(self.manifest)
+        self.write()
+        return added, modified, removed
+
+    def extract_organizations(self, targets, replaced):
+        """Organisations des deux extracteurs, celles des documents touchés étant remplacées
+
+        Les deux profils (voir org_rules) sont évalués en un seul passage par document.
+        """
+        from org_rules import extract_profiles
+        from analyze_proposals import extract_proposal_info
+
+        result = {}
+        for name, organizations in self.organizations.items():
+            if name in self.rebuild_organizations:
+                result[name] = []
+            else:
+                result[name] = [org for org in organizations
+                                if (org.get('source_proposal'), org.get('fiscal_year')) not in replaced]
+
+        for path in targets:
+            # Année fiscale déduite du chemin, comme dans analyze_proposals
+            fiscal_year = extract_proposal_info(path, ' ')['fiscal_year']
+            try:
+                found = extract_profiles(path, ORGANIZATION_PROFILES.values())
+            except Exception as e:
+                print(f"Erreur lors de la lecture de {path}: {e}")
+                continue
+            for name, profile in ORGANIZATION_PROFILES.items():
+                for org in found[profile]:
+                    org['source_proposal'] = os.path.basename(path)
+                    org['fiscal_year'] = fiscal_year
+                    result[name].append(org)
+        return result
+
+    def write(self):
+        """Remplace les sorties (chacune atomiquement)"""
+        from resource_store import write_store, STORE_DIR
+        from facet_index import FacetIndex, FACETS_FILE
+        from snapshot import write_snapshot, snapshot_path
+
+        save_json(self.path(INVENTORY_FILE), self.inventory)
+        save_json(self.path(RESOURCES_FILE), self.data)
+        write_store(self.path(STORE_DIR), self.data['resources'])
+        FacetIndex.from_resources(self.data['resources']).save(self.path(FACETS_FILE))
+        write_snapshot(snapshot_path(self.path(RESOURCES_FILE)), self.data['resources'], 'resource',
+                       self.data['summary'])
+        for name, organizations in self.organizations.items():
+            save_json(self.path(name), organizations)
+            write_snapshot(snapshot_path(self.path(name)), organizations, 'organization')
+        # Le manifeste en dernier : après une interruption, le lot est rejoué
+        save_json(self.path(MANIFEST_FILE), self.manifest)
+
+
+def run_batch(reingester, paths):
+    started = time.perf_counter()
+    added, modified, removed = reingester.process(paths)
+    if added or modified or removed:
+        print(f"[{datetime.now():%H:%M:%S}] {len(added)} ajoutes, {len(modified)} modifies, "
+              f"{len(removed)} supprimes -> {len(reingester.data['resources'])} ressources "
+              f"({time.perf_counter() - started:.2f}s)")
+        for path in added + modified + removed:
+            print(f"  {os.path.relpath(path, reingester.ressource_path)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Surveillance de Ressource/ et retraitement continu")
+    parser.add_argument('--root', default=PROJECT_DIR,
+                        help="Dossier du projet (contient Ressource/) ; defaut : dossier du script")
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE,
+                        help="Secondes sans evenement avant de traiter un lot")
+    parser.add_argument('--max-delay', type=float, default=MAX_DELAY,
+                        help="Delai maximal avant de traiter un lot")
+    parser.add_argument('--polling', action='store_true', help="Parcours periodique au lieu d'inotify")
+    parser.add_argument('--workers', type=int, default=None, help="Processus pour l'analyse")
+    parser.add_argument('--once', action='store_true',
+                        help="Rattraper les changements depuis le dernier passage puis quitter")
+    args = parser.parse_args()
+
+    reingester = Reingester(args.root, workers=args.workers)
+
+    print("="*80)
+    print("SURVEILLANCE DE RESSOURCE/")
+    print("="*80)
+    run_batch(reingester, reingester.pending_changes())
+    if args.once:
+        return
+
+    watcher = make_watcher(reingester.ressource_path, polling=args.polling)
+    print(f"En attente de changements ({type(watcher).__name__}, Ctrl+C pour arreter)...")
+    debouncer = Debouncer(args.debounce, args.max_delay)
+    try:
+        while True:
+            changed = watcher.poll(debouncer.timeout())
+            if changed is None:
+                # File d'événements perdue : rattrapage via le manifeste
+                changed = reingester.pending_changes()
+            debouncer.add(changed)
+            if debouncer.ready():
+                try:
+                    run_batch(reingester, debouncer.take())
+                except OSError as e:
+                    # Document encore verrouillé ou en cours de copie : on réessaiera
+                    if e.errno not in (errno.EACCES, errno.EBUSY, errno.ENOENT):
+                        raise
+                    print(f"Lot reporte: {e}")
+                    debouncer.add(reingester.pending_changes())
+    except KeyboardInterrupt:
+        print("\nArret de la surveillance")
+    finally:
+        watcher.close()
+
+
+if __name__ == "__main__":
+    main()